@@ -0,0 +1,280 @@
+"""
+Офлайн-бенчмарк этапов конвейера на синтетических данных.
+
+    python benchmarks/run_benchmarks.py --sizes 1k 100k --output benchmarks/results/latest.json
+    python benchmarks/run_benchmarks.py --sizes 1M --stages cleaner csv
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/main.json --max-slowdown 1.2
+
+Для каждого размера выборки замеряются очистка (поштучная и
+DataCleaner.clean_dataframe с проверкой совпадения результатов), фильтр по
+выручке и классификация CAT (по списку и по CompanyTable), запись и чтение
+CSV. Извлечение текста из HTML замеряется каждым установленным
+разборщиком (МБ/с). WebsiteParser прогоняется на --sites страницах локального сервера с
+задержкой и ошибками. Результат - JSON со временем (wall и CPU) и
+скоростью каждого этапа; с --baseline этапы сравниваются с прошлым
+прогоном, и код выхода 1 означает замедление больше --max-slowdown.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import copy_companies, generate_companies, generate_page
+from benchmarks.site_server import start_site_server
+from src.data_collectors.base import CompanyData
+
+STAGES = ('cleaner', 'revenue', 'classifier', 'csv', 'extract', 'website')
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+def timed(func: Callable, *args, **kwargs):
+    """Выполняет func с подавленным выводом; возвращает (результат, wall, cpu)."""
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return result, time.perf_counter() - wall_started, time.process_time() - cpu_started
+
+def record(results: List[Dict], stage: str, rows: int, wall: float, cpu: float, **extra):
+    entry = {'stage': stage, 'rows': rows, 'wall_seconds': round(wall, 6), 'cpu_seconds': round(cpu, 6),
+             'rows_per_second': round(rows / wall, 1) if wall > 0 else None}
+    entry.update(extra)
+    results.append(entry)
+    print(f"   {stage:28} {rows:>9} строк  {wall:8.3f} с  CPU {cpu:8.3f} с"
+          + (f"  {entry['rows_per_second']:,.0f} строк/с" if entry['rows_per_second'] else ''))
+
+def _normalize(value):
+    if value is None:
+        return None
+    try:
+        if value != value:
+            return None
+    except TypeError:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    return value
+
+def _cleaner_parity(cleaned: List[CompanyData], df) -> int:
+    """Число строк, где clean_dataframe разошелся с поштучной очисткой."""
+    columns = ['inn', 'name', 'site', 'revenue', 'employees', 'cat_evidence']
+    frame_columns = {name: df[name].astype(object).tolist() for name in columns}
+    mismatches = 0
+    for row, company in enumerate(cleaned):
+        for name in columns:
+            if _normalize(getattr(company, name)) != _normalize(frame_columns[name][row]):
+                mismatches += 1
+                break
+    return mismatches
+
+def bench_cleaner(results: List[Dict], companies: List[CompanyData]):
+    import pandas as pd
+    from src.processors.data_cleaner import DataCleaner
+
+    columns = ['inn', 'name', 'revenue', 'site', 'cat_evidence', 'employees']
+    df = pd.DataFrame({name: pd.Series([getattr(c, name) for c in companies], dtype=object) for name in columns})
+
+    batch = copy_companies(companies)
+    cleaned, wall, cpu = timed(DataCleaner.clean_company_data, batch)
+    record(results, 'cleaner.per_object', len(companies), wall, cpu)
+
+    cleaned_df, wall, cpu = timed(DataCleaner.clean_dataframe, df)
+    mismatches = _cleaner_parity(cleaned, cleaned_df)
+    record(results, 'cleaner.dataframe', len(companies), wall, cpu, parity_mismatches=mismatches)
+    if mismatches:
+        print(f"   ⚠ clean_dataframe расходится с поштучной очисткой в {mismatches} строках")
+
+def _cleaned(companies: List[CompanyData]) -> List[CompanyData]:
+    from src.processors.data_cleaner import DataCleaner
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DataCleaner.clean_company_data(copy_companies(companies))
+
+def bench_revenue(results: List[Dict], cleaned: List[CompanyData]):
+    from src.data_collectors.company_table import CompanyTable
+    from src.processors.revenue_validator import RevenueValidator
+
+    kept, wall, cpu = timed(RevenueValidator.filter_by_revenue, cleaned)
+    record(results, 'revenue.list', len(cleaned), wall, cpu, kept=len(kept))
+
+    table, wall, cpu = timed(CompanyTable.from_companies, cleaned)
+    record(results, 'table.from_companies', len(cleaned), wall, cpu)
+
+    kept, wall, cpu = timed(RevenueValidator.filter_table, table)
+    record(results, 'revenue.table', len(cleaned), wall, cpu, kept=len(kept))
+
+def bench_classifier(results: List[Dict], cleaned: List[CompanyData]):
+    from src.data_collectors.company_table import CompanyTable
+    from src.processors.cat_classifier import CatClassifier
+
+    kept, wall, cpu = timed(CatClassifier.classify_companies, cleaned)
+    record(results, 'classifier.list', len(cleaned), wall, cpu, kept=len(kept))
+
+    table = CompanyTable.from_companies(cleaned)
+    kept, wall, cpu = timed(CatClassifier.filter_table, table)
+    record(results, 'classifier.table', len(cleaned), wall, cpu, kept=len(kept))
+
+def bench_csv(results: List[Dict], cleaned: List[CompanyData]):
+    from src.utils.csv_handler import CsvHandler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'companies.csv')
+        _, wall, cpu = timed(CsvHandler.save_companies_to_csv, cleaned, path, quiet=True)
+        record(results, 'csv.save', len(cleaned), wall, cpu, bytes=os.path.getsize(path))
+
+        loaded, wall, cpu = timed(CsvHandler.load_companies_from_csv, path, quiet=True)
+        record(results, 'csv.load', len(loaded), wall, cpu)
+
+def bench_extract(results: List[Dict], args):
+    from src.processors.text_extractor import TextExtractor, available_backends
+
+    pages = [generate_page(i, args.page_kb) for i in range(args.sites)]
+    size = sum(len(page) for page in pages)
+    reference = None
+    for backend in available_backends():
+        extractor = TextExtractor(backend)
+        extracted, wall, cpu = timed(lambda: [extractor.extract(page, {}) for page in pages])
+        reference = reference or extracted
+        mismatches = sum(1 for page, expected in zip(extracted, reference) if page != expected)
+        record(results, f'extract.{backend}', len(pages), wall, cpu, bytes=size,
+               mb_per_second=round(size / 1024 / 1024 / wall, 2) if wall > 0 else None,
+               parity_mismatches=mismatches)
+        print(f"   {'':28} {size / 1024 / 1024 / wall:9.1f} МБ/с")
+        if mismatches:
+            print(f"   ⚠ {backend} расходится с {available_backends()[0]} на {mismatches} страницах")
+
+def bench_website(results: List[Dict], args):
+    from src.data_collectors.website_parser import WebsiteParser
+
+    server = start_site_server(latency=args.latency, error_rate=args.error_rate, page_kb=args.page_kb)
+    try:
+        companies = [
+            CompanyData(inn=str(7700000000 + i), name=f'Компания {i}', revenue=None,
+                        site=f"{server.base_url}/site/{i}", cat_evidence='', source='benchmark')
+            for i in range(args.sites)
+        ]
+        parser = WebsiteParser(max_workers=args.workers, per_host_delay=0, max_in_flight=args.workers,
+                               parse_workers=args.parse_workers)
+        analyzed, wall, cpu = timed(parser.analyze_multiple_companies, companies)
+        with_product = sum(1 for company in analyzed if company.cat_product)
+        record(results, 'website', len(companies), wall, cpu, workers=args.workers,
+               parse_workers=args.parse_workers, latency=args.latency, error_rate=args.error_rate,
+               page_kb=args.page_kb, server_requests=server.requests, server_errors=server.errors,
+               with_product=with_product)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def compare(results: List[Dict], baseline_path: str, max_slowdown: float) -> bool:
+    """Печатает отношение времени к прошлому прогону; True, если есть регрессия."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(entry['size'], entry['stage']): entry for entry in json.load(f)['results']}
+
+    regressed = False
+    print(f"\nСравнение с {baseline_path}:")
+    for entry in results:
+        previous = baseline.get((entry['size'], entry['stage']))
+        if not previous or not previous['wall_seconds']:
+            continue
+        ratio = entry['wall_seconds'] / previous['wall_seconds']
+        slow = ratio > max_slowdown
+        regressed = regressed or slow
+        print(f"   {entry['size']:>9} {entry['stage']:28} x{ratio:5.2f}{'  РЕГРЕССИЯ' if slow else ''}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк этапов конвейера на синтетических данных')
+    parser.add_argument('--sizes', nargs='+', default=['1k', '100k'], help='Размеры выборок: 1k, 100k, 1M')
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=STAGES)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sites', type=int, default=200, help='Сколько страниц загружает WebsiteParser')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--parse-workers', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.05, help='Средняя задержка локального сервера, с')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='Доля ответов 503')
+    parser.add_argument('--page-kb', type=int, default=60)
+    parser.add_argument('--output', default=None, help='Файл JSON с результатами')
+    parser.add_argument('--baseline', default=None, help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--max-slowdown', type=float, default=1.25,
+                        help='Во сколько раз этап может замедлиться относительно --baseline')
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+
+    for size in map(parse_size, args.sizes):
+        row_stages = [stage for stage in args.stages if stage not in ('extract', 'website')]
+        if not row_stages:
+            break
+
+        print(f"\nВыборка {size:,} компаний")
+        companies, wall, _ = timed(generate_companies, size, args.seed)
+        print(f"   сгенерирована за {wall:.2f} с")
+
+        size_results: List[Dict] = []
+        if 'cleaner' in row_stages:
+            bench_cleaner(size_results, companies)
+
+        cleaned = _cleaned(companies) if set(row_stages) - {'cleaner'} else []
+        if 'revenue' in row_stages:
+            bench_revenue(size_results, cleaned)
+        if 'classifier' in row_stages:
+            bench_classifier(size_results, cleaned)
+        if 'csv' in row_stages:
+            bench_csv(size_results, cleaned)
+
+        for entry in size_results:
+            entry['size'] = size
+        results.extend(size_results)
+        del companies, cleaned
+
+    if 'extract' in args.stages:
+        print(f"\nИзвлечение текста: {args.sites} страниц по {args.page_kb} КБ")
+        extract_results: List[Dict] = []
+        bench_extract(extract_results, args)
+        for entry in extract_results:
+            entry['size'] = args.sites
+        results.extend(extract_results)
+
+    if 'website' in args.stages:
+        print(f"\nWebsiteParser: {args.sites} страниц, задержка {args.latency} с, ошибок {args.error_rate:.0%}")
+        website_results: List[Dict] = []
+        bench_website(website_results, args)
+        for entry in website_results:
+            entry['size'] = args.sites
+        results.extend(website_results)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'results': results,
+    }
+
+    if args.output:
+        output_dir = os.path.dirname(args.output)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты сохранены в {args.output}")
+
+    regressed = compare(results, args.baseline, args.max_slowdown) if args.baseline else False
+    failed_parity = any(entry.get('parity_mismatches') for entry in results)
+    sys.exit(1 if regressed or failed_parity else 0)
+
+if __name__ == '__main__':
+    main()
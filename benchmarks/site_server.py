@@ -0,0 +1,120 @@
+"""
+Локальный HTTP-сервер вместо сайтов компаний: синтетические страницы
+с задержкой и долей ошибок, чтобы бенчмарк WebsiteParser не ходил в сеть.
+
+    python benchmarks/site_server.py --port 8800 --latency 0.05 --error-rate 0.02
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_page
+
+class SiteServer(ThreadingHTTPServer):
+    """Отдает /site/<номер> - страницу generate_page(номер).
+
+    latency - средняя задержка ответа в секундах (±50%), error_rate - доля
+    ответов 503, page_kb - размер страницы. Страницы строятся один раз и
+    хранятся в памяти, поэтому сервер не становится узким местом.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.0, error_rate: float = 0.0,
+                 page_kb: int = 60, seed: int = 42):
+        super().__init__(address, _SiteHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.page_kb = page_kb
+        self.seed = seed
+        self.requests = 0
+        self.errors = 0
+        self._pages: Dict[int, bytes] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def page(self, number: int) -> bytes:
+        with self._lock:
+            page = self._pages.get(number)
+        if page is None:
+            page = generate_page(self.seed + number, self.page_kb).encode('utf-8')
+            with self._lock:
+                self._pages[number] = page
+        return page
+
+    def next_outcome(self) -> Tuple[float, bool]:
+        with self._lock:
+            self.requests += 1
+            delay = self.latency * self._rng.uniform(0.5, 1.5) if self.latency else 0.0
+            failed = self._rng.random() < self.error_rate
+            self.errors += failed
+        return delay, failed
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'site' or not parts[1].isdigit():
+            self.send_error(404)
+            return
+
+        delay, failed = self.server.next_outcome()
+        if delay:
+            time.sleep(delay)
+        if failed:
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = self.server.page(int(parts[1]))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            # Клиент мог прекратить чтение, найдя достаточно признаков CAT
+            pass
+
+def start_site_server(latency: float = 0.0, error_rate: float = 0.0, page_kb: int = 60,
+                      seed: int = 42, port: int = 0) -> SiteServer:
+    """Запускает сервер в фоновом потоке на 127.0.0.1 (port=0 - свободный порт)."""
+    server = SiteServer(('127.0.0.1', port), latency=latency, error_rate=error_rate, page_kb=page_kb, seed=seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Локальные сайты компаний для бенчмарков')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--page-kb', type=int, default=60)
+    args = parser.parse_args()
+
+    server = SiteServer(('127.0.0.1', args.port), latency=args.latency, error_rate=args.error_rate,
+                        page_kb=args.page_kb)
+    print(f"Страницы: {server.base_url}/site/<номер>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
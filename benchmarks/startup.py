@@ -0,0 +1,86 @@
+"""
+Время запуска CLI: сколько стоит один короткий вызов src/main.py.
+
+    python benchmarks/startup.py --runs 10 --max-seconds 1.0
+
+Каждая команда запускается в отдельном процессе несколько раз, в отчет
+попадают медиана и минимум. Дополнительно проверяется, что --analyze по
+CSV не импортирует тяжелые пакеты. Код выхода 1, если медиана превысила
+--max-seconds или тяжелый пакет оказался загружен.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, 'src', 'main.py')
+
+# Пакеты, которые не должны загружаться при --analyze по CSV
+HEAVY_MODULES = ('pandas', 'numpy', 'bs4', 'requests', 'fake_useragent', 'pyarrow')
+
+SAMPLE_CSV = (
+    "inn,name,revenue,site,cat_evidence,source,cat_product,employees,okved_main,country\n"
+    "7701234567,ООО \"Локализация Про\",150000000.0,localization-pro.ru,упоминание Trados,rusprofile,Trados,25,74.30,Россия\n"
+)
+
+def time_command(args, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, MAIN] + args, cwd=ROOT, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        timings.append(time.perf_counter() - started)
+    return {'median': statistics.median(timings), 'min': min(timings), 'runs': runs}
+
+def loaded_heavy_modules(args) -> list:
+    """Какие из HEAVY_MODULES загружены после выполнения main.py с args."""
+    code = (
+        "import runpy, sys, io, contextlib\n"
+        f"sys.argv = [{MAIN!r}] + {args!r}\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    runpy.run_path({MAIN!r}, run_name='__main__')\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    return [name for name in result.stdout.strip().split(',') if name]
+
+def main():
+    parser = argparse.ArgumentParser(description='Время запуска CLI')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='Допустимая медиана времени запуска для каждой команды')
+    parser.add_argument('--output', default=None, help='Сохранить результат в JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'companies.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_CSV)
+
+        commands = {
+            'help': ['--help'],
+            'analyze_csv': ['--analyze', '--output', csv_path],
+        }
+        results = {name: time_command(command, args.runs) for name, command in commands.items()}
+        heavy = loaded_heavy_modules(commands['analyze_csv'])
+
+    failed = bool(heavy)
+    for name, result in results.items():
+        slow = args.max_seconds is not None and result['median'] > args.max_seconds
+        failed = failed or slow
+        print(f"{name:12} медиана {result['median']:.3f} с, минимум {result['min']:.3f} с{'  МЕДЛЕННО' if slow else ''}")
+    print(f"Тяжелые модули при --analyze: {', '.join(heavy) if heavy else 'нет'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'commands': results, 'heavy_modules_on_analyze': heavy}, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Синтетические данные для бенчмарков: «грязные» компании как из коллекторов
+и HTML-страницы их сайтов.
+
+Все генераторы детерминированы: одинаковый seed дает одинаковые данные,
+поэтому результаты разных прогонов можно сравнивать.
+"""
+import random
+from typing import Iterator, List, Optional
+
+from config.settings import CONFIG
+from src.data_collectors.base import CompanyData
+
+SOURCES = ['rusprofile', 'translation_directory', 'it_localization_catalog', 'gaming_catalog']
+LEGAL_FORMS = ['ООО', 'АО', 'ПАО', 'ИП', 'ЗАО']
+NAME_WORDS = ['Локализация', 'Транслейт', 'Лингва', 'Перевод', 'Глобал', 'Тех', 'Медиа', 'Софт',
+              'Бюро', 'Центр', 'Язык', 'Экспресс', 'Про', 'Север', 'Текст', 'Диалог']
+OKVED_CODES = ['74.30', '62.01', '58.29', '63.11', '70.22', '85.42']
+COUNTRIES = ['Россия', 'Россия', 'Россия', 'Беларусь', 'Казахстан']
+FILLER_WORDS = ['компания', 'оказывает', 'услуги', 'перевода', 'для', 'бизнеса', 'клиентов', 'проекты',
+                'качество', 'сроки', 'команда', 'опыт', 'работы', 'документация', 'сайт', 'продукт',
+                'рынок', 'решения', 'the', 'company', 'provides', 'services', 'quality', 'team']
+
+def _dirty_inn(rng: random.Random) -> str:
+    digits = ''.join(rng.choice('0123456789') for _ in range(rng.choice((10, 10, 10, 12))))
+    style = rng.random()
+    if style < 0.6:
+        return digits
+    if style < 0.8:
+        return f"{digits[:2]} {digits[2:6]} {digits[6:]}"
+    if style < 0.9:
+        return f"ИНН {digits}"
+    return digits[:rng.randint(3, 9)]
+
+def _dirty_revenue(rng: random.Random):
+    value = rng.choice((rng.uniform(1e6, 9e7), rng.uniform(1e8, 2e9)))
+    style = rng.random()
+    if style < 0.4:
+        return round(value, 2)
+    if style < 0.6:
+        return int(value)
+    if style < 0.8:
+        return f"{int(value):,}".replace(',', ' ') + ' руб.'
+    if style < 0.9:
+        return str(round(value))
+    return None
+
+def _dirty_employees(rng: random.Random):
+    value = rng.randint(1, 500)
+    style = rng.random()
+    if style < 0.5:
+        return value
+    if style < 0.8:
+        return f"{value} человек"
+    if style < 0.9:
+        return f"от {value} до {value * 2}"
+    return None
+
+def _cat_text(rng: random.Random, words: int) -> str:
+    terms = CONFIG.cat_keywords + CONFIG.cat_products + CONFIG.cat_phrases
+    parts = [rng.choice(FILLER_WORDS) for _ in range(words)]
+    for _ in range(rng.randint(0, 3)):
+        parts.insert(rng.randrange(len(parts) + 1), rng.choice(terms))
+    return ' '.join(parts)
+
+def iter_companies(count: int, seed: int = 42) -> Iterator[CompanyData]:
+    """Компании в том виде, в каком их отдают коллекторы: ИНН с пробелами,
+    выручка то числом, то строкой, лишние пробелы и протоколы в адресах."""
+    rng = random.Random(seed)
+
+    for i in range(count):
+        name = f'{rng.choice(LEGAL_FORMS)} "{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)}"'
+        if rng.random() < 0.3:
+            name = f"  {name.replace(' ', '   ')}  "
+
+        site = f"{rng.choice(NAME_WORDS).lower()}-{i}.ru"
+        if rng.random() < 0.5:
+            site = rng.choice(('https://www.', 'http://', 'HTTPS://')) + site
+
+        products = CONFIG.cat_products
+        yield CompanyData(
+            inn=_dirty_inn(rng),
+            name=name,
+            revenue=_dirty_revenue(rng),
+            site=site,
+            cat_evidence=_cat_text(rng, rng.randint(5, 40)),
+            source=rng.choice(SOURCES),
+            cat_product=rng.choice(products) if rng.random() < 0.4 else None,
+            employees=_dirty_employees(rng),
+            okved_main=rng.choice(OKVED_CODES) if rng.random() < 0.8 else None,
+            country=rng.choice(COUNTRIES) if rng.random() < 0.7 else None,
+        )
+
+def generate_companies(count: int, seed: int = 42) -> List[CompanyData]:
+    return list(iter_companies(count, seed))
+
+def copy_companies(companies: List[CompanyData]) -> List[CompanyData]:
+    """Независимые копии: этапы очистки меняют компании на месте."""
+    return [CompanyData(c.inn, c.name, c.revenue, c.site, c.cat_evidence, c.source,
+                        c.cat_product, c.employees, c.okved_main, c.country) for c in companies]
+
+def generate_page(seed: int, size_kb: int = 60, cat_probability: float = 0.5,
+                  title: Optional[str] = None) -> str:
+    """HTML-страница сайта компании размером около size_kb КБ: шапка,
+    меню, абзацы текста и подвал. С вероятностью cat_probability в текст
+    вставляются термины CAT."""
+    rng = random.Random(seed)
+    title = title or f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)}"
+    with_cat = rng.random() < cat_probability
+
+    head = (f'<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8"><title>{title}</title>'
+            '<link rel="stylesheet" href="/static/site.css">'
+            '<script>window.dataLayer=window.dataLayer||[];</script></head><body>')
+    menu = '<nav><ul>' + ''.join(f'<li><a href="/{word.lower()}">{word}</a></li>'
+                                 for word in rng.sample(NAME_WORDS, 8)) + '</ul></nav>'
+    footer = '<footer><p>© Все права защищены</p></footer></body></html>'
+
+    target = size_kb * 1024
+    parts = [head, menu, f'<main><h1>{title}</h1>']
+    size = sum(len(part.encode('utf-8')) for part in parts) + len(footer.encode('utf-8'))
+
+    while size < target:
+        if with_cat and rng.random() < 0.05:
+            text = _cat_text(rng, rng.randint(20, 80))
+        else:
+            text = ' '.join(rng.choice(FILLER_WORDS) for _ in range(rng.randint(20, 80)))
+        paragraph = f'<section class="block"><p>{text}</p></section>'
+        parts.append(paragraph)
+        size += len(paragraph.encode('utf-8'))
+
+    parts.append('</main>')
+    parts.append(footer)
+    return ''.join(parts)
@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 @dataclass
 class CatConfig:
@@ -9,6 +9,45 @@ class CatConfig:
     cat_phrases: List[str] = None
     min_revenue: int = 100_000_000
     target_countries: List[str] = None
+    cat_word_boundaries: bool = True
+    cat_whole_word_max_length: int = 3
+    dedup_source_priority: List[str] = None
+    dedup_prefer_revenue: bool = True
+    dedup_concat_evidence: bool = False
+    http_workers: int = 1
+    per_host_delay: float = 1.0
+    max_in_flight: int = 8
+    http_pool_hosts: int = 64
+    dns_cache_ttl: float = 300.0
+    user_agent_cache_path: str = 'data/user_agents.json'
+    user_agent_cache_max_age: float = 7 * 24 * 3600
+    user_agent_pool_size: int = 200
+    host_burst: int = 1
+    host_max_rate: Optional[float] = None
+    host_min_rate: float = 0.1
+    host_error_threshold: float = 0.3
+    http_retries: int = 3
+    http_backoff_base: float = 1.0
+    http_backoff_max: float = 30.0
+    http_max_retry_after: float = 120.0
+    parse_workers: int = 0
+    parse_batch_size: int = 16
+    http_cache_path: Optional[str] = None
+    http_cache_ttl: int = 24 * 3600
+    http_cache_max_mb: int = 512
+    page_store_path: Optional[str] = None
+    text_index_path: Optional[str] = None
+    registry_path: Optional[str] = None
+    financials_path: Optional[str] = None
+    financials_cache_size: int = 100_000
+    registry_okved_codes: List[str] = None
+    registry_revenue_unit: float = 1.0
+    registry_encoding: str = 'utf-8'
+    website_classified_sources: List[str] = None
+    max_page_bytes: int = 2 * 1024 * 1024
+    early_stop_terms: int = 0
+    text_extractor: str = 'auto'
+    text_region_weights: Dict[str, float] = None
     
     def __post_init__(self):
         if self.cat_keywords is None:
@@ -35,5 +74,19 @@ class CatConfig:
         
         if self.target_countries is None:
             self.target_countries = ['Россия', 'RU', 'РФ', 'Russia']
+        
+        if self.registry_okved_codes is None:
+            # Письменный и устный перевод
+            self.registry_okved_codes = ['74.30']
+        
+        if self.website_classified_sources is None:
+            # Источники без текста о CAT: признаки ищутся только на сайте
+            self.website_classified_sources = ['registry']
+        
+        if self.text_region_weights is None:
+            self.text_region_weights = {'title': 3.0, 'headings': 2.0, 'body': 1.0}
+        
+        if self.dedup_source_priority is None:
+            self.dedup_source_priority = ['rusprofile']
 
 CONFIG = CatConfig()
\ No newline at end of file
@@ -1,11 +1,15 @@
 """
 Базовые классы для сбора данных о компаниях.
 """
+import sys
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 from dataclasses import dataclass
 
-@dataclass
+# __slots__ убирает словарь атрибутов у каждого экземпляра (dataclass умеет это с Python 3.10)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_SLOTS)
 class CompanyData:
     """Структура данных компании."""
     inn: str
@@ -29,6 +33,10 @@ class BaseCollector(ABC):
     def collect_companies(self) -> List[CompanyData]:
         pass
     
+    def iter_companies(self) -> Iterator[CompanyData]:
+        """Отдает компании по одной; коллекторы с постраничным сбором переопределяют этот метод."""
+        yield from self.collect_companies()
+    
     def validate_data(self, company: CompanyData) -> bool:
         if not company.inn or not company.name:
             return False
@@ -1,5 +1,4 @@
 from typing import List, Dict
-import pandas as pd
 
 from .base import BaseCollector, CompanyData
 
@@ -0,0 +1,172 @@
+"""
+Компактное колоночное хранилище компаний вместо списка CompanyData.
+"""
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .base import CompanyData
+
+EMPLOYEES_MISSING = np.iinfo(np.int64).min
+
+class _Categories:
+    """Словарь интернированных строк для столбцов с небольшим числом значений."""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in values or []:
+            self.code(value)
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def value(self, code: int) -> Optional[str]:
+        return None if code < 0 else self.values[code]
+
+class CompanyTable:
+    """Компании, разложенные по массивам numpy.
+
+    ИНН хранится как uint64 плюс число знаков (чтобы не терять ведущие нули),
+    выручка - float64 с NaN вместо None, сотрудники - int64 с отдельным
+    значением для пропуска. source, cat_product и country кодируются
+    номерами в общем списке интернированных строк. Остальные текстовые поля
+    лежат в object-массивах. Фильтрация выполняется булевой маской без
+    пересборки объектов.
+    """
+
+    CATEGORY_COLUMNS = ('source', 'cat_product', 'country')
+    TEXT_COLUMNS = ('name', 'site', 'cat_evidence', 'okved_main')
+
+    def __init__(self, inn: np.ndarray, inn_width: np.ndarray, revenue: np.ndarray, employees: np.ndarray,
+                 codes: Dict[str, np.ndarray], categories: Dict[str, _Categories],
+                 text: Dict[str, np.ndarray], irregular_inn: Optional[Dict[int, str]] = None):
+        self.inn = inn
+        self.inn_width = inn_width
+        self.revenue = revenue
+        self.employees = employees
+        self.codes = codes
+        self.categories = categories
+        self.text = text
+        # ИНН, которые не укладываются в 12 цифр (до очистки), хранятся как есть по номеру строки
+        self.irregular_inn = irregular_inn or {}
+
+    @staticmethod
+    def _encode_inn(value) -> Tuple[int, int]:
+        text = '' if value is None else str(value)
+        if text.isdigit() and text.isascii() and len(text) <= 12:
+            return int(text), len(text)
+        if not text:
+            return 0, 0
+        return 0, 255
+
+    @classmethod
+    def from_companies(cls, companies: Iterable[CompanyData]) -> 'CompanyTable':
+        companies = companies if isinstance(companies, list) else list(companies)
+        size = len(companies)
+
+        inn = np.zeros(size, dtype=np.uint64)
+        inn_width = np.zeros(size, dtype=np.uint8)
+        irregular_inn = {}
+        for row, company in enumerate(companies):
+            number, width = cls._encode_inn(company.inn)
+            inn[row] = number
+            inn_width[row] = width
+            if width == 255:
+                irregular_inn[row] = str(company.inn)
+
+        revenue = np.array([np.nan if c.revenue is None else c.revenue for c in companies], dtype=np.float64)
+        employees = np.array(
+            [EMPLOYEES_MISSING if c.employees is None else c.employees for c in companies], dtype=np.int64
+        )
+
+        categories = {name: _Categories() for name in cls.CATEGORY_COLUMNS}
+        codes = {
+            name: np.array([categories[name].code(getattr(c, name)) for c in companies], dtype=np.int32)
+            for name in cls.CATEGORY_COLUMNS
+        }
+
+        text = {}
+        for name in cls.TEXT_COLUMNS:
+            column = np.empty(size, dtype=object)
+            column[:] = [getattr(c, name) for c in companies]
+            text[name] = column
+
+        return cls(inn, inn_width, revenue, employees, codes, categories, text, irregular_inn)
+
+    def __len__(self) -> int:
+        return len(self.revenue)
+
+    def inn_at(self, row: int) -> str:
+        width = int(self.inn_width[row])
+        if width == 0:
+            return ''
+        if width == 255:
+            return self.irregular_inn[row]
+        return str(int(self.inn[row])).zfill(width)
+
+    def __getitem__(self, row: int) -> CompanyData:
+        revenue = self.revenue[row]
+        employees = self.employees[row]
+        return CompanyData(
+            inn=self.inn_at(row),
+            name=self.text['name'][row],
+            revenue=None if np.isnan(revenue) else float(revenue),
+            site=self.text['site'][row],
+            cat_evidence=self.text['cat_evidence'][row],
+            source=self.category_at('source', row),
+            cat_product=self.category_at('cat_product', row),
+            employees=None if employees == EMPLOYEES_MISSING else int(employees),
+            okved_main=self.text['okved_main'][row],
+            country=self.category_at('country', row),
+        )
+
+    def __iter__(self) -> Iterator[CompanyData]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def category_at(self, name: str, row: int) -> Optional[str]:
+        return self.categories[name].value(int(self.codes[name][row]))
+
+    def category_mask(self, name: str, value: str) -> np.ndarray:
+        """Маска строк, у которых столбец name равен value; сравниваются коды, а не строки."""
+        code = self.categories[name]._codes.get(value)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.codes[name] == code
+
+    def to_companies(self) -> List[CompanyData]:
+        return list(self)
+
+    def filter(self, mask: np.ndarray) -> 'CompanyTable':
+        mask = np.asarray(mask, dtype=bool)
+        irregular_inn = {}
+        if self.irregular_inn:
+            new_rows = np.cumsum(mask) - 1
+            irregular_inn = {int(new_rows[row]): inn for row, inn in self.irregular_inn.items() if mask[row]}
+
+        return CompanyTable(
+            self.inn[mask],
+            self.inn_width[mask],
+            self.revenue[mask],
+            self.employees[mask],
+            {name: codes[mask] for name, codes in self.codes.items()},
+            self.categories,
+            {name: column[mask] for name, column in self.text.items()},
+            irregular_inn,
+        )
+
+    def memory_usage(self) -> int:
+        """Размер массивов в байтах (без самих строк в object-столбцах)."""
+        arrays = [self.inn, self.inn_width, self.revenue, self.employees]
+        arrays += list(self.codes.values()) + list(self.text.values())
+        return sum(array.nbytes for array in arrays)
@@ -0,0 +1,258 @@
+"""
+Сбор компаний из локальной выгрузки реестра юрлиц (CSV или XML на
+несколько ГБ) без обращений к сети.
+
+Файл отображается в память (mmap) и разбирается потоково: CSV - кусками
+по CHUNK_BYTES до границы строки, XML - iterparse с очисткой разобранных
+записей. Отбор по ОКВЭД, минимальной выручке и стране идет по сырым
+значениям полей до создания CompanyData, поэтому дальше по конвейеру
+(и до загрузки сайтов) доходят только подходящие кандидаты.
+
+Столбцы CSV и поля записи XML (атрибуты или вложенные элементы)
+узнаются по названиям из FIELD_ALIASES, регистр не важен.
+"""
+import io
+import os
+import re
+import csv
+import mmap
+import logging
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .base import BaseCollector, CompanyData
+from ..utils.metrics import StageTally
+from config.settings import CONFIG
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BYTES = 4 * 1024 * 1024
+
+FIELD_ALIASES: Dict[str, Sequence[str]] = {
+    'inn': ('inn', 'инн'),
+    'name': ('name', 'full_name', 'short_name', 'наименование', 'наимсокр', 'наимполн', 'название'),
+    'okved': ('okved', 'okved_main', 'оквэд', 'оквэд_основной', 'основной_оквэд', 'кодоквэд'),
+    'revenue': ('revenue', 'income', 'выручка', 'доход'),
+    'employees': ('employees', 'численность', 'среднесписочная_численность', 'сведсснч'),
+    'country': ('country', 'страна'),
+    'site': ('site', 'website', 'url', 'сайт'),
+}
+
+_FIELD_BY_ALIAS = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+
+def parse_number(text: Optional[str]) -> Optional[float]:
+    """'150 000 000,50' -> 150000000.5; пусто и мусор - None."""
+    if not text:
+        return None
+    text = text.replace('\xa0', '').replace(' ', '').replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1].lower()
+
+class RegistryCollector(BaseCollector):
+    """Компании из выгрузки реестра path (.csv/.tsv/.txt или .xml).
+
+    okved_prefixes - коды ОКВЭД или их начала ('74.30', '62'); пусто - без
+    отбора по ОКВЭД. min_revenue (по умолчанию CONFIG.min_revenue) и
+    revenue_unit - выручка в файле умножается на revenue_unit (1000, если
+    она в тысячах рублей). Записи без выручки отбрасываются, если не задан
+    keep_missing_revenue. Записи без страны считаются российскими.
+    """
+
+    STAGE = 'registry'
+
+    def __init__(self, path: str, okved_prefixes: Optional[Sequence[str]] = None,
+                 min_revenue: Optional[float] = None, revenue_unit: Optional[float] = None,
+                 countries: Optional[Sequence[str]] = None, keep_missing_revenue: bool = False,
+                 encoding: Optional[str] = None, record_tag: Optional[str] = None):
+        super().__init__("registry")
+        self.path = path
+        self.okved_prefixes = tuple(CONFIG.registry_okved_codes if okved_prefixes is None else okved_prefixes)
+        self.min_revenue = CONFIG.min_revenue if min_revenue is None else min_revenue
+        self.revenue_unit = CONFIG.registry_revenue_unit if revenue_unit is None else revenue_unit
+        self.countries = {country.lower() for country in (countries or CONFIG.target_countries)}
+        self.keep_missing_revenue = keep_missing_revenue
+        self.encoding = encoding or CONFIG.registry_encoding
+        self.record_tag = record_tag.lower() if record_tag else None
+        self.rows_read = 0
+        self.bytes_read = 0
+        self.rejected: Dict[str, int] = {}
+
+    def collect_companies(self) -> List[CompanyData]:
+        return list(self.iter_companies())
+
+    def iter_companies(self) -> Iterator[CompanyData]:
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                tally = StageTally(self.STAGE)
+                if self.path.lower().endswith('.xml'):
+                    records = self._iter_xml(mapped)
+                else:
+                    records = self._iter_csv(mapped, tally)
+
+                try:
+                    for fields in records:
+                        company = self._accept(fields, tally)
+                        if company is not None:
+                            yield company
+                finally:
+                    tally.flush()
+
+    def _reject(self, tally: StageTally, reason: str, amount: int = 1):
+        tally.reject(reason, amount)
+        self.rejected[reason] = self.rejected.get(reason, 0) + amount
+
+    def _accept(self, fields: Dict[str, str], tally: StageTally) -> Optional[CompanyData]:
+        """Проверки от самой дешевой; CompanyData создается только для прошедших."""
+        self.rows_read += 1
+        okved = (fields.get('okved') or '').strip()
+        if self.okved_prefixes and not okved.startswith(self.okved_prefixes):
+            self._reject(tally, 'okved')
+            return None
+
+        revenue = parse_number(fields.get('revenue'))
+        if revenue is None:
+            if not self.keep_missing_revenue:
+                self._reject(tally, 'no_revenue')
+                return None
+        else:
+            revenue *= self.revenue_unit
+            if revenue < self.min_revenue:
+                self._reject(tally, 'revenue')
+                return None
+
+        country = (fields.get('country') or '').strip()
+        if country and country.lower() not in self.countries:
+            self._reject(tally, 'country')
+            return None
+
+        inn = (fields.get('inn') or '').strip()
+        name = (fields.get('name') or '').strip()
+        if not inn or not name:
+            self._reject(tally, 'no_inn_or_name')
+            return None
+
+        employees = parse_number(fields.get('employees'))
+        tally.passed()
+        return CompanyData(
+            inn=inn,
+            name=name,
+            revenue=revenue,
+            site=(fields.get('site') or '').strip(),
+            cat_evidence='',
+            source=self.name,
+            employees=int(employees) if employees is not None else None,
+            okved_main=okved or None,
+            country=country or 'Россия',
+        )
+
+    def _iter_lines(self, mapped: mmap.mmap) -> Iterator[str]:
+        """Строки файла кусками по CHUNK_BYTES; кусок обрезается по последнему
+        переводу строки, поэтому многобайтные символы не разрываются."""
+        size = len(mapped)
+        position = 0
+        encoding = self.encoding
+        if mapped[:3] == b'\xef\xbb\xbf':
+            position = 3
+        while position < size:
+            end = min(position + CHUNK_BYTES, size)
+            if end < size:
+                newline = mapped.rfind(b'\n', position, end)
+                if newline >= 0:
+                    end = newline + 1
+                else:
+                    # Строка длиннее куска - дочитываем до ее конца
+                    newline = mapped.find(b'\n', end)
+                    end = size if newline < 0 else newline + 1
+            chunk = mapped[position:end]
+            self.bytes_read += len(chunk)
+            position = end
+            # newline='' - строки делятся только по \n, \r\n и \r, как ждет csv.reader
+            yield from io.StringIO(chunk.decode(encoding, 'replace'), newline='')
+
+    def _iter_csv(self, mapped: mmap.mmap, tally: StageTally) -> Iterator[Dict[str, str]]:
+        lines = self._iter_lines(mapped)
+        header_line = next(lines, '')
+        delimiter = max(';,\t|', key=header_line.count)
+        header = next(csv.reader([header_line], delimiter=delimiter))
+        columns = [(index, _FIELD_BY_ALIAS[name.strip().lower()]) for index, name in enumerate(header)
+                   if name.strip().lower() in _FIELD_BY_ALIAS]
+        if not any(field == 'inn' for _, field in columns):
+            raise ValueError(f"В заголовке {self.path} нет столбца ИНН: {header_line.strip()}")
+
+        # Строка, где нет ни одного кода ОКВЭД из отбора, не пройдет его при
+        # любом разборе, поэтому отбрасывается без разбора на поля
+        okved_search = None
+        if self.okved_prefixes:
+            okved_search = re.compile('|'.join(map(re.escape, self.okved_prefixes))).search
+
+        pending = ''
+        skipped = 0
+        for line in lines:
+            if pending:
+                line = pending + line
+                pending = ''
+            if line.count('"') % 2:
+                # Поле в кавычках продолжается на следующей строке
+                pending = line
+                continue
+            if okved_search and not okved_search(line):
+                skipped += 1
+                continue
+            if skipped:
+                self.rows_read += skipped
+                self._reject(tally, 'okved', skipped)
+                skipped = 0
+
+            if '"' in line:
+                row = next(csv.reader([line], delimiter=delimiter))
+            else:
+                row = line.rstrip('\r\n').split(delimiter)
+            width = len(row)
+            yield {field: row[index] for index, field in columns if index < width}
+
+        if skipped:
+            self.rows_read += skipped
+            self._reject(tally, 'okved', skipped)
+        if pending:
+            row = next(csv.reader([pending], delimiter=delimiter))
+            yield {field: row[index] for index, field in columns if index < len(row)}
+
+    def _iter_xml(self, mapped: mmap.mmap) -> Iterator[Dict[str, str]]:
+        record_tag = self.record_tag
+        depth = 0
+        root = None
+        for event, element in ET.iterparse(mapped, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if root is None:
+                    root = element
+                continue
+
+            depth -= 1
+            tag = _local_name(element.tag)
+            is_record = tag == record_tag if record_tag else depth == 1
+            if not is_record:
+                continue
+
+            fields = {}
+            for name, value in element.attrib.items():
+                field = _FIELD_BY_ALIAS.get(_local_name(name))
+                if field:
+                    fields[field] = value
+            for child in element:
+                field = _FIELD_BY_ALIAS.get(_local_name(child.tag))
+                if field and field not in fields:
+                    fields[field] = child.text or child.get('value', '')
+            yield fields
+
+            # Разобранные записи больше не нужны: память не растет с размером файла
+            element.clear()
+            root.clear()
+        self.bytes_read = len(mapped)
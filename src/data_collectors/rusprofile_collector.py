@@ -1,25 +1,33 @@
 import re
 import time
 import random
-from typing import List, Dict
-from bs4 import BeautifulSoup
-import requests
-from fake_useragent import UserAgent
+import logging
+from typing import List, Dict, Iterator
 
 from .base import BaseCollector, CompanyData
-from ..utils.http_client import HttpClient
+from ..utils.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
 
 class RusprofileCollector(BaseCollector):
+    ACTIVITY_KEYWORDS = [
+        'локализация',
+        'переводческие услуги',
+        'translation services',
+        'cat системы',
+        'tms платформы'
+    ]
+    
     def __init__(self):
         super().__init__("rusprofile")
-        self.http_client = HttpClient()
-        self.ua = UserAgent()
+        self.http_client = get_http_client()
     
     def search_companies_by_activity(self, activity_keywords: List[str]) -> List[CompanyData]:
-        companies = []
-        
+        return list(self.iter_search_companies_by_activity(activity_keywords))
+    
+    def iter_search_companies_by_activity(self, activity_keywords: List[str]) -> Iterator[CompanyData]:
         for keyword in activity_keywords:
-            print(f"Поиск компаний по ключевому слову: {keyword}")
+            logger.info("Поиск компаний по ключевому слову: %s", keyword)
             
             search_results = self._search_rusprofile(keyword)
             
@@ -27,11 +35,9 @@ class RusprofileCollector(BaseCollector):
                 if self._is_relevant_company(company_info):
                     company_data = self._parse_company_info(company_info)
                     if company_data:
-                        companies.append(company_data)
+                        yield company_data
             
             time.sleep(random.uniform(1, 3))
-        
-        return companies
     
     def _search_rusprofile(self, keyword: str) -> List[Dict]:
         mock_results = [
@@ -80,7 +86,7 @@ class RusprofileCollector(BaseCollector):
                 country='Россия'
             )
         except Exception as e:
-            print(f"Ошибка при парсинге данных компании: {e}")
+            logger.warning("Ошибка при парсинге данных компании: %s", e)
             return None
     
     def _extract_cat_evidence(self, description: str) -> str:
@@ -96,12 +102,7 @@ class RusprofileCollector(BaseCollector):
             return "упоминание переводческих технологий"
     
     def collect_companies(self) -> List[CompanyData]:
-        activity_keywords = [
-            'локализация',
-            'переводческие услуги',
-            'translation services',
-            'cat системы',
-            'tms платформы'
-        ]
-        
-        return self.search_companies_by_activity(activity_keywords)
\ No newline at end of file
+        return self.search_companies_by_activity(self.ACTIVITY_KEYWORDS)
+    
+    def iter_companies(self) -> Iterator[CompanyData]:
+        return self.iter_search_companies_by_activity(self.ACTIVITY_KEYWORDS)
\ No newline at end of file
@@ -2,92 +2,368 @@
 Парсер сайтов компаний для поиска признаков CAT-систем.
 """
 import re
-import time
-from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+import html
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Set, Tuple
 
 from .base import BaseCollector, CompanyData
-from ..utils.http_client import HttpClient
+from ..utils.http_client import get_http_client
+from ..utils.state_store import StateStore
+from ..utils.page_store import PageStore, get_page_store
+from ..utils.text_index import TextIndex, get_text_index
+from ..processors.cat_matcher import CatMatcher, get_cat_matcher
+from ..processors.text_extractor import PageText, get_text_extractor, record_extraction
+from ..utils.metrics import METRICS, STAGE_SECONDS, StageTally
 from config.settings import CONFIG
 
+logger = logging.getLogger(__name__)
+
+WEBSITE_PAGES = METRICS.counter('website_pages_total', 'Сайты компаний по результату загрузки')
+
+def find_cat_evidence(found_terms: Set[str], weights: Optional[Dict[str, float]] = None) -> str:
+    """Не больше трех доказательств; при weights сначала термины с большим
+    весом (найденные в заголовках), при равном весе - в порядке CONFIG."""
+    evidence_items = []
+    
+    for keyword in CONFIG.cat_keywords:
+        if keyword in found_terms:
+            evidence_items.append((keyword, f"упоминание '{keyword}'"))
+    
+    for product in CONFIG.cat_products:
+        if product in found_terms:
+            evidence_items.append((product, f"использование продукта {product}"))
+    
+    for phrase in CONFIG.cat_phrases:
+        if phrase in found_terms:
+            evidence_items.append((phrase, f"наличие описания '{phrase}'"))
+    
+    if weights:
+        evidence_items.sort(key=lambda item: -weights.get(item[0], 0))
+    
+    if evidence_items:
+        return "; ".join(text for _, text in evidence_items[:3])
+    else:
+        return "не найдено явных доказательств CAT"
+
+def detect_cat_product(found_terms: Set[str], weights: Optional[Dict[str, float]] = None) -> Optional[str]:
+    products = [product for product in CONFIG.cat_products if product in found_terms]
+    if not products:
+        return None
+    if weights:
+        return max(products, key=lambda product: weights.get(product, 0))
+    return products[0]
+
+def weighted_terms(page: PageText, matcher: Optional[CatMatcher] = None) -> Dict[str, float]:
+    """Найденные термины CAT с весом самой весомой области страницы, где
+    они встретились (CONFIG.text_region_weights)."""
+    matcher = matcher or get_cat_matcher()
+    region_weights = CONFIG.text_region_weights
+    weights: Dict[str, float] = {}
+    for region, text in page.regions():
+        if not text:
+            continue
+        weight = region_weights.get(region, 1.0)
+        for term in matcher.found_terms(text):
+            if weight > weights.get(term, 0):
+                weights[term] = weight
+    return weights
+
+def analyze_page(page: PageText) -> Tuple[str, Optional[str]]:
+    weights = weighted_terms(page)
+    return find_cat_evidence(weights, weights), detect_cat_product(weights, weights)
+
+# Разметка, которая не попадает в видимый текст: комментарии, блоки
+# скриптов и стилей целиком и остальные теги. Открывающий тег скрипта без
+# закрывающего сюда не подходит - блок дочитывается в следующем фрагменте.
+_MARKUP_RE = re.compile(
+    r'<!--.*?-->'
+    r'|<(script|style|noscript|template)\b[^>]*>.*?</\1\s*>'
+    r'|<(?!!--)(?!(?:script|style|noscript|template)\b)[^>]*>',
+    re.S | re.I)
+_WHITESPACE_RE = re.compile(r'\s+')
+_MAX_ENTITY_LENGTH = 32
+
+class _EvidenceTracker:
+    """Следит за терминами CAT по мере загрузки страницы.
+
+    Чтение можно остановить, когда найдено needed разных терминов и среди
+    них есть продукт: этого хватает для доказательств и определения
+    продукта. Термины ищутся, как и при анализе, только в видимом тексте:
+    разметка, скрипты и стили вырезаются из фрагментов, а незакрытые в
+    конце фрагмента тег, блок скрипта или сущность откладываются до
+    следующего.
+    Хвост предыдущего текста длиной с самый длинный термин
+    просматривается повторно, чтобы не пропустить термин на стыке.
+    """
+
+    def __init__(self, needed: int):
+        self.needed = needed
+        self.found: Set[str] = set()
+        self._products = set(CONFIG.cat_products)
+        self._overlap = max(map(len, CONFIG.cat_keywords + CONFIG.cat_products + CONFIG.cat_phrases), default=0)
+        self._tail = ''
+        self._pending = ''
+
+    def _visible(self, piece: str) -> str:
+        markup = self._pending + piece
+        parts = []
+        position = 0
+        for match in _MARKUP_RE.finditer(markup):
+            parts.append(markup[position:match.start()])
+            position = match.end()
+        rest = markup[position:]
+        unfinished = rest.find('<')
+        if unfinished < 0:
+            # Сущность (&nbsp;), разрезанная границей фрагментов
+            unfinished = rest.rfind('&', max(0, len(rest) - _MAX_ENTITY_LENGTH))
+            if unfinished >= 0 and ';' in rest[unfinished:]:
+                unfinished = -1
+        if unfinished >= 0:
+            parts.append(rest[:unfinished])
+            self._pending = rest[unfinished:]
+        else:
+            parts.append(rest)
+            self._pending = ''
+        # Соседние элементы разделяются пробелом, а пробельные символы
+        # (в том числе &nbsp;) схлопываются, как при извлечении текста
+        return _WHITESPACE_RE.sub(' ', html.unescape(' '.join(parts)))
+
+    def __call__(self, piece: str) -> bool:
+        text = self._tail + self._visible(piece)
+        self.found |= get_cat_matcher().found_terms(text)
+        self._tail = text[-self._overlap:] if self._overlap else ''
+        return len(self.found) >= self.needed and not self._products.isdisjoint(self.found)
+
+def analyze_content_batch(contents: List[Optional[str]],
+                          with_text: bool = False) -> Tuple[List[Optional[Tuple[str, Optional[str]]]], Dict, List]:
+    """Точка входа для процессов-обработчиков: пачка страниц за один вызов,
+    чтобы накладные расходы на передачу между процессами делились на всю пачку.
+    Вместе с результатами возвращает счетчики извлечения текста (метрики
+    процесса-обработчика в основной процесс не попадают) и, при with_text,
+    извлеченный текст страниц для индекса: второй раз их не разбирают."""
+    results = []
+    texts = []
+    tally: Dict[str, List[float]] = {}
+    for content in contents:
+        page = None
+        try:
+            if content:
+                page = get_text_extractor().extract(content, tally)
+                results.append(analyze_page(page))
+            else:
+                results.append(None)
+        except Exception as e:
+            logger.warning("Ошибка при анализе содержимого сайта: %s", e)
+            results.append(None)
+        texts.append(page.text if with_text and page is not None else None)
+    return results, tally, texts
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
 class WebsiteParser(BaseCollector):
-    def __init__(self):
+    STATE_STAGE = 'website'
+    
+    def __init__(self, max_workers: Optional[int] = None, per_host_delay: Optional[float] = None,
+                 max_in_flight: Optional[int] = None, state_store: Optional[StateStore] = None,
+                 resume: bool = False, parse_workers: Optional[int] = None,
+                 parse_batch_size: Optional[int] = None, page_store: Optional[PageStore] = None,
+                 offline: bool = False, text_index: Optional[TextIndex] = None):
+        """page_store - куда сохранять загруженные страницы (по умолчанию
+        CONFIG.page_store_path); offline=True - не ходить в сеть, а брать
+        страницы из page_store, чтобы заново применить правила поиска CAT;
+        text_index - индекс для --query (по умолчанию CONFIG.text_index_path)."""
         super().__init__("website_parser")
-        self.http_client = HttpClient()
+        self.max_workers = CONFIG.http_workers if max_workers is None else max_workers
+        self.parse_workers = CONFIG.parse_workers if parse_workers is None else parse_workers
+        self.parse_batch_size = max(1, CONFIG.parse_batch_size if parse_batch_size is None else parse_batch_size)
+        self.http_client = get_http_client(per_host_delay=per_host_delay, max_in_flight=max_in_flight)
+        self.state_store = state_store
+        self.resume = resume
+        self.resumed = 0
+        self.page_store = page_store or get_page_store()
+        self.offline = offline
+        self.text_index = text_index or get_text_index()
+        if offline and self.page_store is None:
+            raise ValueError("Для анализа без сети нужно хранилище страниц (CONFIG.page_store_path)")
     
     def analyze_company_website(self, company_data: CompanyData) -> Optional[CompanyData]:
         try:
-            content = self._fetch_website_content(company_data.site)
+            content = self._fetch_company_content(company_data)
             if not content:
                 return company_data
             
-            cat_evidence = self._find_cat_evidence(content)
-            cat_product = self._detect_cat_product(content)
-            
-            company_data.cat_evidence = cat_evidence
-            company_data.cat_product = cat_product
-            
-            return company_data
+            page = get_text_extractor().extract(content)
+            self._index_text(company_data, page.text)
+            return self._apply_analysis(company_data, analyze_page(page))
             
         except Exception as e:
-            print(f"Ошибка при анализе сайта {company_data.site}: {e}")
+            logger.warning("Ошибка при анализе сайта %s: %s", company_data.site, e,
+                           extra={'stage': self.STATE_STAGE, 'site': company_data.site})
             return company_data
     
+    def _fetch_company_content(self, company_data: CompanyData) -> Optional[str]:
+        if self.offline:
+            content = self.page_store.load(self._site_url(company_data.site)) if company_data.site else None
+            WEBSITE_PAGES.inc(result='stored' if content else 'not_stored')
+        else:
+            content = self._fetch_website_content(company_data.site)
+            WEBSITE_PAGES.inc(result='ok' if content else 'empty')
+            if self.state_store:
+                self.state_store.record_fetch(company_data.site, company_data, ok=bool(content))
+            if self.page_store and content:
+                self.page_store.save(self._site_url(company_data.site), content)
+        return content
+    
+    def _index_text(self, company_data: CompanyData, text: Optional[str]):
+        """Текст берется у этапа анализа, который его уже извлек."""
+        if self.text_index and text:
+            self.text_index.add(self._site_url(company_data.site), text,
+                                inn=company_data.inn, name=company_data.name)
+    
+    @staticmethod
+    def _site_url(site_url: str) -> str:
+        if not site_url.startswith(('http://', 'https://')):
+            return 'https://' + site_url
+        return site_url
+    
+    def _apply_analysis(self, company_data: CompanyData, analysis: Tuple[str, Optional[str]]) -> CompanyData:
+        company_data.cat_evidence, company_data.cat_product = analysis
+        
+        if self.state_store:
+            self.state_store.save_stage(self.STATE_STAGE, company_data)
+        
+        return company_data
+    
     def _fetch_website_content(self, site_url: str) -> Optional[str]:
+        """Загружает не больше CONFIG.max_page_bytes байт страницы и прекращает
+        чтение раньше, как только найдено CONFIG.early_stop_terms терминов CAT
+        вместе с продуктом (0 - читать страницу до конца)."""
         try:
-            if not site_url.startswith(('http://', 'https://')):
-                site_url = 'https://' + site_url
+            site_url = self._site_url(site_url)
             
-            response = self.http_client.get(site_url, timeout=10)
-            return response.text if response else None
+            stop_when = _EvidenceTracker(CONFIG.early_stop_terms) if CONFIG.early_stop_terms > 0 else None
+            return self.http_client.get_text(site_url, timeout=10, max_bytes=CONFIG.max_page_bytes,
+                                             stop_when=stop_when)
             
         except Exception as e:
-            print(f"Не удалось получить содержимое сайта {site_url}: {e}")
+            logger.warning("Не удалось получить содержимое сайта %s: %s", site_url, e,
+                           extra={'stage': self.STATE_STAGE, 'site': site_url})
             return None
     
-    def _find_cat_evidence(self, content: str) -> str:
-        content_lower = content.lower()
-        
-        evidence_items = []
-        
-        for keyword in CONFIG.cat_keywords:
-            if keyword in content_lower:
-                evidence_items.append(f"упоминание '{keyword}'")
+    def analyze_multiple_companies(self, companies: List[CompanyData]) -> List[CompanyData]:
+        """Анализирует сайты компаний, сохраняя порядок входного списка.
+
+        Паузы между запросами к одному хосту и общий лимит одновременных
+        запросов обеспечивает HttpClient, поэтому при max_workers > 1 сайты
+        разных компаний загружаются параллельно.
+        """
+        return list(self.iter_analyze_companies(companies))
+    
+    def iter_analyze_companies(self, companies: Iterable[CompanyData]) -> Iterator[CompanyData]:
+        """Потоковый вариант analyze_multiple_companies.
+
+        Вперед забирается не больше 2 * max_workers компаний, поэтому память
+        не растет с размером входа, а результаты идут в исходном порядке.
+        При parse_workers > 0 загрузка и анализ разделены: потоки только
+        скачивают страницы, а поиск признаков CAT идет в пуле процессов.
+        """
+        if self.parse_workers > 0:
+            analyzed = self._iter_analyze_in_processes(companies)
+        else:
+            analyzed = self._iter_ordered(companies, self._analyze_logged)
         
-        for product in CONFIG.cat_products:
-            if product in content_lower:
-                evidence_items.append(f"использование продукта {product}")
+        tally = StageTally(self.STATE_STAGE)
+        try:
+            for company in analyzed:
+                tally.passed()
+                yield company
+        finally:
+            tally.flush()
+    
+    def _iter_ordered(self, companies: Iterable[CompanyData], func: Callable) -> Iterator:
+        if self.max_workers <= 1:
+            for company in companies:
+                yield func(company)
+            return
         
-        for phrase in CONFIG.cat_phrases:
-            if phrase in content_lower:
-                evidence_items.append(f"наличие описания '{phrase}'")
+        window = self.max_workers * 2
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for company in companies:
+                pending.append(executor.submit(func, company))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            
+            while pending:
+                yield pending.popleft().result()
+    
+    def _iter_analyze_in_processes(self, companies: Iterable[CompanyData]) -> Iterator[CompanyData]:
+        fetched = self._iter_ordered(companies, self._fetch_logged)
+        window = self.parse_workers * 2
         
-        if evidence_items:
-            return "; ".join(evidence_items[:3])
-        else:
-            return "не найдено явных доказательств CAT"
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+            pending = deque()
+            for batch in _batched(fetched, self.parse_batch_size):
+                future = pool.submit(analyze_content_batch, [content for _, content in batch],
+                                     self.text_index is not None)
+                pending.append((batch, future))
+                if len(pending) >= window:
+                    yield from self._finish_batch(*pending.popleft())
+            
+            while pending:
+                yield from self._finish_batch(*pending.popleft())
     
-    def _detect_cat_product(self, content: str) -> Optional[str]:
-        content_lower = content.lower()
+    def _finish_batch(self, batch: List[Tuple[CompanyData, Optional[str]]], future) -> Iterator[CompanyData]:
+        analyses, extraction, texts = future.result()
+        record_extraction(extraction)
+        for (company, _), analysis, text in zip(batch, analyses, texts):
+            if analysis is not None:
+                self._index_text(company, text)
+                self._apply_analysis(company, analysis)
+            yield company
+    
+    def _restore_saved(self, company: CompanyData) -> bool:
+        if not (self.resume and self.state_store):
+            return False
         
-        for product in CONFIG.cat_products:
-            if product in content_lower:
-                return product
+        saved = self.state_store.load_stage(self.STATE_STAGE, company)
+        if not saved:
+            return False
         
-        return None
+        company.cat_evidence = saved.cat_evidence
+        company.cat_product = saved.cat_product
+        self.resumed += 1
+        WEBSITE_PAGES.inc(result='resumed')
+        return True
     
-    def analyze_multiple_companies(self, companies: List[CompanyData]) -> List[CompanyData]:
-        analyzed_companies = []
+    def _analyze_logged(self, company: CompanyData) -> CompanyData:
+        if self._restore_saved(company):
+            return company
         
-        for company in companies:
-            print(f"Анализ сайта: {company.site}")
-            analyzed_company = self.analyze_company_website(company)
-            analyzed_companies.append(analyzed_company)
-            
-            time.sleep(1)
+        logger.debug("Анализ сайта: %s", company.site, extra={'stage': self.STATE_STAGE, 'site': company.site})
+        with STAGE_SECONDS.time(stage='website_company'):
+            return self.analyze_company_website(company)
+    
+    def _fetch_logged(self, company: CompanyData) -> Tuple[CompanyData, Optional[str]]:
+        if self._restore_saved(company):
+            return company, None
         
-        return analyzed_companies
+        logger.debug("Загрузка сайта: %s", company.site, extra={'stage': self.STATE_STAGE, 'site': company.site})
+        try:
+            return company, self._fetch_company_content(company)
+        except Exception as e:
+            logger.warning("Ошибка при загрузке сайта %s: %s", company.site, e,
+                           extra={'stage': self.STATE_STAGE, 'site': company.site})
+            return company, None
     
     def collect_companies(self) -> List[CompanyData]:
         return []
\ No newline at end of file
@@ -1,42 +1,385 @@
 import argparse
 import sys
 import os
-import traceback
-from typing import List
+import logging
+from typing import List, Optional
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+logger = logging.getLogger('src.main')
+
 def main():
-    print("Отладка: Проверяем пути...")
-    print(f"   Текущая директория: {os.getcwd()}")
-    print(f"   Файл main.py: {os.path.abspath(__file__)}")
-    print(f"   Родительская директория: {os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}")
-    
     parser = argparse.ArgumentParser(description='Анализатор российских компаний, использующих CAT-системы')
     parser.add_argument('--output', '-o', default='data/companies.csv', help='Путь для сохранения результата')
     parser.add_argument('--collect', '-c', action='store_true', help='Собрать новые данные')
     parser.add_argument('--analyze', '-a', action='store_true', help='Анализировать существующие данные')
     parser.add_argument('--sources', nargs='+', default=['all'], 
-                       choices=['rusprofile', 'catalog', 'all'], 
+                       choices=['rusprofile', 'catalog', 'registry', 'all'], 
                        help='Источники данных для сбора')
+    parser.add_argument('--registry', default=None, metavar='PATH',
+                       help='Выгрузка реестра юрлиц (CSV или XML) - источник registry; '
+                            'отбор по ОКВЭД, выручке и стране до загрузки сайтов')
+    parser.add_argument('--registry-okved', nargs='*', default=None, metavar='CODE',
+                       help='Коды ОКВЭД или их начала для отбора из реестра (без значений - без отбора)')
+    parser.add_argument('--registry-revenue-unit', type=float, default=None,
+                       help='Множитель выручки в реестре (1000, если она в тысячах рублей)')
+    parser.add_argument('--registry-encoding', default=None,
+                       help='Кодировка выгрузки реестра, например cp1251')
+    parser.add_argument('--financials', nargs='?', const='data/financials.sqlite', default=None, metavar='PATH',
+                       help='Справочник выручки и численности по ИНН для компаний без этих данных '
+                            '(по умолчанию data/financials.sqlite)')
+    parser.add_argument('--build-financials', default=None, metavar='CSV',
+                       help='Построить справочник --financials из CSV с ИНН, выручкой, численностью и годом '
+                            '(выручка умножается на --registry-revenue-unit)')
+    parser.add_argument('--stream', action='store_true',
+                       help='Потоковый режим: компании проходят все этапы по одной и сразу пишутся в файл')
+    parser.add_argument('--source-priority', nargs='+', default=None,
+                       help='Источники по убыванию приоритета при слиянии дубликатов по ИНН')
+    parser.add_argument('--concat-evidence', action='store_true',
+                       help='Объединять доказательства CAT из дубликатов')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Число потоков для анализа сайтов (по умолчанию CONFIG.http_workers)')
+    parser.add_argument('--host-delay', type=float, default=None,
+                       help='Минимальная пауза между запросами к одному хосту, сек')
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                       help='Максимальное число одновременных HTTP-запросов')
+    parser.add_argument('--host-burst', type=int, default=None,
+                       help='Сколько запросов к одному хосту можно отправить подряд без паузы')
+    parser.add_argument('--host-max-rate', type=float, default=None,
+                       help='До какой частоты (запросов/с) можно разгоняться на хостах без ошибок')
+    parser.add_argument('--retries', type=int, default=None,
+                       help='Число повторов при таймаутах, 429 и 5xx')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                       help='Число процессов для анализа страниц (0 - анализ в потоках загрузки)')
+    parser.add_argument('--parse-batch-size', type=int, default=None,
+                       help='Сколько страниц передается процессу-обработчику за раз')
+    parser.add_argument('--cache', default=None,
+                       help='Файл дискового кэша HTTP-ответов (SQLite), например data/http_cache.sqlite')
+    parser.add_argument('--cache-ttl', type=int, default=None,
+                       help='Время жизни записи кэша до условной перепроверки, сек')
+    parser.add_argument('--cache-max-mb', type=int, default=None,
+                       help='Максимальный размер кэша, МБ')
+    parser.add_argument('--max-page-kb', type=int, default=None,
+                       help='Сколько КБ страницы читать не больше')
+    parser.add_argument('--early-stop-terms', type=int, default=None,
+                       help='Прекращать загрузку страницы после стольких найденных терминов CAT с продуктом '
+                            '(по умолчанию 0 - не прекращать); такие страницы не попадают в кэш HTTP')
+    parser.add_argument('--text-extractor', default=None, choices=['auto', 'lxml', 'bs4'],
+                       help='Разборщик HTML для извлечения текста страниц (auto - lxml, если установлен)')
+    parser.add_argument('--page-store', nargs='?', const='data/pages.sqlite', default=None, metavar='PATH',
+                       help='Сохранять загруженные страницы (сжатые, одинаковые - один раз) для --reanalyze; '
+                            'по умолчанию data/pages.sqlite; раннюю остановку чтения отключает')
+    parser.add_argument('--reanalyze', nargs='?', const='', default=None, metavar='INPUT',
+                       help='Заново найти признаки CAT по сохраненным страницам без загрузки сайтов; '
+                            'читает INPUT (по умолчанию --output) и пишет в --output')
+    parser.add_argument('--text-index', nargs='?', const='data/text_index.sqlite', default=None, metavar='PATH',
+                       help='Пополнять индекс текста сайтов для --query (по умолчанию data/text_index.sqlite); '
+                            'вместе с --reanalyze индекс строится по сохраненным страницам')
+    parser.add_argument('--query', default=None,
+                       help='Найти компании по тексту сайтов: термин, "фраза", префикс*, AND/OR/NOT и скобки')
+    parser.add_argument('--query-limit', type=int, default=50,
+                       help='Сколько компаний выводить для --query')
+    parser.add_argument('--state', default=None,
+                       help='Файл SQLite с прогрессом анализа сайтов (с --resume по умолчанию '
+                            'data/run_state.sqlite); без --state и --resume прогресс не сохраняется')
+    parser.add_argument('--resume', action='store_true',
+                       help='Продолжить прерванный прогон, пропуская уже проанализированные сайты; '
+                            'сбор, очистка и классификация выполняются заново')
+    
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                       help='Уровень журнала; DEBUG выводит каждую исключенную компанию и каждый сайт')
+    parser.add_argument('--log-json', action='store_true',
+                       help='Журнал в виде JSON-строк (по одной записи на строку)')
+    parser.add_argument('--log-file', default=None,
+                       help='Писать журнал в файл вместо stderr')
+    parser.add_argument('--metrics-out', default=None,
+                       help='Сохранить метрики прогона: .prom/.txt - формат Prometheus, иначе JSON')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                       help='Отдавать /metrics и /metrics.json на 127.0.0.1:PORT во время прогона')
+    parser.add_argument('--shard', default=None, metavar='I/N',
+                       help='Обрабатывать только компании шарда I из N (по хэшу ИНН, I от 0); '
+                            'к --output и --state добавляется .shard-I-of-N')
+    parser.add_argument('--merge', nargs='+', default=None, metavar='INPUT',
+                       help='Слить файлы результатов шардов (можно шаблоны *) в --output без дубликатов по ИНН')
+    parser.add_argument('--group-by', nargs='+', default=None, metavar='COLUMN',
+                       help='Для --analyze: сводка по сочетаниям значений столбцов (okved - класс ОКВЭД)')
+    parser.add_argument('--where', action='append', default=None, metavar='COLUMN=VALUE',
+                       help='Для --analyze: учитывать только строки с такими значениями (можно "!=" и "a,b")')
+    parser.add_argument('--revenue-min', type=float, default=None,
+                       help='Для --analyze: учитывать только выручку не меньше этой')
+    parser.add_argument('--revenue-max', type=float, default=None,
+                       help='Для --analyze: учитывать только выручку не больше этой')
+    parser.add_argument('--top', type=int, default=20,
+                       help='Для --analyze: сколько строк показывать в каждой разбивке')
+    parser.add_argument('--analyze-json', default=None,
+                       help='Для --analyze: сохранить сводку в JSON')
+    parser.add_argument('--profile', nargs='?', const='data/profile', default=None, metavar='DIR',
+                       help='Профилировать этапы: pstats, время wall/CPU, пик памяти и стеки для flamegraph '
+                            '(по умолчанию в data/profile). С --stream pstats и пик памяти - общие для этапа '
+                            'stream, время и стеки - по каждому этапу')
+    parser.add_argument('--profile-interval', type=float, default=0.005,
+                       help='Интервал сэмплирования стеков для --profile, с')
+    parser.add_argument('--profile-no-memory', action='store_true',
+                       help='Не включать tracemalloc: меньше замедление, но без пика памяти')
     
     args = parser.parse_args()
     
-    print(f"Отладка: Аргументы - {args}")
+    from src.utils.logging_setup import configure_logging
+    configure_logging(args.log_level, json_lines=args.log_json, filename=args.log_file)
+    
+    logger.debug("Текущая директория: %s", os.getcwd())
+    logger.debug("Файл main.py: %s", os.path.abspath(__file__))
+    logger.debug("Аргументы: %s", args)
+    
+    metrics_server = None
+    if args.metrics_port:
+        from src.utils.metrics import serve_metrics
+        metrics_server = serve_metrics(args.metrics_port)
+        print(f"Метрики: http://127.0.0.1:{args.metrics_port}/metrics")
+    
+    configure_http_cache(args.cache, args.cache_ttl, args.cache_max_mb)
+    configure_dedup(args.source_priority, args.concat_evidence)
+    configure_registry(args.registry, args.registry_okved, args.registry_revenue_unit, args.registry_encoding)
+    configure_financials(args.financials or ('data/financials.sqlite' if args.build_financials else None))
+    configure_page_fetch(args.max_page_kb, args.early_stop_terms, args.text_extractor)
+    configure_text_index(args.text_index or ('data/text_index.sqlite' if args.query else None),
+                         keep_early_stop=args.early_stop_terms is not None)
+    configure_page_store(args.page_store if args.reanalyze is None else args.page_store or 'data/pages.sqlite',
+                         keep_early_stop=args.early_stop_terms is not None)
+    configure_rate_limits(args.host_burst, args.host_max_rate, args.retries)
+    args.state = args.state or ('data/run_state.sqlite' if args.resume else None)
+    
+    if args.profile:
+        from src.utils.profiler import start_profiling
+        start_profiling(args.profile, args.profile_interval, trace_memory=not args.profile_no_memory)
+    
+    shard = None
+    if args.shard:
+        from src.processors.sharding import ShardSpec
+        shard = ShardSpec.parse(args.shard)
+        args.output = shard.path_for(args.output)
+        if args.state:
+            args.state = shard.path_for(args.state)
+            print(f"Шард {shard}: результат в {args.output}, состояние в {args.state}")
+        else:
+            print(f"Шард {shard}: результат в {args.output}")
     
     try:
-        if args.collect:
-            collect_and_process_data(args.output, args.sources)
+        process = stream_and_process_data if args.stream else collect_and_process_data
+        website_options = dict(workers=args.workers, host_delay=args.host_delay, max_in_flight=args.max_in_flight,
+                               state_path=args.state, resume=args.resume,
+                               parse_workers=args.parse_workers, parse_batch_size=args.parse_batch_size,
+                               shard=shard)
+        if args.build_financials:
+            build_financials_index(args.build_financials, args.registry_encoding, args.registry_revenue_unit)
+        elif args.query:
+            query_text_index(args.query, args.query_limit)
+        elif args.merge:
+            merge_result_files(args.merge, args.output)
+        elif args.reanalyze is not None:
+            reanalyze_results(args.reanalyze or args.output, args.output, args.workers,
+                              args.parse_workers, args.parse_batch_size)
+        elif args.collect:
+            process(args.output, args.sources, **website_options)
         elif args.analyze:
-            analyze_existing_data(args.output)
+            analyze_existing_data(args.output, args.group_by, args.where, args.revenue_min, args.revenue_max,
+                                  args.top, args.analyze_json)
         else:
-            collect_and_process_data(args.output, args.sources)
+            process(args.output, args.sources, **website_options)
     except Exception as e:
-        print(f"Критическая ошибка: {e}")
-        print("Полная трассировка:")
-        traceback.print_exc()
+        logger.exception("Критическая ошибка: %s", e)
+    finally:
+        if args.profile:
+            from src.utils.profiler import stop_profiling
+            summary_path = stop_profiling()
+            print(f"Профиль сохранен в {os.path.dirname(summary_path)}")
+        if args.metrics_out:
+            from src.utils.metrics import METRICS
+            METRICS.write(args.metrics_out)
+            print(f"Метрики сохранены в {args.metrics_out}")
+        if metrics_server:
+            metrics_server.shutdown()
+
+def configure_http_cache(path: Optional[str], ttl: Optional[int] = None, max_mb: Optional[int] = None):
+    from config.settings import CONFIG
+    
+    if path:
+        CONFIG.http_cache_path = path
+    if ttl is not None:
+        CONFIG.http_cache_ttl = ttl
+    if max_mb is not None:
+        CONFIG.http_cache_max_mb = max_mb
+
+def configure_dedup(source_priority: Optional[List[str]], concat_evidence: bool = False):
+    from config.settings import CONFIG
+    
+    if source_priority:
+        CONFIG.dedup_source_priority = source_priority
+    if concat_evidence:
+        CONFIG.dedup_concat_evidence = True
+
+def configure_registry(path: Optional[str], okved_codes: Optional[List[str]] = None,
+                       revenue_unit: Optional[float] = None, encoding: Optional[str] = None):
+    from config.settings import CONFIG
+    
+    if path:
+        CONFIG.registry_path = path
+    if okved_codes is not None:
+        CONFIG.registry_okved_codes = okved_codes
+    if revenue_unit is not None:
+        CONFIG.registry_revenue_unit = revenue_unit
+    if encoding is not None:
+        CONFIG.registry_encoding = encoding
+
+def configure_financials(path: Optional[str]):
+    from config.settings import CONFIG
+    
+    if path:
+        CONFIG.financials_path = path
+
+def configure_page_fetch(max_page_kb: Optional[int] = None, early_stop_terms: Optional[int] = None,
+                         text_extractor: Optional[str] = None):
+    from config.settings import CONFIG
+    
+    if max_page_kb is not None:
+        CONFIG.max_page_bytes = max_page_kb * 1024
+    if early_stop_terms is not None:
+        CONFIG.early_stop_terms = early_stop_terms
+    if text_extractor is not None:
+        CONFIG.text_extractor = text_extractor
+
+def configure_page_store(path: Optional[str], keep_early_stop: bool = False):
+    from config.settings import CONFIG
+    
+    if not path:
+        return
+    CONFIG.page_store_path = path
+    # Для повторного анализа нужна страница целиком, а не до первых найденных терминов
+    if not keep_early_stop:
+        CONFIG.early_stop_terms = 0
+
+def configure_text_index(path: Optional[str], keep_early_stop: bool = False):
+    from config.settings import CONFIG
+    
+    if not path:
+        return
+    CONFIG.text_index_path = path
+    # В индекс должен попасть текст страницы целиком
+    if not keep_early_stop:
+        CONFIG.early_stop_terms = 0
+
+def configure_rate_limits(host_burst: Optional[int] = None, host_max_rate: Optional[float] = None,
+                          retries: Optional[int] = None):
+    from config.settings import CONFIG
+    
+    if host_burst is not None:
+        CONFIG.host_burst = host_burst
+    if host_max_rate is not None:
+        CONFIG.host_max_rate = host_max_rate
+    if retries is not None:
+        CONFIG.http_retries = retries
+
+def report_host_stats(limit: int = 10):
+    from src.utils.http_client import shared_client_stats
+    from src.utils.dns_cache import dns_cache_stats
+    
+    stats = shared_client_stats()
+    if not stats:
+        return
+    
+    busiest = sorted(stats.items(), key=lambda item: item[1]['requests'], reverse=True)[:limit]
+    print(f"\nЗапросы по хостам (всего хостов: {len(stats)}):")
+    for host, host_stats in busiest:
+        print(f"   {host}: запросов {host_stats['requests']}, ошибок {host_stats['errors']}, "
+              f"429/503: {host_stats['throttled']}, повторов {host_stats['retries']}, "
+              f"ожидание {host_stats['wait_seconds']:.1f} с, частота {host_stats['rate']:.2f}/с")
+    
+    dns = dns_cache_stats()
+    print(f"   Кэш DNS: попаданий {dns['hits']}, обращений к резолверу {dns['misses']}")
 
-def collect_and_process_data(output_path: str, sources: List[str]):
+def report_http_cache():
+    from src.utils.http_client import get_response_cache
+    
+    cache = get_response_cache()
+    if not cache:
+        return
+    
+    stats = cache.stats()
+    print(f"\nHTTP-кэш {cache.path}: попаданий {stats['hits']}, "
+          f"подтверждено 304: {stats['revalidated']}, промахов {stats['misses']}, "
+          f"размер {stats['bytes'] / 1024 / 1024:.1f} МБ")
+
+def report_page_store():
+    from src.utils.page_store import get_page_store
+    
+    store = get_page_store()
+    if not store:
+        return
+    
+    stats = store.stats()
+    print(f"\nХранилище страниц {store.path}: страниц {stats['pages']}, различных {stats['unique_pages']}, "
+          f"{stats['bytes'] / 1024 / 1024:.1f} МБ текста, на диске {stats['stored_bytes'] / 1024 / 1024:.1f} МБ")
+
+def report_financials():
+    from src.utils.financials_index import get_financials_index
+    from src.processors.revenue_validator import FILLED
+    
+    index = get_financials_index()
+    if not index:
+        return
+    
+    stats = index.stats()
+    print(f"   Справочник {index.path}: запросов {stats['lookups']}, найдено {stats['found']}, "
+          f"из кэша {stats['cache_hits']}; заполнена выручка: {FILLED.value(field='revenue'):.0f}, "
+          f"численность: {FILLED.value(field='employees'):.0f}")
+
+def build_financials_index(source_path: str, encoding: Optional[str] = None, revenue_unit: Optional[float] = None):
+    import time
+    from src.utils.financials_index import get_financials_index
+    
+    if not os.path.exists(source_path):
+        print(f"Файл не найден: {source_path}")
+        return
+    
+    index = get_financials_index()
+    print(f"Построение справочника {index.path} из {source_path}...")
+    started = time.perf_counter()
+    rows = index.build(source_path, encoding=encoding or 'utf-8', revenue_unit=revenue_unit)
+    print(f"Прочитано строк: {rows}, ИНН в справочнике: {len(index)}, за {time.perf_counter() - started:.1f} с")
+
+def report_text_extraction():
+    from src.processors.text_extractor import extraction_throughput
+    
+    for backend, stats in extraction_throughput().items():
+        speed = f"{stats['mb_per_second']:.1f} МБ/с" if stats['mb_per_second'] else '-'
+        print(f"\nИзвлечение текста ({backend}): страниц {stats['pages']:.0f}, "
+              f"{stats['megabytes']:.1f} МБ HTML за {stats['seconds']:.2f} с, {speed}")
+
+def create_website_parser(workers: Optional[int] = None, host_delay: Optional[float] = None,
+                          max_in_flight: Optional[int] = None, state_path: Optional[str] = None,
+                          resume: bool = False, parse_workers: Optional[int] = None,
+                          parse_batch_size: Optional[int] = None):
+    from src.data_collectors.website_parser import WebsiteParser
+    from src.utils.state_store import StateStore
+    
+    state_store = None
+    if state_path:
+        state_store = StateStore(state_path)
+        if resume:
+            done = state_store.completed_count(WebsiteParser.STATE_STAGE)
+            print(f"Продолжаем прогон из {state_path}: уже проанализировано сайтов: {done}")
+        else:
+            state_store.reset()
+    
+    return WebsiteParser(max_workers=workers, per_host_delay=host_delay, max_in_flight=max_in_flight,
+                         state_store=state_store, resume=resume, parse_workers=parse_workers,
+                         parse_batch_size=parse_batch_size)
+
+def collect_and_process_data(output_path: str, sources: List[str], workers: Optional[int] = None,
+                             host_delay: Optional[float] = None, max_in_flight: Optional[int] = None,
+                             state_path: Optional[str] = None, resume: bool = False,
+                             parse_workers: Optional[int] = None, parse_batch_size: Optional[int] = None,
+                             shard=None):
     print("Начинаем сбор и обработку данных...")
     
     output_dir = os.path.dirname(output_path)
@@ -47,65 +390,114 @@ def collect_and_process_data(output_path: str, sources: List[str]):
     try:
         from src.data_collectors.rusprofile_collector import RusprofileCollector
         from src.data_collectors.catalog_scanner import CatalogScanner
-        from src.data_collectors.website_parser import WebsiteParser
+        from src.data_collectors.company_table import CompanyTable
         from src.processors.data_cleaner import DataCleaner
+        from src.processors.deduplicator import Deduplicator
         from src.processors.revenue_validator import RevenueValidator
         from src.processors.cat_classifier import CatClassifier
-        from src.utils.csv_handler import CsvHandler
+        from src.utils import results_io
+        from src.utils.profiler import profile_stage
         from config.settings import CONFIG
         
         all_companies = []
         
         if 'rusprofile' in sources or 'all' in sources:
             print("\nСбор данных с Rusprofile...")
-            rusprofile_collector = RusprofileCollector()
-            rusprofile_companies = rusprofile_collector.collect_companies()
+            with profile_stage('collect_rusprofile'):
+                rusprofile_collector = RusprofileCollector()
+                rusprofile_companies = rusprofile_collector.collect_companies()
             all_companies.extend(rusprofile_companies)
             print(f"   Найдено компаний: {len(rusprofile_companies)}")
         
         if 'catalog' in sources or 'all' in sources:
             print("\nСбор данных из каталогов...")
-            catalog_scanner = CatalogScanner()
-            catalog_companies = catalog_scanner.collect_companies()
+            with profile_stage('collect_catalog'):
+                catalog_scanner = CatalogScanner()
+                catalog_companies = catalog_scanner.collect_companies()
             all_companies.extend(catalog_companies)
             print(f"   Найдено компаний: {len(catalog_companies)}")
         
-        print(f"Отладка: Всего собрано компаний: {len(all_companies)}")
+        registry_collector = create_registry_collector(sources)
+        if registry_collector:
+            print(f"\nСбор данных из реестра {registry_collector.path}...")
+            with profile_stage('collect_registry'):
+                registry_companies = registry_collector.collect_companies()
+            all_companies.extend(registry_companies)
+            report_registry(registry_collector)
+        
+        logger.debug("Всего собрано компаний: %d", len(all_companies))
+        
+        if shard:
+            with profile_stage('shard'):
+                all_companies = shard.filter(all_companies)
+            print(f"   В шарде {shard}: {len(all_companies)}")
+        
+        deduplicator = Deduplicator()
+        with profile_stage('dedup'):
+            all_companies = deduplicator.deduplicate(all_companies)
+        print(f"   После удаления дубликатов по ИНН: {len(all_companies)} (дубликатов: {deduplicator.duplicates})")
         
         if not all_companies:
             print("Не удалось собрать данные из указанных источников")
+            if shard:
+                write_empty_result(output_path, shard)
+                return
             print("Создаем демонстрационный файл...")
             create_demo_file(output_path)
             return
         
         print("\nОчистка данных...")
-        cleaned_companies = DataCleaner.clean_company_data(all_companies)
+        with profile_stage('clean'):
+            cleaned_companies = DataCleaner.clean_company_data(all_companies)
         print(f"   После очистки: {len(cleaned_companies)}")
         
+        with profile_stage('table'):
+            company_table = CompanyTable.from_companies(cleaned_companies)
+        del cleaned_companies
+        
         print("\nФильтрация по выручке...")
-        revenue_filtered = RevenueValidator.filter_by_revenue(cleaned_companies)
-        print(f"   После фильтрации по выручке: {len(revenue_filtered)}")
+        with profile_stage('revenue'):
+            company_table = RevenueValidator.filter_table(company_table)
+        report_financials()
+        print(f"   После фильтрации по выручке: {len(company_table)}")
         
         print("\nКлассификация по CAT-системам...")
-        cat_classified = CatClassifier.classify_companies(revenue_filtered)
-        print(f"   После классификации CAT: {len(cat_classified)}")
+        with profile_stage('cat_classifier'):
+            company_table = CatClassifier.filter_table(company_table)
+        print(f"   После классификации CAT: {len(company_table)}")
+        
+        cat_classified = company_table.to_companies()
         
         if not cat_classified:
+            if shard:
+                write_empty_result(output_path, shard)
+                return
             print("Компании после фильтрации отсутствуют. Создаем демонстрационные данные...")
             create_demo_file(output_path)
             return
         
         print("\nАнализ сайтов компаний...")
-        website_parser = WebsiteParser()
-        final_companies = website_parser.analyze_multiple_companies(cat_classified)
+        website_parser = create_website_parser(workers, host_delay, max_in_flight, state_path, resume,
+                                               parse_workers, parse_batch_size)
+        with profile_stage('website'):
+            final_companies = website_parser.analyze_multiple_companies(cat_classified)
+        if website_parser.resumed:
+            print(f"   Взято из сохраненного состояния: {website_parser.resumed}")
+        
+        if registry_collector:
+            with profile_stage('cat_classifier_website'):
+                final_companies = CatClassifier.classify_after_website(final_companies)
+            print(f"   С признаками CAT на сайте: {len(final_companies)}")
         
         print("\nУлучшение доказательств CAT...")
-        enhanced_companies = CatClassifier.enhance_cat_evidence(final_companies)
+        with profile_stage('enhance'):
+            enhanced_companies = CatClassifier.enhance_cat_evidence(final_companies)
         
         print(f"\nСохранение результата в {output_path}...")
-        print(f"Отладка: Путь к файлу: {os.path.abspath(output_path)}")
+        logger.debug("Путь к файлу: %s", os.path.abspath(output_path))
         
-        CsvHandler.save_companies_to_csv(enhanced_companies, output_path)
+        with profile_stage('save'):
+            results_io.save_companies(enhanced_companies, output_path)
         
         if os.path.exists(output_path):
             file_size = os.path.getsize(output_path)
@@ -113,16 +505,244 @@ def collect_and_process_data(output_path: str, sources: List[str]):
         else:
             print(f"Файл не был создан по пути: {output_path}")
         
+        report_http_cache()
+        report_page_store()
+        report_text_extraction()
+        report_host_stats()
+        
         print("\nАнализ завершен!")
         print(f"Итоговый результат: {len(enhanced_companies)} компаний")
         
     except Exception as e:
-        print(f"Ошибка в процессе обработки: {e}")
-        print("Полная трассировка:")
-        traceback.print_exc()
+        logger.exception("Ошибка в процессе обработки: %s", e)
+        
+        # Демонстрационные строки шарда попали бы в --merge вместе с настоящими
+        if not shard:
+            print("Создаем демонстрационный файл...")
+            create_demo_file(output_path)
+
+def iter_collected_companies(sources: List[str]):
+    from src.data_collectors.rusprofile_collector import RusprofileCollector
+    from src.data_collectors.catalog_scanner import CatalogScanner
+    
+    if 'rusprofile' in sources or 'all' in sources:
+        print("\nСбор данных с Rusprofile...")
+        yield from RusprofileCollector().iter_companies()
+    
+    if 'catalog' in sources or 'all' in sources:
+        print("\nСбор данных из каталогов...")
+        yield from CatalogScanner().iter_companies()
+    
+    registry_collector = create_registry_collector(sources)
+    if registry_collector:
+        print(f"\nСбор данных из реестра {registry_collector.path}...")
+        yield from registry_collector.iter_companies()
+        report_registry(registry_collector)
+
+def create_registry_collector(sources: List[str]):
+    """Коллектор реестра, если он выбран в sources (или all) и задан --registry."""
+    from config.settings import CONFIG
+    
+    if 'registry' not in sources and 'all' not in sources:
+        return None
+    if not CONFIG.registry_path:
+        if 'registry' in sources:
+            print("\nИсточник registry пропущен: не задан файл --registry")
+        return None
+    
+    from src.data_collectors.registry_collector import RegistryCollector
+    # Выручку без данных в реестре может заполнить справочник на этапе revenue
+    return RegistryCollector(CONFIG.registry_path, keep_missing_revenue=bool(CONFIG.financials_path))
+
+def report_registry(collector):
+    rejected = ', '.join(f"{reason}: {count}" for reason, count in sorted(collector.rejected.items()))
+    print(f"   Прочитано записей: {collector.rows_read} ({collector.bytes_read / 1024 / 1024:.1f} МБ), "
+          f"подходящих: {collector.rows_read - sum(collector.rejected.values())}"
+          + (f"; отброшено - {rejected}" if rejected else ''))
+
+def stream_and_process_data(output_path: str, sources: List[str], workers: Optional[int] = None,
+                            host_delay: Optional[float] = None, max_in_flight: Optional[int] = None,
+                            state_path: Optional[str] = None, resume: bool = False,
+                            parse_workers: Optional[int] = None, parse_batch_size: Optional[int] = None,
+                            shard=None):
+    """Потоковый вариант collect_and_process_data.
+
+    Этапы соединены генераторами, поэтому в памяти находятся только
+    компании, которые сейчас обрабатываются, а строки результата
+    появляются в файле сразу после прохождения всех этапов.
+    """
+    print("Начинаем потоковый сбор и обработку данных...")
+    
+    try:
+        from src.processors.data_cleaner import DataCleaner
+        from src.processors.deduplicator import Deduplicator
+        from src.processors.revenue_validator import RevenueValidator
+        from src.processors.cat_classifier import CatClassifier
+        from src.utils import results_io
+        from src.utils.profiler import profile_iter, profile_stage
+        
+        website_parser = create_website_parser(workers, host_delay, max_in_flight, state_path, resume,
+                                               parse_workers, parse_batch_size)
         
-        print("Создаем демонстрационный файл...")
-        create_demo_file(output_path)
+        deduplicator = Deduplicator()
+        
+        # Этапы работают внутри одного этапа stream; profile_iter дает их время по отдельности
+        pipeline = profile_iter('collect', iter_collected_companies(sources))
+        if shard:
+            pipeline = profile_iter('shard', shard.iter_filter(pipeline))
+        pipeline = profile_iter('dedup', deduplicator.iter_deduplicate(pipeline))
+        pipeline = profile_iter('clean', DataCleaner.iter_clean_company_data(pipeline))
+        pipeline = profile_iter('revenue', RevenueValidator.iter_filter_by_revenue(pipeline))
+        pipeline = profile_iter('cat_classifier', CatClassifier.iter_classify_companies(pipeline))
+        pipeline = profile_iter('website', website_parser.iter_analyze_companies(pipeline))
+        pipeline = profile_iter('cat_classifier_website', CatClassifier.iter_classify_after_website(pipeline))
+        pipeline = profile_iter('enhance', CatClassifier.iter_enhance_cat_evidence(pipeline))
+        
+        with results_io.open_writer(output_path) as writer, profile_stage('stream'):
+            for company in pipeline:
+                writer.write(company)
+                logger.debug("Записана компания %d: %s", writer.count, company.name)
+        
+        if writer.count == 0:
+            if shard:
+                print(f"В шарде {shard} компаний нет, файл результата пустой")
+                return
+            print("Компании после фильтрации отсутствуют. Создаем демонстрационные данные...")
+            create_demo_file(output_path)
+            return
+        
+        print(f"\nОтброшено дубликатов по ИНН: {deduplicator.duplicates}")
+        report_financials()
+        if website_parser.resumed:
+            print(f"Взято из сохраненного состояния: {website_parser.resumed}")
+        report_http_cache()
+        report_page_store()
+        report_text_extraction()
+        report_host_stats()
+        
+        print("\nАнализ завершен!")
+        print(f"Итоговый результат: {writer.count} компаний")
+        
+    except Exception as e:
+        logger.exception("Ошибка в процессе обработки: %s", e)
+
+def query_text_index(query: str, limit: int = 50):
+    import time
+    from config.settings import CONFIG
+    from src.utils.text_index import get_text_index
+    
+    if not os.path.exists(CONFIG.text_index_path):
+        print(f"Индекс не найден: {CONFIG.text_index_path} (создается при --collect/--reanalyze с --text-index)")
+        return
+    index = get_text_index()
+    
+    started = time.perf_counter()
+    try:
+        matches = index.search(query)
+    except ValueError as e:
+        print(f"Ошибка в запросе: {e}")
+        return
+    elapsed = time.perf_counter() - started
+    
+    stats = index.stats()
+    print(f"Запрос: {query}")
+    print(f"Найдено компаний: {len(matches)} из {stats['docs']} сайтов за {elapsed * 1000:.1f} мс")
+    for match in matches[:limit]:
+        print(f"   {match.inn or '-':12} {match.name}  {match.url}")
+    if len(matches) > limit:
+        print(f"   ... еще {len(matches) - limit} (--query-limit)")
+
+def reanalyze_results(input_path: str, output_path: str, workers: Optional[int] = None,
+                      parse_workers: Optional[int] = None, parse_batch_size: Optional[int] = None):
+    """Повторяет анализ сайтов и улучшение доказательств CAT по страницам из
+    хранилища: после изменения ключевых слов, продуктов или фраз в
+    config/settings.py не нужно заново обходить сайты."""
+    from src.data_collectors.website_parser import WEBSITE_PAGES, WebsiteParser
+    from src.processors.cat_classifier import CatClassifier
+    from src.utils import results_io
+    from src.utils.page_store import get_page_store
+    from src.utils.profiler import profile_stage
+    
+    if not os.path.exists(input_path):
+        print(f"Файл не найден: {input_path}")
+        return
+    
+    store = get_page_store()
+    print(f"Повторный анализ {input_path} по страницам из {store.path}...")
+    
+    # Анализ без сети упирается в процессор, а не в ожидание ответов
+    website_parser = WebsiteParser(max_workers=workers or 1, parse_workers=parse_workers,
+                                   parse_batch_size=parse_batch_size, page_store=store, offline=True)
+    
+    before = {}
+    
+    def remember(companies):
+        for company in companies:
+            before[id(company)] = (company.cat_evidence, company.cat_product)
+            yield company
+    
+    pipeline = remember(results_io.iter_companies(input_path))
+    pipeline = website_parser.iter_analyze_companies(pipeline)
+    pipeline = CatClassifier.iter_enhance_cat_evidence(pipeline)
+    
+    # Результат пишется рядом и заменяет файл целиком, поэтому INPUT может совпадать с --output
+    root, ext = os.path.splitext(output_path)
+    tmp_path = f"{root}.reanalyze-tmp{ext}"
+    changed = 0
+    with profile_stage('reanalyze'), results_io.open_writer(tmp_path) as writer:
+        for company in pipeline:
+            if before.pop(id(company)) != (company.cat_evidence, company.cat_product):
+                changed += 1
+            writer.write(company)
+    os.replace(tmp_path, output_path)
+    
+    print(f"Страниц из хранилища: {WEBSITE_PAGES.value(result='stored'):.0f}, "
+          f"нет в хранилище: {WEBSITE_PAGES.value(result='not_stored'):.0f}")
+    report_text_extraction()
+    print(f"Итоговый результат: {writer.count} компаний, изменились доказательства или продукт: {changed}")
+    print(f"Сохранено в {output_path}")
+
+def write_empty_result(output_path: str, shard):
+    """Пустой файл результата шарда: --merge ожидает файл от каждого шарда."""
+    from src.utils import results_io
+    
+    with results_io.open_writer(output_path):
+        pass
+    print(f"В шарде {shard} компаний нет, файл результата пустой: {output_path}")
+
+def merge_result_files(inputs: List[str], output_path: str):
+    """Сливает результаты шардов в один файл; записи с одним ИНН
+    объединяются по тем же правилам, что и при сборе."""
+    import glob
+    from itertools import chain
+    from src.processors.deduplicator import Deduplicator
+    from src.processors.sharding import missing_shards
+    from src.utils import results_io
+    
+    paths = []
+    for pattern in inputs:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(path for path in matches
+                     if path not in paths and os.path.abspath(path) != os.path.abspath(output_path))
+    
+    missing_files = [path for path in paths if not os.path.exists(path)]
+    if not paths or missing_files:
+        print(f"Файлы для слияния не найдены: {', '.join(missing_files or inputs)}")
+        return
+    
+    missing = missing_shards(paths)
+    if missing:
+        print(f"⚠ Нет результатов шардов: {', '.join(missing)}")
+    
+    print(f"Слияние {len(paths)} файлов в {output_path}...")
+    deduplicator = Deduplicator()
+    companies = deduplicator.deduplicate(chain.from_iterable(results_io.iter_companies(path) for path in paths))
+    
+    with results_io.open_writer(output_path) as writer:
+        for company in companies:
+            writer.write(company)
+    
+    print(f"Итоговый результат: {writer.count} компаний (дубликатов по ИНН: {deduplicator.duplicates})")
 
 def create_demo_file(output_path: str):
     try:
@@ -170,44 +790,80 @@ def create_demo_file(output_path: str):
         ]
         
         import pandas as pd
+        from src.utils import results_io
+        
         df = pd.DataFrame(demo_data)
-        df.to_csv(output_path, index=False, encoding='utf-8')
+        results_io.save_dataframe(df, output_path, quiet=True)
         
         print(f"Демонстрационный файл создан: {output_path}")
         
     except Exception as e:
         print(f"Ошибка при создании демонстрационного файла: {e}")
 
-def analyze_existing_data(csv_path: str):
+def analyze_existing_data(csv_path: str, group_by: Optional[List[str]] = None,
+                          where: Optional[List[str]] = None, revenue_min: Optional[float] = None,
+                          revenue_max: Optional[float] = None, top: int = 20,
+                          json_path: Optional[str] = None):
+    """Сводка по файлу результатов за один проход: строки читаются потоком,
+    поэтому размер файла не ограничен памятью."""
     print(f"Анализ существующих данных из {csv_path}...")
     
     try:
-        from src.utils.csv_handler import CsvHandler
+        from src.utils import results_io
+        from src.utils.analytics import ResultsAggregator, RowFilter
+        
+        if not os.path.exists(csv_path):
+            print(f"Файл не найден: {csv_path}")
+            return
+        
+        aggregator = ResultsAggregator(group_by=group_by or (), filters=[RowFilter(e) for e in where or ()],
+                                       revenue_min=revenue_min, revenue_max=revenue_max)
+        aggregator.consume(results_io.iter_rows(csv_path, aggregator.columns()))
         
-        companies = CsvHandler.load_companies_from_csv(csv_path)
-        if not companies:
+        total = aggregator.total
+        if aggregator.rows_read == 0:
             print("Не удалось загрузить данные")
             return
         
-        print(f"Загружено компаний: {len(companies)}")
+        print(f"Загружено компаний: {total.count}")
+        if total.count != aggregator.rows_read:
+            print(f"   (из {aggregator.rows_read} строк файла с учетом фильтров)")
         
-        revenues = [c.revenue for c in companies if c.revenue]
-        if revenues:
-            print(f"Средняя выручка: {sum(revenues) / len(revenues):,.0f} ₽")
-            print(f"Максимальная выручка: {max(revenues):,.0f} ₽")
-            print(f"Минимальная выручка: {min(revenues):,.0f} ₽")
+        if total.revenue_count:
+            print(f"Средняя выручка: {total.revenue_mean:,.0f} ₽")
+            print(f"Максимальная выручка: {total.revenue_max:,.0f} ₽")
+            print(f"Минимальная выручка: {total.revenue_min:,.0f} ₽")
+            percentiles = ", ".join(f"{name} {value:,.0f} ₽" for name, value in total.percentiles().items())
+            print(f"Перцентили выручки (±1%): {percentiles}")
         
-        sources = {}
-        for company in companies:
-            source = company.source
-            sources[source] = sources.get(source, 0) + 1
+        titles = {'source': 'источникам', 'cat_product': 'продуктам CAT', 'okved': 'классам ОКВЭД'}
+        for name, table in aggregator.by_dimension.items():
+            print(f"\nСтатистика по {titles.get(name, name)}:")
+            _print_breakdown(table, top)
+        
+        if aggregator.group_by:
+            print(f"\nГруппы по {', '.join(aggregator.group_by)}:")
+            _print_breakdown({' / '.join(part or '(не указано)' for part in key): stats
+                              for key, stats in aggregator.groups.items()}, top)
         
-        print("\nСтатистика по источникам:")
-        for source, count in sources.items():
-            print(f"   {source}: {count}")
+        if json_path:
+            import json
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(aggregator.to_dict(), f, ensure_ascii=False, indent=2)
+            print(f"\nСводка сохранена в {json_path}")
             
     except Exception as e:
         print(f"Ошибка при анализе данных: {e}")
 
+def _print_breakdown(table, top: int):
+    rows = sorted(table.items(), key=lambda item: item[1].count, reverse=True)
+    for key, stats in rows[:top]:
+        line = f"   {key or '(не указано)'}: {stats.count}"
+        if stats.revenue_count:
+            line += f", выручка средняя {stats.revenue_mean:,.0f} ₽, медиана {stats.quantile(0.5):,.0f} ₽"
+        print(line)
+    if len(rows) > top:
+        print(f"   ... еще {len(rows) - top} (всего {sum(stats.count for _, stats in rows[top:])} компаний)")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,53 +1,142 @@
-from typing import List
+import logging
+from typing import Iterable, Iterator, List
+import numpy as np
 from ..data_collectors.base import CompanyData
+from ..data_collectors.company_table import CompanyTable
+from ..utils.metrics import StageTally, count_stage, reject
+from .cat_matcher import get_cat_matcher
 from config.settings import CONFIG
 
+logger = logging.getLogger(__name__)
+
+STAGE = 'cat_classifier'
+WEBSITE_STAGE = 'cat_classifier_website'
+
 class CatClassifier:
     @staticmethod
     def classify_companies(companies: List[CompanyData]) -> List[CompanyData]:
-        classified_companies = []
-        
-        for company in companies:
-            if CatClassifier._has_cat_system(company):
-                classified_companies.append(company)
-            else:
-                print(f"Компания {company.name} исключена: не найдены признаки CAT-систем")
+        return list(CatClassifier.iter_classify_companies(companies))
+    
+    @staticmethod
+    def iter_classify_companies(companies: Iterable[CompanyData]) -> Iterator[CompanyData]:
+        """Компании из CONFIG.website_classified_sources проходят без проверки:
+        для них она повторяется после анализа сайтов (iter_classify_after_website)."""
+        website_sources = set(CONFIG.website_classified_sources)
+        tally = StageTally(STAGE)
+        try:
+            for company in companies:
+                if company.source in website_sources or CatClassifier._has_cat_system(company):
+                    tally.passed()
+                    yield company
+                else:
+                    tally.reject('no_cat_indicators')
+                    CatClassifier._log_rejected(company.name)
+        finally:
+            tally.flush()
+    
+    @staticmethod
+    def cat_mask(table: CompanyTable) -> np.ndarray:
+        """Источники из CONFIG.website_classified_sources отбираются сравнением
+        кодов, матчер запускается только для остальных строк и один раз на
+        каждое различное сочетание названия, доказательств и продукта."""
+        mask = np.zeros(len(table), dtype=bool)
+        for source in CONFIG.website_classified_sources:
+            mask |= table.category_mask('source', source)
+
+        rows = np.flatnonzero(~mask)
+        if not len(rows):
+            return mask
+        # Код -1 (нет продукта) попадает на последний элемент - None
+        products = np.array(table.categories['cat_product'].values + [None], dtype=object)
+        product_codes = table.codes['cat_product'][rows]
+        checked = {}
+        found = []
+        for name, evidence, code, product in zip(table.text['name'][rows].tolist(),
+                                                 table.text['cat_evidence'][rows].tolist(),
+                                                 product_codes.tolist(), products[product_codes].tolist()):
+            key = (name, evidence, code)
+            result = checked.get(key)
+            if result is None:
+                result = checked[key] = CatClassifier._has_cat_indicators(name, evidence, product)
+            found.append(result)
+        mask[rows] = found
+        return mask
+    
+    @staticmethod
+    def filter_table(table: CompanyTable) -> CompanyTable:
+        mask = CatClassifier.cat_mask(table)
+        kept = int(mask.sum())
+        count_stage(STAGE, len(table), kept)
+        reject(STAGE, 'no_cat_indicators', len(table) - kept)
         
-        return classified_companies
+        if logger.isEnabledFor(logging.DEBUG):
+            for row in np.flatnonzero(~mask):
+                CatClassifier._log_rejected(table.text['name'][row])
+        return table.filter(mask)
+    
+    @staticmethod
+    def classify_after_website(companies: List[CompanyData]) -> List[CompanyData]:
+        return list(CatClassifier.iter_classify_after_website(companies))
+    
+    @staticmethod
+    def iter_classify_after_website(companies: Iterable[CompanyData]) -> Iterator[CompanyData]:
+        """Проверка признаков CAT для CONFIG.website_classified_sources по
+        доказательствам, найденным на сайте; остальные компании проходят."""
+        website_sources = set(CONFIG.website_classified_sources)
+        tally = StageTally(WEBSITE_STAGE)
+        try:
+            for company in companies:
+                if company.source not in website_sources or CatClassifier._has_cat_system(company):
+                    tally.passed()
+                    yield company
+                else:
+                    tally.reject('no_cat_on_website')
+                    CatClassifier._log_rejected(company.name)
+        finally:
+            tally.flush()
+    
+    @staticmethod
+    def _log_rejected(name: str):
+        logger.debug("Компания %s исключена: не найдены признаки CAT-систем", name,
+                     extra={'stage': STAGE, 'reason': 'no_cat_indicators', 'company': name})
     
     @staticmethod
     def _has_cat_system(company: CompanyData) -> bool:
+        return CatClassifier._has_cat_indicators(company.name, company.cat_evidence, company.cat_product)
+    
+    @staticmethod
+    def _has_cat_indicators(name: str, cat_evidence: str, cat_product: str) -> bool:
         text_to_analyze = " ".join([
-            company.name or "",
-            company.cat_evidence or "",
-            company.cat_product or ""
-        ]).lower()
+            name or "",
+            cat_evidence or "",
+            cat_product or ""
+        ])
+        found_terms = get_cat_matcher().found_terms(text_to_analyze)
         
         cat_indicators = 0
         
         for keyword in CONFIG.cat_keywords:
-            if keyword in text_to_analyze:
+            if keyword in found_terms:
                 cat_indicators += 1
         
         for product in CONFIG.cat_products:
-            if product in text_to_analyze:
+            if product in found_terms:
                 cat_indicators += 2
         
         for phrase in CONFIG.cat_phrases:
-            if phrase in text_to_analyze:
+            if phrase in found_terms:
                 cat_indicators += 1
         
         return cat_indicators >= 2
     
     @staticmethod
     def enhance_cat_evidence(companies: List[CompanyData]) -> List[CompanyData]:
-        enhanced_companies = []
-        
+        return list(CatClassifier.iter_enhance_cat_evidence(companies))
+    
+    @staticmethod
+    def iter_enhance_cat_evidence(companies: Iterable[CompanyData]) -> Iterator[CompanyData]:
         for company in companies:
-            enhanced_company = CatClassifier._enhance_single_company(company)
-            enhanced_companies.append(enhanced_company)
-        
-        return enhanced_companies
+            yield CatClassifier._enhance_single_company(company)
     
     @staticmethod
     def _enhance_single_company(company: CompanyData) -> CompanyData:
@@ -58,8 +147,10 @@ class CatClassifier:
         
         if 'trados' in text_to_analyze:
             company.cat_product = company.cat_product or "Trados"
-            if 'упоминание' not in company.cat_evidence.lower():
-                company.cat_evidence = f"использование {company.cat_product} ({company.cat_evidence})"
+            wrapped = f"использование {company.cat_product} ("
+            # Повторное улучшение (--reanalyze по уже улучшенному файлу) не оборачивает доказательство еще раз
+            if 'упоминание' not in company.cat_evidence.lower() and not company.cat_evidence.startswith(wrapped):
+                company.cat_evidence = f"{wrapped}{company.cat_evidence})"
         elif 'memoq' in text_to_analyze:
             company.cat_product = company.cat_product or "MemoQ"
         elif 'tms' in text_to_analyze:
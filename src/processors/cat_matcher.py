@@ -0,0 +1,170 @@
+"""
+Поиск признаков CAT-систем в тексте за один проход (автомат Ахо–Корасик).
+"""
+from collections import Counter, deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from config.settings import CONFIG, CatConfig
+
+class TermMatch(NamedTuple):
+    start: int
+    end: int
+    term: str
+    category: str
+
+# Окончания, которые отбрасываются у длинных терминов перед поиском:
+# 'локализация' находит и 'локализации', 'translation memory' - 'memories'
+INFLECTED_ENDINGS = 'аяеиоуыэюйьy'
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+def _stem(term: str) -> str:
+    if len(term) > 2 and term[-1] in INFLECTED_ENDINGS and _is_word_char(term[-2]):
+        return term[:-1]
+    return term
+
+class CatMatcher:
+    """Ищет все термины сразу: время поиска линейно по длине текста
+    и не зависит от числа терминов.
+
+    Поиск регистронезависимый, позиции указываются в тексте, приведенном
+    к нижнему регистру. При word_boundaries=True границы слов проверяются
+    по длине термина. Короткие (не длиннее whole_word_max_length, как
+    'tm' и 'tms') засчитываются только целым словом: так 'tm' не находится
+    внутри 'html'. Длинные должны начинаться с начала слова, а конец слова
+    у них может быть любым, и гласная на конце термина не обязательна:
+    'localization' находит 'localizations', 'терминология' - 'терминологией'.
+    При word_boundaries=False термины ищутся как подстроки.
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, str]], word_boundaries: bool = True,
+                 whole_word_max_length: Optional[int] = None):
+        self.word_boundaries = word_boundaries
+        self.whole_word_max_length = (CONFIG.cat_whole_word_max_length if whole_word_max_length is None
+                                      else whole_word_max_length)
+        # (термин, категория, ищется ли целым словом, длина искомой строки)
+        self._terms: List[Tuple[str, str, bool, int]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        seen = set()
+        for term, category in terms:
+            term = term.lower()
+            if not term or (term, category) in seen:
+                continue
+            seen.add((term, category))
+            self._add_term(term, category)
+
+        self._build_failure_links()
+
+    @classmethod
+    def from_config(cls, config: CatConfig = CONFIG, word_boundaries: Optional[bool] = None) -> 'CatMatcher':
+        terms = [(keyword, 'keyword') for keyword in config.cat_keywords]
+        terms += [(product, 'product') for product in config.cat_products]
+        terms += [(phrase, 'phrase') for phrase in config.cat_phrases]
+
+        if word_boundaries is None:
+            word_boundaries = config.cat_word_boundaries
+
+        return cls(terms, word_boundaries=word_boundaries,
+                   whole_word_max_length=config.cat_whole_word_max_length)
+
+    def _add_term(self, term: str, category: str):
+        whole_word = len(term) <= self.whole_word_max_length
+        key = term if whole_word or not self.word_boundaries else _stem(term)
+
+        state = 0
+        for char in key:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+
+        self._output[state].append(len(self._terms))
+        self._terms.append((term, category, whole_word, len(key)))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[TermMatch]:
+        if not text:
+            return []
+
+        text = text.lower()
+        text_length = len(text)
+        goto, fail, output, terms = self._goto, self._fail, self._output, self._terms
+        matches = []
+        state = 0
+
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            if not output[state]:
+                continue
+
+            end = position + 1
+            for term_index in output[state]:
+                term, category, whole_word, length = terms[term_index]
+                start = end - length
+
+                if self.word_boundaries and not self._on_boundaries(text, start, end, text_length, whole_word):
+                    continue
+
+                matches.append(TermMatch(start, end, term, category))
+
+        return matches
+
+    @staticmethod
+    def _on_boundaries(text: str, start: int, end: int, text_length: int, whole_word: bool) -> bool:
+        if start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1]):
+            return False
+        if whole_word and end < text_length and _is_word_char(text[end - 1]) and _is_word_char(text[end]):
+            return False
+        return True
+
+    def count_terms(self, text: str) -> Counter:
+        return Counter(match.term for match in self.find_all(text))
+
+    def found_terms(self, text: str) -> Set[str]:
+        return {match.term for match in self.find_all(text)}
+
+_matcher_cache: Dict[tuple, CatMatcher] = {}
+
+def get_cat_matcher(config: CatConfig = CONFIG) -> CatMatcher:
+    """Возвращает матчер для текущих списков CONFIG, собирая его только при их изменении."""
+    key = (
+        tuple(config.cat_keywords),
+        tuple(config.cat_products),
+        tuple(config.cat_phrases),
+        config.cat_word_boundaries,
+        config.cat_whole_word_max_length,
+    )
+
+    matcher = _matcher_cache.get(key)
+    if matcher is None:
+        _matcher_cache.clear()
+        matcher = CatMatcher.from_config(config)
+        _matcher_cache[key] = matcher
+
+    return matcher
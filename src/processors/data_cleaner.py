@@ -1,18 +1,281 @@
 import re
-from typing import List
+import logging
+import numbers
+from typing import Iterable, Iterator, List
 from ..data_collectors.base import CompanyData
+from ..utils.metrics import StageTally, count_stage
+
+logger = logging.getLogger(__name__)
+
+STAGE = 'clean'
+
+NON_DIGITS_RE = re.compile(r'[^\d]')
+WHITESPACE_RE = re.compile(r'\s+')
+NAME_JUNK_RE = re.compile(r'[^\w\s\-\.\(\)]')
+SCHEME_RE = re.compile(r'^https?://')
+WWW_RE = re.compile(r'^www\.')
+REVENUE_JUNK_RE = re.compile(r'[^\d\.]')
+DIGITS_RE = re.compile(r'\d+')
+FIRST_NUMBER_RE = re.compile(r'(\d+)')
+EDGE_WHITESPACE_RE = re.compile(r'^\s+|\s+$')
+
+# Выражения для clean_dataframe над object-строками - те же, что у поштучной очистки
+PYTHON_PATTERNS = {
+    'non_digits': NON_DIGITS_RE,
+    'whitespace': WHITESPACE_RE,
+    'edge_whitespace': EDGE_WHITESPACE_RE,
+    'name_junk': NAME_JUNK_RE,
+    'scheme': SCHEME_RE,
+    'www': WWW_RE,
+}
+
+# Те же выражения для RE2 (Arrow-строки). В RE2 классы \d, \w и \s только
+# ASCII, поэтому Unicode-классы re выписаны явно; в пределах BMP они совпадают
+# с классами re символ в символ. Одиночный пробел не заменяется сам на себя:
+# совпадений мало, и замена идет почти со скоростью копирования.
+_NON_SPACE_WHITESPACE = r'\t\n\v\f\r\x1c-\x1f\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}'
+_WHITESPACE = ' ' + _NON_SPACE_WHITESPACE
+
+ARROW_PATTERNS = {
+    'non_digits': r'\P{Nd}',
+    'whitespace': rf'[{_WHITESPACE}]{{2,}}|[{_NON_SPACE_WHITESPACE}]',
+    'edge_whitespace': rf'^[{_WHITESPACE}]+|[{_WHITESPACE}]+$',
+    'name_junk': rf'[^\p{{L}}\p{{N}}_{_WHITESPACE}\-\.\(\)]',
+    'scheme': r'^https?://',
+    'www': r'^www\.',
+}
+
+# Arrow понижает регистр посимвольно, а str.lower учитывает особые случаи
+# ('İ', конечная 'Σ') и более новую версию Unicode. До U+04FF (латиница,
+# греческий, кириллица) результаты расходятся только на этих двух буквах;
+# строки с ними и с символами дальше U+04FF понижаются через Python.
+ARROW_SPECIAL_LOWER = r'[^\x{0}-\x{12f}\x{131}-\x{3a2}\x{3a4}-\x{4ff}]'
+
+TEXT_MAX_LENGTH = 200
+
+# На меньших таблицах накладные расходы на переход к Arrow и обратно дороже
+# самой очистки, и clean_dataframe чистит значения поштучными функциями
+DATAFRAME_MIN_ROWS = 3_000
 
 class DataCleaner:
     @staticmethod
     def clean_company_data(companies: List[CompanyData]) -> List[CompanyData]:
-        cleaned_companies = []
+        return list(DataCleaner.iter_clean_company_data(companies))
+    
+    @staticmethod
+    def iter_clean_company_data(companies: Iterable[CompanyData]) -> Iterator[CompanyData]:
+        tally = StageTally(STAGE)
+        try:
+            for company in companies:
+                cleaned_company = DataCleaner._clean_single_company(company)
+                if cleaned_company:
+                    tally.passed()
+                    yield cleaned_company
+                else:
+                    tally.reject('error')
+        finally:
+            tally.flush()
+    
+    @staticmethod
+    def clean_dataframe(df):
+        """Те же правила очистки, что и у _clean_single_company, но над целыми столбцами.
+
+        Возвращает новый DataFrame, исходный не меняется. Пропуски (None/NaN)
+        трактуются как None в поштучной очистке. revenue получается float64
+        (NaN вместо None), employees - Int64, строковые столбцы - object.
+
+        Если установлен pyarrow, ИНН, название, сайт и cat_evidence чистятся
+        векторными .str-методами над Arrow-строками (RE2 вместо re), без
+        цикла Python по строкам. Без pyarrow те же .str-методы работают над
+        object-столбцами с выражениями поштучной очистки. Таблицы короче
+        DATAFRAME_MIN_ROWS строк чистятся поштучными функциями: на них
+        векторный путь медленнее из-за постоянных накладных расходов.
+        """
+        original_index = df.index
+        # Внутри работаем с позиционным индексом: исходный может содержать повторы
+        cleaned = df.reset_index(drop=True)
+        df = cleaned.copy()
+        
+        if len(df) < DATAFRAME_MIN_ROWS:
+            DataCleaner._clean_dataframe_rows(df, cleaned)
+        else:
+            DataCleaner._clean_dataframe_columns(df, cleaned)
         
-        for company in companies:
-            cleaned_company = DataCleaner._clean_single_company(company)
-            if cleaned_company:
-                cleaned_companies.append(cleaned_company)
+        cleaned.index = original_index
+        count_stage(STAGE, len(cleaned), len(cleaned))
+        return cleaned
+    
+    @staticmethod
+    def _clean_dataframe_rows(df, cleaned):
+        import pandas as pd
         
-        return cleaned_companies
+        cleaners = {
+            'inn': DataCleaner._clean_inn,
+            'name': DataCleaner._clean_name,
+            'site': DataCleaner._clean_site,
+            'revenue': DataCleaner._clean_revenue,
+            'employees': DataCleaner._clean_employees,
+            'cat_evidence': DataCleaner._clean_text,
+        }
+        dtypes = {'revenue': 'float64', 'employees': 'Int64'}
+        for name, clean in cleaners.items():
+            if name not in df.columns:
+                continue
+            column = df[name]
+            values = column.astype(object).where(column.notna(), None)
+            result = pd.Series([clean(value) for value in values], index=column.index, dtype=object)
+            cleaned[name] = result.astype(dtypes.get(name, object))
+    
+    @staticmethod
+    def _clean_dataframe_columns(df, cleaned):
+        if 'inn' in df.columns:
+            cleaned['inn'] = DataCleaner._clean_inn_column(df['inn'])
+        if 'name' in df.columns:
+            cleaned['name'] = DataCleaner._clean_name_column(df['name'])
+        if 'site' in df.columns:
+            cleaned['site'] = DataCleaner._clean_site_column(df['site'])
+        if 'revenue' in df.columns:
+            cleaned['revenue'] = DataCleaner._clean_revenue_column(df['revenue'])
+        if 'employees' in df.columns:
+            cleaned['employees'] = DataCleaner._clean_employees_column(df['employees'])
+        if 'cat_evidence' in df.columns:
+            cleaned['cat_evidence'] = DataCleaner._clean_text_column(df['cat_evidence'])
+    
+    @staticmethod
+    def _types_mask(values, *base_types):
+        types = values.map(type)
+        matching = [t for t in types.unique() if issubclass(t, base_types)]
+        return types.isin(matching)
+    
+    @staticmethod
+    def _as_text(column, falsy_is_blank: bool = True):
+        """Приводит столбец к object-строкам Python.
+
+        Пропуски дают ''; при falsy_is_blank так же, как в `if not value`,
+        пустыми считаются '' и 0.
+        """
+        import pandas as pd
+        
+        values = column.astype(object)
+        blank = values.isna()
+        if falsy_is_blank:
+            blank |= (values == '') | (values == 0)
+        
+        if pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+            # Одни строки и пропуски: проверять тип каждого значения не нужно
+            return values.mask(blank, '')
+        
+        convert = ~blank & ~DataCleaner._types_mask(values, str)
+        if convert.any():
+            values = values.copy()
+            values[convert] = values[convert].map(str)
+        
+        return values.mask(blank, '')
+    
+    @staticmethod
+    def _text_column(column):
+        """Строки столбца и выражения для них: Arrow-строки с ARROW_PATTERNS,
+        если установлен pyarrow, иначе object-строки с PYTHON_PATTERNS."""
+        text = DataCleaner._as_text(column)
+        try:
+            return text.astype('string[pyarrow]'), ARROW_PATTERNS
+        except (ImportError, TypeError, UnicodeError, ValueError):
+            # Нет pyarrow или строки не кодируются в UTF-8 (одиночные суррогаты)
+            return text, PYTHON_PATTERNS
+    
+    @staticmethod
+    def _clean_inn_column(column):
+        text, patterns = DataCleaner._text_column(column)
+        digits = text.str.replace(patterns['non_digits'], '', regex=True)
+        return digits.where(digits.str.len().isin([10, 12]), '').astype(object)
+    
+    @staticmethod
+    def _clean_name_column(column):
+        text, patterns = DataCleaner._text_column(column)
+        # strip() и схлопывание пробелов дают то же, что схлопывание и strip(' ')
+        text = text.str.replace(patterns['whitespace'], ' ', regex=True).str.strip(' ')
+        text = text.str.replace(patterns['name_junk'], '', regex=True)
+        return text.str.strip(' ').astype(object)
+    
+    @staticmethod
+    def _clean_site_column(column):
+        text, patterns = DataCleaner._text_column(column)
+        text = text.str.replace(patterns['edge_whitespace'], '', regex=True)
+        lowered = text.str.lower()
+        if patterns is ARROW_PATTERNS:
+            special = text.str.contains(ARROW_SPECIAL_LOWER, regex=True)
+            if special.any():
+                lowered = lowered.astype(object)
+                lowered[special] = text[special].astype(object).str.lower()
+        text = lowered.str.replace(patterns['scheme'], '', regex=True)
+        return text.str.replace(patterns['www'], '', regex=True).astype(object)
+    
+    @staticmethod
+    def _clean_text_column(column):
+        text, patterns = DataCleaner._text_column(column)
+        text = text.str.replace(patterns['whitespace'], ' ', regex=True).str.strip(' ')
+        too_long = text.str.len() > TEXT_MAX_LENGTH
+        if too_long.any():
+            text = text.where(~too_long, text.str.slice(0, TEXT_MAX_LENGTH - 3) + '...')
+        return text.astype(object)
+    
+    @staticmethod
+    def _clean_revenue_column(column):
+        import pandas as pd
+        
+        if pd.api.types.is_numeric_dtype(column.dtype):
+            return column.astype('float64')
+        
+        values = column.astype(object)
+        result = pd.Series(float('nan'), index=column.index, dtype='float64')
+        
+        numeric = DataCleaner._types_mask(values, int, float)
+        if numeric.any():
+            result[numeric] = values[numeric].astype('float64')
+        
+        textual = ~numeric & values.notna()
+        if textual.any():
+            # Остается на object: float() из поштучной очистки принимает и не-ASCII цифры
+            text = DataCleaner._as_text(values[textual]).str.replace(REVENUE_JUNK_RE, '', regex=True)
+            # float() принимает строку из цифр и не более чем одной точки
+            parsable = text.str.contains(DIGITS_RE, regex=True) & (text.str.count(r'\.') <= 1)
+            result[parsable.index[parsable]] = text[parsable].astype('float64')
+        
+        return result
+    
+    @staticmethod
+    def _clean_employees_column(column):
+        import pandas as pd
+        
+        if pd.api.types.is_bool_dtype(column.dtype):
+            return pd.Series(pd.NA, index=column.index, dtype='Int64')
+        if pd.api.types.is_integer_dtype(column.dtype):
+            return column.astype('Int64')
+        if pd.api.types.is_float_dtype(column.dtype):
+            # Целые с пропусками pandas хранит как float64
+            return column.where(column % 1 == 0).astype('Int64')
+        
+        values = column.astype(object)
+        result = pd.Series(pd.NA, index=column.index, dtype='Int64')
+        
+        integers = DataCleaner._types_mask(values, numbers.Integral) & ~DataCleaner._types_mask(values, bool)
+        if integers.any():
+            result[integers] = values[integers].astype('int64')
+        
+        floats = DataCleaner._types_mask(values, float)
+        if floats.any():
+            whole = values[floats].astype('float64')
+            whole = whole[whole % 1 == 0]
+            result[whole.index] = whole.astype('int64')
+        
+        textual = DataCleaner._types_mask(values, str)
+        if textual.any():
+            text = DataCleaner._as_text(values[textual], falsy_is_blank=False)
+            first_numbers = text.str.extract(FIRST_NUMBER_RE, expand=False)
+            found = first_numbers.notna()
+            result[found.index[found]] = first_numbers[found].astype('Int64')
+        
+        return result
     
     @staticmethod
     def _clean_single_company(company: CompanyData) -> CompanyData:
@@ -27,7 +290,8 @@ class DataCleaner:
             return company
             
         except Exception as e:
-            print(f"Ошибка при очистке данных компании {company.name}: {e}")
+            logger.warning("Ошибка при очистке данных компании %s: %s", company.name, e,
+                           extra={'stage': STAGE, 'company': company.name})
             return None
     
     @staticmethod
@@ -35,7 +299,7 @@ class DataCleaner:
         if not inn:
             return ""
         
-        cleaned = re.sub(r'[^\d]', '', str(inn))
+        cleaned = NON_DIGITS_RE.sub('', str(inn))
         
         if len(cleaned) in [10, 12]:
             return cleaned
@@ -47,8 +311,8 @@ class DataCleaner:
         if not name:
             return ""
         
-        cleaned = re.sub(r'\s+', ' ', str(name).strip())
-        cleaned = re.sub(r'[^\w\s\-\.\(\)]', '', cleaned)
+        cleaned = WHITESPACE_RE.sub(' ', str(name).strip())
+        cleaned = NAME_JUNK_RE.sub('', cleaned)
         
         return cleaned.strip()
     
@@ -58,8 +322,8 @@ class DataCleaner:
             return ""
         
         site = str(site).strip().lower()
-        site = re.sub(r'^https?://', '', site)
-        site = re.sub(r'^www\.', '', site)
+        site = SCHEME_RE.sub('', site)
+        site = WWW_RE.sub('', site)
         
         return site
     
@@ -73,7 +337,7 @@ class DataCleaner:
                 return float(revenue)
             
             revenue_str = str(revenue)
-            cleaned = re.sub(r'[^\d\.]', '', revenue_str)
+            cleaned = REVENUE_JUNK_RE.sub('', revenue_str)
             
             if cleaned:
                 return float(cleaned)
@@ -85,16 +349,20 @@ class DataCleaner:
     
     @staticmethod
     def _clean_employees(employees) -> int:
-        if employees is None:
+        if employees is None or isinstance(employees, bool):
             return None
         
         try:
-            if isinstance(employees, (int, str)):
-                employees_str = str(employees)
-                
-                numbers = re.findall(r'\d+', employees_str)
-                if numbers:
-                    return int(numbers[0])
+            # Целые любых типов (в том числе numpy) и целые числа с плавающей точкой
+            if isinstance(employees, numbers.Integral):
+                return int(employees)
+            if isinstance(employees, float):
+                return int(employees) if employees.is_integer() else None
+            
+            if isinstance(employees, str):
+                found = DIGITS_RE.findall(employees)
+                if found:
+                    return int(found[0])
             
             return None
             
@@ -106,9 +374,9 @@ class DataCleaner:
         if not text:
             return ""
         
-        cleaned = re.sub(r'\s+', ' ', str(text).strip())
+        cleaned = WHITESPACE_RE.sub(' ', str(text).strip())
         
-        if len(cleaned) > 200:
-            cleaned = cleaned[:197] + "..."
+        if len(cleaned) > TEXT_MAX_LENGTH:
+            cleaned = cleaned[:TEXT_MAX_LENGTH - 3] + "..."
         
         return cleaned
\ No newline at end of file
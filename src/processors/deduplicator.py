@@ -0,0 +1,113 @@
+"""
+Удаление дубликатов компаний по ИНН сразу после сбора.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from ..data_collectors.base import CompanyData
+from .data_cleaner import DataCleaner
+from ..utils.metrics import StageTally
+from config.settings import CONFIG
+
+@dataclass
+class MergePolicy:
+    """Правила слияния записей об одной компании из разных источников.
+
+    source_priority - источники от более надежного к менее надежному:
+    запись из более приоритетного источника становится основной.
+    prefer_revenue - заполнять пустую выручку основной записи из дубликата.
+    concat_evidence - объединять доказательства CAT из всех записей.
+    """
+    source_priority: List[str] = field(default_factory=list)
+    prefer_revenue: bool = True
+    concat_evidence: bool = False
+
+    @classmethod
+    def from_config(cls) -> 'MergePolicy':
+        return cls(
+            source_priority=list(CONFIG.dedup_source_priority),
+            prefer_revenue=CONFIG.dedup_prefer_revenue,
+            concat_evidence=CONFIG.dedup_concat_evidence,
+        )
+
+    def rank(self, source: str) -> int:
+        try:
+            return self.source_priority.index(source)
+        except ValueError:
+            return len(self.source_priority)
+
+class Deduplicator:
+    """Хэш-индекс по очищенному ИНН: каждая компания проходит дальше один раз."""
+
+    STAGE = 'dedup'
+    _FILLABLE_FIELDS = ('name', 'site', 'cat_product', 'employees', 'okved_main', 'country')
+
+    def __init__(self, policy: Optional[MergePolicy] = None):
+        self.policy = policy or MergePolicy.from_config()
+        self.index: Dict[str, CompanyData] = {}
+        self.duplicates = 0
+
+    def deduplicate(self, companies: Iterable[CompanyData]) -> List[CompanyData]:
+        return list(self.iter_deduplicate(companies))
+
+    def iter_deduplicate(self, companies: Iterable[CompanyData]) -> Iterator[CompanyData]:
+        """Отдает первую запись каждого ИНН, следующие вливает в нее.
+
+        В потоковом режиме основная запись могла уже уйти дальше по
+        конвейеру, тогда поздние дубликаты просто отбрасываются.
+        Записи без корректного ИНН пропускаются без изменений.
+        """
+        tally = StageTally(self.STAGE)
+        try:
+            for company in companies:
+                key = DataCleaner._clean_inn(company.inn)
+                if not key:
+                    tally.passed()
+                    yield company
+                    continue
+
+                kept = self.index.get(key)
+                if kept is None:
+                    self.index[key] = company
+                    tally.passed()
+                    yield company
+                    continue
+
+                self.duplicates += 1
+                tally.reject('duplicate_inn')
+                self._merge(kept, company)
+        finally:
+            tally.flush()
+
+    def _merge(self, kept: CompanyData, duplicate: CompanyData):
+        if self.policy.rank(duplicate.source) < self.policy.rank(kept.source):
+            primary, secondary = duplicate, kept
+        else:
+            primary, secondary = kept, duplicate
+
+        merged_evidence = primary.cat_evidence
+        if self.policy.concat_evidence:
+            merged_evidence = self._concat_evidence(primary.cat_evidence, secondary.cat_evidence)
+
+        revenue = primary.revenue
+        if revenue is None and self.policy.prefer_revenue:
+            revenue = secondary.revenue
+
+        values = {name: getattr(primary, name) or getattr(secondary, name) for name in self._FILLABLE_FIELDS}
+
+        kept.inn = primary.inn
+        kept.source = primary.source
+        kept.revenue = revenue
+        kept.cat_evidence = merged_evidence
+        for name, value in values.items():
+            setattr(kept, name, value)
+
+    @staticmethod
+    def _concat_evidence(first: str, second: str) -> str:
+        items = []
+        for evidence in (first, second):
+            for item in (evidence or '').split('; '):
+                item = item.strip()
+                if item and item not in items:
+                    items.append(item)
+        return '; '.join(items)
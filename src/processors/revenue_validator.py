@@ -1,19 +1,112 @@
-from typing import List
+import logging
+from typing import Iterable, Iterator, List
+import numpy as np
 from ..data_collectors.base import CompanyData
+from ..data_collectors.company_table import EMPLOYEES_MISSING, CompanyTable
+from ..utils.financials_index import get_financials_index
+from ..utils.metrics import METRICS, StageTally, count_stage, reject
 from config.settings import CONFIG
 
+logger = logging.getLogger(__name__)
+
+STAGE = 'revenue'
+
+FILLED = METRICS.counter('financials_filled_total', 'Показатели, взятые из справочника по ИНН')
+
 class RevenueValidator:
     @staticmethod
     def filter_by_revenue(companies: List[CompanyData]) -> List[CompanyData]:
-        filtered_companies = []
+        return list(RevenueValidator.iter_filter_by_revenue(companies))
+    
+    @staticmethod
+    def iter_filter_by_revenue(companies: Iterable[CompanyData]) -> Iterator[CompanyData]:
+        """Выручка и численность, которых нет у компании, перед проверкой
+        берутся из справочника CONFIG.financials_path, если он задан."""
+        financials = get_financials_index()
+        tally = StageTally(STAGE)
+        try:
+            for company in companies:
+                if financials and (company.revenue is None or company.employees is None):
+                    RevenueValidator._fill_company(company, financials.lookup(company.inn))
+                if RevenueValidator._has_sufficient_revenue(company):
+                    tally.passed()
+                    yield company
+                else:
+                    tally.reject('missing' if company.revenue is None else 'below_min')
+                    RevenueValidator._log_rejected(company.name, company.revenue)
+        finally:
+            tally.flush()
+    
+    @staticmethod
+    def revenue_mask(table: CompanyTable) -> np.ndarray:
+        """Векторный аналог _has_sufficient_revenue: NaN (нет данных) не проходит."""
+        with np.errstate(invalid='ignore'):
+            return table.revenue >= CONFIG.min_revenue
+    
+    @staticmethod
+    def _fill_company(company: CompanyData, found):
+        if found is None:
+            return
+        if company.revenue is None and found.revenue is not None:
+            company.revenue = found.revenue
+            FILLED.inc(field='revenue')
+        if company.employees is None and found.employees is not None:
+            company.employees = found.employees
+            FILLED.inc(field='employees')
+    
+    @staticmethod
+    def fill_table(table: CompanyTable) -> int:
+        """Заполняет пропуски выручки и численности из справочника одним
+        пакетным запросом; возвращает число строк, где что-то заполнено."""
+        financials = get_financials_index()
+        if not financials:
+            return 0
         
-        for company in companies:
-            if RevenueValidator._has_sufficient_revenue(company):
-                filtered_companies.append(company)
-            else:
-                print(f"Компания {company.name} исключена: выручка {company.revenue} < {CONFIG.min_revenue}")
+        rows = np.flatnonzero(np.isnan(table.revenue) | (table.employees == EMPLOYEES_MISSING))
+        if not len(rows):
+            return 0
         
-        return filtered_companies
+        inns = {int(row): table.inn_at(row) for row in rows}
+        found = financials.lookup_many(inns.values())
+        filled = {'revenue': 0, 'employees': 0}
+        for row, inn in inns.items():
+            entry = found.get(inn)
+            if entry is None:
+                continue
+            if np.isnan(table.revenue[row]) and entry.revenue is not None:
+                table.revenue[row] = entry.revenue
+                filled['revenue'] += 1
+            if table.employees[row] == EMPLOYEES_MISSING and entry.employees is not None:
+                table.employees[row] = entry.employees
+                filled['employees'] += 1
+        for field, amount in filled.items():
+            if amount:
+                FILLED.inc(amount, field=field)
+        return sum(1 for inn in inns.values() if inn in found)
+    
+    @staticmethod
+    def filter_table(table: CompanyTable) -> CompanyTable:
+        RevenueValidator.fill_table(table)
+        mask = RevenueValidator.revenue_mask(table)
+        missing = np.isnan(table.revenue)
+        
+        count_stage(STAGE, len(table), int(mask.sum()))
+        reject(STAGE, 'missing', int(missing.sum()))
+        reject(STAGE, 'below_min', int((~mask & ~missing).sum()))
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            for row in np.flatnonzero(~mask):
+                revenue = None if missing[row] else float(table.revenue[row])
+                RevenueValidator._log_rejected(table.text['name'][row], revenue)
+        return table.filter(mask)
+    
+    @staticmethod
+    def _log_rejected(name: str, revenue):
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        reason = 'missing' if revenue is None else 'below_min'
+        logger.debug("Компания %s исключена: выручка %s < %s", name, revenue, CONFIG.min_revenue,
+                     extra={'stage': STAGE, 'reason': reason, 'company': name})
     
     @staticmethod
     def _has_sufficient_revenue(company: CompanyData) -> bool:
@@ -30,7 +123,9 @@ class RevenueValidator:
             if RevenueValidator._validate_revenue_entry(company):
                 validated_companies.append(company)
             else:
-                print(f"Компания {company.name} исключена: некорректные данные о выручке")
+                reject('revenue_validation', 'invalid')
+                logger.debug("Компания %s исключена: некорректные данные о выручке", company.name,
+                             extra={'stage': 'revenue_validation', 'reason': 'invalid', 'company': company.name})
         
         return validated_companies
     
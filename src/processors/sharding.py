@@ -0,0 +1,93 @@
+"""
+Разбиение прогона на шарды по ИНН (--shard i/N) и слияние их результатов.
+
+Шард компании определяется хэшем очищенного ИНН, поэтому не зависит от
+процесса, машины и порядка сбора: N независимых запусков с одинаковым N
+делят компании без пересечений и без координации.
+"""
+import os
+import re
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+from ..data_collectors.base import CompanyData
+from .data_cleaner import DataCleaner
+from ..utils.metrics import StageTally
+
+_SHARD_PATH_RE = re.compile(r'\.shard-(\d+)-of-(\d+)(?:\.[^.\\/]*)?$')
+
+class ShardSpec:
+    """Шард index из count; index от 0 до count - 1."""
+
+    STAGE = 'shard'
+
+    def __init__(self, index: int, count: int):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Шард должен быть в диапазоне 0/{count}..{count - 1}/{count}: {index}/{count}")
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, text: str) -> 'ShardSpec':
+        index, _, count = text.partition('/')
+        try:
+            index, count = int(index), int(count)
+        except ValueError:
+            raise ValueError(f"Шард задается как i/N, например 0/4: {text}") from None
+        return cls(index, count)
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    @staticmethod
+    def shard_key(company: CompanyData) -> str:
+        """ИНН без мусора; у записей без ИНН - название и сайт, чтобы дубликаты
+        без ИНН тоже попадали в один шард."""
+        inn = DataCleaner._clean_inn(company.inn)
+        if inn:
+            return inn
+        return f"{(company.name or '').strip().lower()}|{(company.site or '').strip().lower()}"
+
+    @staticmethod
+    def shard_of(key: str, count: int) -> int:
+        # crc32, а не hash(): встроенный hash строк меняется от запуска к запуску
+        return zlib.crc32(key.encode('utf-8')) % count
+
+    def owns(self, company: CompanyData) -> bool:
+        return self.shard_of(self.shard_key(company), self.count) == self.index
+
+    def iter_filter(self, companies: Iterable[CompanyData]) -> Iterator[CompanyData]:
+        tally = StageTally(self.STAGE)
+        try:
+            for company in companies:
+                if self.owns(company):
+                    tally.passed()
+                    yield company
+                else:
+                    tally.reject('other_shard')
+        finally:
+            tally.flush()
+
+    def filter(self, companies: Iterable[CompanyData]) -> List[CompanyData]:
+        return list(self.iter_filter(companies))
+
+    def path_for(self, path: str) -> str:
+        """data/companies.csv -> data/companies.shard-1-of-4.csv"""
+        root, ext = os.path.splitext(path)
+        return f"{root}.shard-{self.index}-of-{self.count}{ext}"
+
+    @classmethod
+    def from_path(cls, path: str) -> Optional['ShardSpec']:
+        """Шард по имени файла, созданному path_for(); None, если имя другое."""
+        match = _SHARD_PATH_RE.search(path)
+        return cls(int(match.group(1)), int(match.group(2))) if match else None
+
+def missing_shards(paths: Iterable[str]) -> List[str]:
+    """Шарды, которых нет среди paths, для каждого встреченного N."""
+    seen = {}
+    for path in paths:
+        spec = ShardSpec.from_path(path)
+        if spec:
+            seen.setdefault(spec.count, set()).add(spec.index)
+    return [f"{index}/{count}" for count, indexes in sorted(seen.items())
+            for index in range(count) if index not in indexes]
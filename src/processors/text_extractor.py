@@ -0,0 +1,184 @@
+"""
+Извлечение видимого текста страницы по областям: заголовок страницы
+(<title>), заголовки разделов (<h1>-<h6>) и основной текст (<body>).
+
+Скрипты, стили, <noscript>, <template> и комментарии отбрасываются, поэтому
+термины CAT не находятся в разметке, минифицированном JS и CSS. Основной
+разборщик - lxml (libxml2); если он не установлен или не справился со
+страницей, используется BeautifulSoup с html.parser.
+
+Скорость извлечения копится в метриках text_extract_*_total по
+разборщикам и печатается в конце прогона в МБ/с.
+"""
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from ..utils.metrics import METRICS
+from config.settings import CONFIG
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_PAGES = METRICS.counter('text_extract_pages_total', 'Страницы, из которых извлечен текст, по разборщикам')
+EXTRACT_BYTES = METRICS.counter('text_extract_bytes_total', 'Объем разобранного HTML в символах, по разборщикам')
+EXTRACT_SECONDS = METRICS.counter('text_extract_seconds_total', 'Время извлечения текста, по разборщикам')
+
+REGIONS = ('title', 'headings', 'body')
+
+_SKIPPED_TAGS = ('script', 'style', 'noscript', 'template')
+_HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+class PageText(NamedTuple):
+    """Видимый текст страницы; пробелы схлопнуты. Заголовки разделов
+    входят и в body: это текст страницы целиком, без <head>."""
+    title: str
+    headings: str
+    body: str
+
+    def regions(self) -> List[Tuple[str, str]]:
+        return list(zip(REGIONS, self))
+
+    @property
+    def text(self) -> str:
+        return ' '.join(part for part in (self.title, self.body) if part)
+
+EMPTY_PAGE = PageText('', '', '')
+
+def _squash(parts) -> str:
+    return ' '.join(' '.join(parts).split())
+
+_lxml_local = threading.local()
+
+def _lxml_parser():
+    # Парсер lxml нельзя делить между потоками - у каждого потока свой
+    parser = getattr(_lxml_local, 'parser', None)
+    if parser is None:
+        from lxml import etree
+        parser = _lxml_local.parser = etree.HTMLParser(encoding='utf-8', remove_comments=True,
+                                                       remove_pis=True, no_network=True)
+    return parser
+
+def _extract_lxml(html: str) -> PageText:
+    from lxml import etree
+    # Строку с объявлением кодировки (<?xml encoding=...?>) lxml не принимает,
+    # поэтому разбираются байты
+    root = etree.fromstring(html.encode('utf-8', 'replace'), _lxml_parser())
+    if root is None:
+        return EMPTY_PAGE
+    etree.strip_elements(root, *_SKIPPED_TAGS, with_tail=False)
+
+    title = _squash(text for element in root.iter('title') for text in element.itertext())
+    headings = _squash(text for element in root.iter(*_HEADING_TAGS) for text in element.itertext())
+    body = root.find('body')
+    return PageText(title, headings, _squash(body.itertext()) if body is not None else '')
+
+def _extract_bs4(html: str) -> PageText:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(_SKIPPED_TAGS):
+        element.decompose()
+
+    title = _squash(element.get_text(' ') for element in soup('title'))
+    headings = _squash(element.get_text(' ') for element in soup(_HEADING_TAGS))
+    body = soup.body or soup
+    if body is soup:
+        for element in soup('title'):
+            element.decompose()
+    return PageText(title, headings, _squash([body.get_text(' ')]))
+
+# Разборщики в порядке предпочтения; последний - запасной
+BACKENDS: Dict[str, Tuple[str, Callable[[str], PageText]]] = {
+    'lxml': ('lxml', _extract_lxml),
+    'bs4': ('bs4', _extract_bs4),
+}
+FALLBACK_BACKEND = 'bs4'
+
+def available_backends() -> List[str]:
+    names = []
+    for name, (module, _) in BACKENDS.items():
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+def record_extraction(totals: Dict[str, List[float]]):
+    """Переносит в метрики счетчики {разборщик: [страницы, символы, секунды]},
+    например присланные процессом-обработчиком."""
+    for backend, (pages, size, seconds) in totals.items():
+        EXTRACT_PAGES.inc(pages, backend=backend)
+        EXTRACT_BYTES.inc(size, backend=backend)
+        EXTRACT_SECONDS.inc(seconds, backend=backend)
+
+def extraction_throughput() -> Dict[str, Dict[str, float]]:
+    """Страницы, мегабайты, секунды и МБ/с по каждому разборщику."""
+    throughput = {}
+    for key, size in EXTRACT_BYTES.samples():
+        backend = dict(key).get('backend', '')
+        seconds = EXTRACT_SECONDS.value(backend=backend)
+        megabytes = size / 1024 / 1024
+        throughput[backend] = {
+            'pages': EXTRACT_PAGES.value(backend=backend),
+            'megabytes': megabytes,
+            'seconds': seconds,
+            'mb_per_second': megabytes / seconds if seconds > 0 else None,
+        }
+    return throughput
+
+class TextExtractor:
+    def __init__(self, backend: str = 'auto'):
+        """backend - 'lxml', 'bs4' или 'auto' (первый установленный из BACKENDS)."""
+        if backend == 'auto':
+            available = available_backends()
+            if not available:
+                raise ImportError("Для извлечения текста нужен lxml или beautifulsoup4: pip install lxml")
+            backend = available[0]
+        elif backend not in BACKENDS:
+            raise ValueError(f"Неизвестный разборщик HTML: {backend} (доступны: {', '.join(BACKENDS)})")
+        elif backend not in available_backends():
+            raise ImportError(f"Разборщик {backend} не установлен: pip install {BACKENDS[backend][0]}")
+
+        self.backend = backend
+        self._extract = BACKENDS[backend][1]
+
+    def extract(self, html: str, tally: Optional[Dict[str, List[float]]] = None) -> PageText:
+        """Текст страницы по областям. Время и объем разбора добавляются в
+        tally, если он передан, иначе сразу в метрики."""
+        if not html or not html.strip():
+            return EMPTY_PAGE
+
+        backend = self.backend
+        started = time.perf_counter()
+        try:
+            page = self._extract(html)
+        except Exception as e:
+            if backend == FALLBACK_BACKEND:
+                raise
+            logger.debug("Разборщик %s не справился со страницей (%s), используется %s",
+                         backend, e, FALLBACK_BACKEND)
+            backend = FALLBACK_BACKEND
+            started = time.perf_counter()
+            page = BACKENDS[backend][1](html)
+        seconds = time.perf_counter() - started
+
+        if tally is None:
+            record_extraction({backend: [1, len(html), seconds]})
+        else:
+            entry = tally.setdefault(backend, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += len(html)
+            entry[2] += seconds
+        return page
+
+_extractors: Dict[str, TextExtractor] = {}
+
+def get_text_extractor(backend: Optional[str] = None) -> TextExtractor:
+    """Общий для процесса извлекатель для CONFIG.text_extractor."""
+    backend = backend or CONFIG.text_extractor
+    extractor = _extractors.get(backend)
+    if extractor is None:
+        extractor = _extractors[backend] = TextExtractor(backend)
+    return extractor
@@ -0,0 +1,290 @@
+"""
+Агрегаты по файлу результатов за один проход с ограниченной памятью.
+
+Строки читаются потоком (results_io.iter_rows), в памяти остаются только
+счетчики: количество, сумма, минимум и максимум выручки, приближенные
+перцентили (QuantileSketch) и разбивки по источнику, продукту CAT и
+ОКВЭД. Агрегаты одного вида можно объединять через merge(), например
+посчитанные по частям файла.
+"""
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Разбивки по умолчанию; okved - класс ОКВЭД (две первые цифры кода)
+DEFAULT_BREAKDOWNS = ('source', 'cat_product', 'okved')
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+# Измерения, которые вычисляются из столбцов файла
+DERIVED_DIMENSIONS: Dict[str, Tuple[str, Callable[[str], str]]] = {
+    'okved': ('okved_main', lambda code: code.split('.')[0] if code else ''),
+}
+
+class QuantileSketch:
+    """Перцентили с относительной погрешностью relative_accuracy (как DDSketch).
+
+    Положительные значения раскладываются по логарифмическим корзинам
+    [gamma^(k-1), gamma^k), gamma = (1 + a) / (1 - a); нули и
+    отрицательные считаются отдельно и дают 0. Число корзин не больше
+    max_bins: при переполнении сливаются самые младшие, и теряется
+    точность только в нижнем хвосте.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.gamma != self.gamma:
+            raise ValueError("Нельзя объединить перцентили с разной точностью")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        excess = keys[:len(keys) - self.max_bins + 1]
+        target = keys[len(excess)]
+        self.bins[target] += sum(self.bins.pop(key) for key in excess)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict:
+        return {'relative_accuracy': self.relative_accuracy, 'zero_count': self.zero_count,
+                'bins': {str(key): count for key, count in sorted(self.bins.items())}}
+
+class RevenueStats:
+    """Количество компаний и сводка по выручке тех, у кого она есть."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self.revenue_count = 0
+        self.revenue_sum = 0.0
+        self.revenue_min: Optional[float] = None
+        self.revenue_max: Optional[float] = None
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, revenue: Optional[float]):
+        self.count += 1
+        if revenue is None:
+            return
+        self.revenue_count += 1
+        self.revenue_sum += revenue
+        if self.revenue_min is None or revenue < self.revenue_min:
+            self.revenue_min = revenue
+        if self.revenue_max is None or revenue > self.revenue_max:
+            self.revenue_max = revenue
+        self.sketch.add(revenue)
+
+    def merge(self, other: 'RevenueStats'):
+        self.count += other.count
+        self.revenue_count += other.revenue_count
+        self.revenue_sum += other.revenue_sum
+        if other.revenue_min is not None and (self.revenue_min is None or other.revenue_min < self.revenue_min):
+            self.revenue_min = other.revenue_min
+        if other.revenue_max is not None and (self.revenue_max is None or other.revenue_max > self.revenue_max):
+            self.revenue_max = other.revenue_max
+        self.sketch.merge(other.sketch)
+
+    @property
+    def revenue_mean(self) -> Optional[float]:
+        return self.revenue_sum / self.revenue_count if self.revenue_count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        value = self.sketch.quantile(q)
+        # Середина корзины может выйти за фактические границы выборки
+        return None if value is None else min(max(value, self.revenue_min), self.revenue_max)
+
+    def percentiles(self, levels: Sequence[float] = PERCENTILES) -> Dict[str, Optional[float]]:
+        return {f"p{level * 100:g}": self.quantile(level) for level in levels}
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'revenue_count': self.revenue_count, 'revenue_sum': self.revenue_sum,
+                'revenue_mean': self.revenue_mean, 'revenue_min': self.revenue_min,
+                'revenue_max': self.revenue_max, 'revenue_percentiles': self.percentiles()}
+
+class RowFilter:
+    """Условие --where: "столбец=значение" или "столбец!=значение";
+    несколько значений через запятую - любое из них."""
+
+    def __init__(self, expression: str):
+        negate = '!=' in expression
+        column, _, values = expression.partition('!=' if negate else '=')
+        if not column or not _:
+            raise ValueError(f"Условие должно иметь вид столбец=значение: {expression}")
+        self.column = column.strip()
+        self.values = {value.strip() for value in values.split(',')}
+        self.negate = negate
+
+    def matches(self, value: str) -> bool:
+        return (value in self.values) != self.negate
+
+def parse_revenue(value) -> Optional[float]:
+    """Выручка из CSV (строка) или колоночного файла (число/None); NaN и мусор - None."""
+    if value is None or value == '':
+        return None
+    try:
+        revenue = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if revenue != revenue else revenue
+
+def _text(value) -> str:
+    if value is None or value != value:
+        return ''
+    return str(value)
+
+class ResultsAggregator:
+    """Сводка по строкам результата: общая, по разбивкам и по группам.
+
+    breakdowns - измерения, по каждому из которых считается отдельная
+    таблица; group_by - набор измерений, по сочетанию значений которых
+    строится еще одна таблица; filters - строки, не прошедшие все
+    условия, не учитываются. revenue_min/revenue_max отбрасывают строки
+    с выручкой вне диапазона (и без выручки).
+
+    При чтении каждая строка попадает в одну ячейку - сочетание значений
+    всех измерений; общая сводка, разбивки и группы собираются из ячеек
+    при обращении. Ячеек столько, сколько различных сочетаний (источник x
+    продукт x класс ОКВЭД), а не строк.
+    """
+
+    def __init__(self, breakdowns: Iterable[str] = DEFAULT_BREAKDOWNS, group_by: Sequence[str] = (),
+                 filters: Sequence[RowFilter] = (), revenue_min: Optional[float] = None,
+                 revenue_max: Optional[float] = None, relative_accuracy: float = 0.01):
+        self.breakdowns = list(breakdowns)
+        self.group_by = list(group_by)
+        self.filters = list(filters)
+        self.revenue_min = revenue_min
+        self.revenue_max = revenue_max
+        self.relative_accuracy = relative_accuracy
+        self.rows_read = 0
+        self.cells: Dict[Tuple[str, ...], RevenueStats] = {}
+        self._rollup: Optional[Tuple] = None
+
+    def dimensions(self) -> List[str]:
+        """Измерения ячейки: разбивки и группировка."""
+        return list(dict.fromkeys(self.breakdowns + self.group_by))
+
+    def columns(self) -> List[str]:
+        """Столбцы файла, которые нужно прочитать."""
+        names = self.dimensions() + [f.column for f in self.filters]
+        columns = ['revenue'] + [DERIVED_DIMENSIONS.get(name, (name,))[0] for name in names]
+        return list(dict.fromkeys(columns))
+
+    def _extractors(self, names: List[str], columns: List[str]) -> List[Tuple[int, Optional[Callable]]]:
+        extractors = []
+        for name in names:
+            column, derive = DERIVED_DIMENSIONS.get(name, (name, None))
+            extractors.append((columns.index(column), derive))
+        return extractors
+
+    def consume(self, rows: Iterable[Tuple]):
+        """Учитывает строки со значениями столбцов в порядке columns()."""
+        columns = self.columns()
+        extractors = self._extractors(self.dimensions(), columns)
+        filters = list(zip(self._extractors([f.column for f in self.filters], columns), self.filters))
+        revenue_min, revenue_max = self.revenue_min, self.revenue_max
+        cells = self.cells
+        self._rollup = None
+
+        for row in rows:
+            self.rows_read += 1
+            if filters and not all(f.matches(derive(_text(row[i])) if derive else _text(row[i]))
+                                   for (i, derive), f in filters):
+                continue
+
+            revenue = parse_revenue(row[0])
+            if revenue_min is not None and (revenue is None or revenue < revenue_min):
+                continue
+            if revenue_max is not None and (revenue is None or revenue > revenue_max):
+                continue
+
+            key = tuple(derive(_text(row[i])) if derive else _text(row[i]) for i, derive in extractors)
+            stats = cells.get(key)
+            if stats is None:
+                stats = cells[key] = RevenueStats(self.relative_accuracy)
+            stats.add(revenue)
+
+    def merge(self, other: 'ResultsAggregator'):
+        if other.dimensions() != self.dimensions():
+            raise ValueError("Нельзя объединить сводки с разными измерениями")
+        self.rows_read += other.rows_read
+        for key, stats in other.cells.items():
+            self._stats(self.cells, key).merge(stats)
+        self._rollup = None
+
+    def _stats(self, table: Dict, key) -> RevenueStats:
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = RevenueStats(self.relative_accuracy)
+        return stats
+
+    def _rolled_up(self) -> Tuple:
+        if self._rollup is None:
+            dimensions = self.dimensions()
+            total = RevenueStats(self.relative_accuracy)
+            by_dimension: Dict[str, Dict[str, RevenueStats]] = {name: {} for name in self.breakdowns}
+            groups: Dict[Tuple[str, ...], RevenueStats] = {}
+            positions = [(dimensions.index(name), by_dimension[name]) for name in self.breakdowns]
+            group_positions = [dimensions.index(name) for name in self.group_by]
+            for key, stats in self.cells.items():
+                total.merge(stats)
+                for i, table in positions:
+                    self._stats(table, key[i]).merge(stats)
+                if group_positions:
+                    self._stats(groups, tuple(key[i] for i in group_positions)).merge(stats)
+            self._rollup = (total, by_dimension, groups)
+        return self._rollup
+
+    @property
+    def total(self) -> RevenueStats:
+        return self._rolled_up()[0]
+
+    @property
+    def by_dimension(self) -> Dict[str, Dict[str, RevenueStats]]:
+        return self._rolled_up()[1]
+
+    @property
+    def groups(self) -> Dict[Tuple[str, ...], RevenueStats]:
+        return self._rolled_up()[2]
+
+    def to_dict(self) -> Dict:
+        return {
+            'rows_read': self.rows_read,
+            'filters': [{'column': f.column, 'values': sorted(f.values), 'negate': f.negate} for f in self.filters],
+            'total': self.total.to_dict(),
+            'breakdowns': {name: {key: stats.to_dict() for key, stats in table.items()}
+                           for name, table in self.by_dimension.items()},
+            'group_by': self.group_by,
+            'groups': [{'key': list(key), **stats.to_dict()} for key, stats in self.groups.items()],
+        }
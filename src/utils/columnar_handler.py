@@ -0,0 +1,207 @@
+"""
+Чтение и запись результатов в колоночных форматах Parquet и Arrow IPC.
+
+Нужен пакет pyarrow (pip install pyarrow); без него CSV работает как раньше.
+"""
+import os
+import logging
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from ..data_collectors.base import CompanyData
+from .csv_handler import CSV_COLUMNS, CsvHandler
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("Для форматов Parquet/Arrow нужен пакет pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+def _schema():
+    pa = _pyarrow()
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('inn', pa.string()),
+        ('name', pa.string()),
+        ('revenue', pa.float64()),
+        ('site', pa.string()),
+        ('cat_evidence', pa.string()),
+        ('source', category),
+        ('cat_product', category),
+        ('employees', pa.int64()),
+        ('okved_main', pa.string()),
+        ('country', category),
+    ])
+
+def _dictionary_array(pa, values, dictionary):
+    """Кодирует values словарем dictionary {значение: номер}, дописывая в его
+    конец новые значения. Уже выданные номера не меняются, поэтому словарь
+    следующего пакета продолжает словарь предыдущего."""
+    indices = [None if value is None else dictionary.setdefault(value, len(dictionary)) for value in values]
+    return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()),
+                                          pa.array(list(dictionary), type=pa.string()))
+
+class ColumnarCompanyWriter:
+    """Запись компаний в Parquet/Arrow пакетами по batch_size строк для потокового режима.
+
+    Файл Arrow IPC не допускает замены словаря между пакетами, только
+    дописывание (delta), поэтому для него словари source/cat_product/country
+    общие на весь файл и растут от пакета к пакету. В Parquet у каждой
+    группы строк свой словарь.
+    """
+
+    def __init__(self, filepath: str, batch_size: int = 10_000, compression: str = 'zstd'):
+        pa = _pyarrow()
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer: List[CompanyData] = []
+        self._schema = _schema()
+        self._dictionaries = None
+
+        CsvHandler._prepare_output_dir(filepath, quiet=True)
+
+        if ColumnarHandler.format_for_path(filepath) == 'parquet':
+            self._writer = pa.parquet.ParquetWriter(filepath, self._schema, compression=compression)
+        else:
+            self._dictionaries = {}
+            self._sink = pa.OSFile(filepath, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, self._schema,
+                                           options=pa.ipc.IpcWriteOptions(compression=compression,
+                                                                          emit_dictionary_deltas=True))
+
+    def write(self, company: CompanyData):
+        self._buffer.append(company)
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._writer.write_table(ColumnarHandler.companies_to_table(self._buffer, self._dictionaries))
+            self._buffer = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        if hasattr(self, '_sink'):
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+class ColumnarHandler:
+    @staticmethod
+    def format_for_path(filepath: str) -> Optional[str]:
+        extension = os.path.splitext(filepath)[1].lower()
+        if extension in PARQUET_EXTENSIONS:
+            return 'parquet'
+        if extension in ARROW_EXTENSIONS:
+            return 'arrow'
+        return None
+
+    @staticmethod
+    def companies_to_table(companies: List[CompanyData], dictionaries: Optional[Dict[str, Dict[str, int]]] = None):
+        """dictionaries - словари категориальных столбцов, общие для
+        нескольких таблиц одного файла (см. ColumnarCompanyWriter)."""
+        pa = _pyarrow()
+        columns = {name: [getattr(c, name) for c in companies] for name in CSV_COLUMNS}
+        return ColumnarHandler._table_from_columns(pa, columns, dictionaries)
+
+    @staticmethod
+    def _table_from_columns(pa, columns, dictionaries=None):
+        schema = _schema()
+        arrays = []
+        for field in schema:
+            values = columns[field.name]
+            if pa.types.is_dictionary(field.type) and dictionaries is not None:
+                arrays.append(_dictionary_array(pa, values, dictionaries.setdefault(field.name, {})))
+            elif pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    @staticmethod
+    def save_companies(companies: List[CompanyData], filepath: str, compression: str = 'zstd', quiet: bool = False):
+        ColumnarHandler._write_table(ColumnarHandler.companies_to_table(companies), filepath, compression, quiet)
+
+    @staticmethod
+    def save_dataframe(df: 'pd.DataFrame', filepath: str, compression: str = 'zstd', quiet: bool = False):
+        pa = _pyarrow()
+        table = ColumnarHandler._table_from_columns(pa, CsvHandler._python_columns(df))
+        ColumnarHandler._write_table(table, filepath, compression, quiet)
+
+    @staticmethod
+    def _write_table(table, filepath: str, compression: str, quiet: bool):
+        pa = _pyarrow()
+        CsvHandler._prepare_output_dir(filepath, quiet)
+
+        if ColumnarHandler.format_for_path(filepath) == 'parquet':
+            pa.parquet.write_table(table, filepath, compression=compression)
+        else:
+            with pa.OSFile(filepath, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema,
+                                     options=pa.ipc.IpcWriteOptions(compression=compression)) as writer:
+                    writer.write_table(table)
+
+        if not quiet:
+            logger.info("📊 Данные сохранены в %s. Всего компаний: %d, размер: %d байт",
+                        filepath, table.num_rows, os.path.getsize(filepath))
+
+    @staticmethod
+    def read_table(filepath: str, columns: Optional[List[str]] = None):
+        """Читает только запрошенные столбцы: Parquet пропускает лишние
+        column chunks, Arrow IPC отображается в память без копирования."""
+        pa = _pyarrow()
+
+        if ColumnarHandler.format_for_path(filepath) == 'parquet':
+            return pa.parquet.read_table(filepath, columns=columns)
+
+        table = pa.ipc.open_file(pa.memory_map(filepath, 'r')).read_all()
+        return table.select(columns) if columns else table
+
+    @staticmethod
+    def read_dataframe(filepath: str, columns: Optional[List[str]] = None) -> 'pd.DataFrame':
+        return ColumnarHandler.read_table(filepath, columns).to_pandas()
+
+    @staticmethod
+    def iter_dataframes(filepath: str, columns: Optional[List[str]] = None,
+                        batch_size: int = 100_000) -> Iterator['pd.DataFrame']:
+        pa = _pyarrow()
+
+        if ColumnarHandler.format_for_path(filepath) == 'parquet':
+            for batch in pa.parquet.ParquetFile(filepath).iter_batches(batch_size=batch_size, columns=columns):
+                yield batch.to_pandas()
+            return
+
+        reader = pa.ipc.open_file(pa.memory_map(filepath, 'r'))
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns:
+                batch = batch.select(columns)
+            yield batch.to_pandas()
+
+    @staticmethod
+    def load_companies(filepath: str, quiet: bool = False) -> List[CompanyData]:
+        if not os.path.exists(filepath):
+            logger.error("❌ Файл не найден: %s", filepath)
+            return []
+
+        companies = CsvHandler.dataframe_to_companies(ColumnarHandler.read_dataframe(filepath))
+        if not quiet:
+            logger.info("✅ Загружено компаний: %d", len(companies))
+        return companies
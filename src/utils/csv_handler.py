@@ -1,100 +1,270 @@
 import csv
-import pandas as pd
 import os
-from typing import List
+import logging
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
 from ..data_collectors.base import CompanyData
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = [
+    'inn', 'name', 'revenue', 'site', 'cat_evidence', 'source',
+    'cat_product', 'employees', 'okved_main', 'country'
+]
+
+CSV_DTYPES = {
+    'inn': str,
+    'name': str,
+    'revenue': 'float64',
+    'site': str,
+    'cat_evidence': str,
+    'source': str,
+    'cat_product': str,
+    'employees': str,
+    'okved_main': str,
+    'country': str,
+}
+
+# Обязательные поля CompanyData: пустое значение в файле читается как ''
+REQUIRED_TEXT_COLUMNS = {'inn', 'name', 'site', 'cat_evidence', 'source'}
+
+class CompanyCsvWriter:
+    """Построчная запись компаний в CSV по мере их поступления из конвейера.
+
+    Файл сбрасывается на диск каждые flush_every строк и при закрытии, а не
+    после каждой строки: частичный результат долгого прогона виден, но
+    системный вызов не приходится на каждую компанию.
+    """
+    
+    def __init__(self, filepath: str, flush_every: int = 1000):
+        self.filepath = filepath
+        self.flush_every = flush_every
+        self.count = 0
+        
+        output_dir = os.path.dirname(filepath)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        
+        self._file = open(filepath, 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+        self._writer.writerow(CSV_COLUMNS)
+    
+    def write(self, company: CompanyData):
+        self._writer.writerow(CsvHandler.company_to_values(company))
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
 class CsvHandler:
     @staticmethod
-    def save_companies_to_csv(companies: List[CompanyData], filepath: str):
-        try:
-            print(f"🔍 Отладка CSV: Начинаем сохранение {len(companies)} компаний в {filepath}")
-            
-            data = []
-            for i, company in enumerate(companies):
-                try:
-                    data.append({
-                        'inn': company.inn,
-                        'name': company.name,
-                        'revenue': company.revenue,
-                        'site': company.site,
-                        'cat_evidence': company.cat_evidence,
-                        'source': company.source,
-                        'cat_product': company.cat_product or '',
-                        'employees': company.employees or '',
-                        'okved_main': company.okved_main or '',
-                        'country': company.country or ''
-                    })
-                    print(f"🔍 Отладка CSV: Обработана компания {i+1}: {company.name}")
-                except Exception as e:
-                    print(f"❌ Ошибка при обработке компании {i}: {e}")
-                    continue
-            
-            if not data:
-                print("❌ Нет данных для сохранения")
-                return
+    def company_to_values(company: CompanyData) -> Tuple:
+        """Значения строки CSV в порядке CSV_COLUMNS; NaN выручки пишется пустым, как у pandas."""
+        revenue = company.revenue
+        return (
+            company.inn,
+            company.name,
+            revenue if revenue == revenue else None,
+            company.site,
+            company.cat_evidence,
+            company.source,
+            company.cat_product or '',
+            company.employees or '',
+            company.okved_main or '',
+            company.country or '',
+        )
+    
+    @staticmethod
+    def dataframe_to_companies(df: 'pd.DataFrame') -> List[CompanyData]:
+        """Обратное преобразование: каждый столбец переводится в список Python целиком."""
+        columns = CsvHandler._python_columns(df)
+        return [CompanyData(*values) for values in zip(*(columns[name] for name in CSV_COLUMNS))]
+    
+    @staticmethod
+    def _python_columns(df: 'pd.DataFrame') -> Dict[str, list]:
+        import pandas as pd
+        
+        size = len(df)
+        columns = {}
+        
+        for name in CSV_COLUMNS:
+            if name not in df.columns:
+                columns[name] = [None] * size
+                continue
             
-            df = pd.DataFrame(data)
-            print(f"🔍 Отладка CSV: DataFrame создан, размер: {df.shape}")
+            series = df[name]
+            if name == 'revenue':
+                series = pd.to_numeric(series, errors='coerce')
+            elif name == 'employees':
+                series = pd.to_numeric(series, errors='coerce').round().astype('Int64')
             
-            output_dir = os.path.dirname(filepath)
-            if output_dir and not os.path.exists(output_dir):
-                print(f"📁 Создаем директорию: {output_dir}")
-                os.makedirs(output_dir)
+            missing = '' if name in REQUIRED_TEXT_COLUMNS else None
+            columns[name] = series.astype(object).where(series.notna(), missing).tolist()
+        
+        return columns
+    
+    @staticmethod
+    def _read_arrow_columns(filepath: str) -> Optional[Dict[str, list]]:
+        """Столбцы файла списками Python, прочитанные pyarrow.csv без DataFrame;
+        значения те же, что у _python_columns. None - нет pyarrow или файл
+        он не разбирает (например, не UTF-8), тогда читает pandas."""
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+        except ImportError:
+            return None
+        
+        try:
+            table = pa_csv.read_csv(
+                filepath,
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in CSV_COLUMNS},
+                                                      null_values=[''], strings_can_be_null=True),
+            )
+        except (pa.ArrowInvalid, UnicodeDecodeError):
+            return None
+        
+        columns = {}
+        for name in CSV_COLUMNS:
+            if name not in table.column_names:
+                columns[name] = [None] * table.num_rows
+            elif name in ('revenue', 'employees'):
+                columns[name] = CsvHandler._arrow_numbers(table.column(name), integer=name == 'employees')
+            elif name in REQUIRED_TEXT_COLUMNS:
+                columns[name] = table.column(name).fill_null('').to_pylist()
+            else:
+                columns[name] = table.column(name).to_pylist()
+        return columns
+    
+    @staticmethod
+    def _arrow_numbers(column, integer: bool) -> list:
+        import pyarrow as pa
+        
+        try:
+            return column.cast(pa.int64() if integer else pa.float64()).to_pylist()
+        except pa.ArrowInvalid:
+            # Мусор или дробная численность - те же правила, что в _python_columns
+            import pandas as pd
             
-            print(f"🔍 Отладка CSV: Сохраняем в файл...")
-            df.to_csv(filepath, index=False, encoding='utf-8')
+            series = pd.to_numeric(column.to_pandas(), errors='coerce')
+            if integer:
+                series = series.round().astype('Int64')
+            return series.astype(object).where(series.notna(), None).tolist()
+    
+    @staticmethod
+    def _prepare_output_dir(filepath: str, quiet: bool = False):
+        output_dir = os.path.dirname(filepath)
+        if output_dir and not os.path.exists(output_dir):
+            if not quiet:
+                logger.info("📁 Создаем директорию: %s", output_dir)
+            os.makedirs(output_dir)
+    
+    @staticmethod
+    def save_companies_to_csv(companies: List[CompanyData], filepath: str, quiet: bool = False):
+        try:
+            if not quiet:
+                logger.debug("🔍 Отладка CSV: Начинаем сохранение %d компаний в %s", len(companies), filepath)
             
-            if os.path.exists(filepath):
-                file_size = os.path.getsize(filepath)
-                print(f"✅ CSV файл успешно сохранен! Размер: {file_size} байт")
-            else:
-                print(f"❌ CSV файл не был создан!")
+            if not companies:
+                logger.warning("❌ Нет данных для сохранения")
+                return
             
-            print(f"📊 Данные сохранены в {filepath}. Всего компаний: {len(companies)}")
+            # Модуль csv пишет строки из кортежей без промежуточного DataFrame
+            CsvHandler._prepare_output_dir(filepath, quiet)
+            with open(filepath, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerow(CSV_COLUMNS)
+                writer.writerows(map(CsvHandler.company_to_values, companies))
+            CsvHandler._report_saved(filepath, len(companies), quiet)
             
         except Exception as e:
-            print(f"❌ Критическая ошибка при сохранении CSV: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Критическая ошибка при сохранении CSV: %s", e)
+    
+    @staticmethod
+    def save_dataframe_to_csv(df: 'pd.DataFrame', filepath: str, quiet: bool = False):
+        CsvHandler._prepare_output_dir(filepath, quiet)
+        df.to_csv(filepath, index=False, encoding='utf-8')
+        CsvHandler._report_saved(filepath, len(df), quiet)
     
     @staticmethod
-    def load_companies_from_csv(filepath: str) -> List[CompanyData]:
+    def _report_saved(filepath: str, count: int, quiet: bool):
+        if quiet:
+            return
+        
+        if os.path.exists(filepath):
+            file_size = os.path.getsize(filepath)
+            logger.info("✅ CSV файл успешно сохранен! Размер: %d байт", file_size)
+        else:
+            logger.error("❌ CSV файл не был создан!")
+        
+        logger.info("📊 Данные сохранены в %s. Всего компаний: %d", filepath, count)
+    
+    @staticmethod
+    def read_csv(filepath: str, columns: Optional[List[str]] = None, chunksize: Optional[int] = None):
+        """Читает файл результатов с явными типами столбцов.
+
+        ИНН, ОКВЭД и прочие текстовые поля читаются как строки, поэтому
+        ведущие нули сохраняются. При chunksize возвращается итератор
+        DataFrame по chunksize строк.
+        """
+        import pandas as pd
+        
+        dtypes = {name: dtype for name, dtype in CSV_DTYPES.items() if columns is None or name in columns}
+        return pd.read_csv(filepath, usecols=columns, dtype=dtypes, chunksize=chunksize,
+                           keep_default_na=False, na_values=[''], encoding='utf-8')
+    
+    @staticmethod
+    def iter_rows(filepath: str, columns: List[str]) -> Iterator[Tuple[str, ...]]:
+        """Значения выбранных столбцов построчно, строками как в файле.
+
+        Работает модулем csv без pandas - для коротких запусков вроде
+        --analyze, которым не нужен DataFrame.
+        """
+        with open(filepath, encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            # Столбцы, которых нет в старых файлах, читаются как пустые
+            positions = [header.index(name) if name in header else len(header) for name in columns]
+            for row in reader:
+                if row:
+                    yield tuple(row[i] if i < len(row) else '' for i in positions)
+    
+    @staticmethod
+    def iter_companies_from_csv(filepath: str, chunksize: int = 100_000) -> Iterator[CompanyData]:
+        for chunk in CsvHandler.read_csv(filepath, chunksize=chunksize):
+            yield from CsvHandler.dataframe_to_companies(chunk)
+    
+    @staticmethod
+    def load_companies_from_csv(filepath: str, quiet: bool = False) -> List[CompanyData]:
         try:
-            print(f"🔍 Отладка CSV: Загружаем данные из {filepath}")
+            if not quiet:
+                logger.debug("🔍 Отладка CSV: Загружаем данные из %s", filepath)
             
             if not os.path.exists(filepath):
-                print(f"❌ Файл не найден: {filepath}")
+                logger.error("❌ Файл не найден: %s", filepath)
                 return []
             
-            df = pd.read_csv(filepath)
-            print(f"🔍 Отладка CSV: Загружен DataFrame размером {df.shape}")
-            
-            companies = []
-            for i, (_, row) in enumerate(df.iterrows()):
-                try:
-                    company = CompanyData(
-                        inn=row['inn'],
-                        name=row['name'],
-                        revenue=row['revenue'] if pd.notna(row['revenue']) else None,
-                        site=row['site'],
-                        cat_evidence=row['cat_evidence'],
-                        source=row['source'],
-                        cat_product=row['cat_product'] if pd.notna(row['cat_product']) else None,
-                        employees=row['employees'] if pd.notna(row['employees']) else None,
-                        okved_main=row['okved_main'] if pd.notna(row['okved_main']) else None,
-                        country=row['country'] if pd.notna(row['country']) else None
-                    )
-                    companies.append(company)
-                except Exception as e:
-                    print(f"❌ Ошибка при обработке строки {i}: {e}")
-                    continue
+            columns = CsvHandler._read_arrow_columns(filepath)
+            if columns is None:
+                columns = CsvHandler._python_columns(CsvHandler.read_csv(filepath))
+            companies = [CompanyData(*values) for values in zip(*(columns[name] for name in CSV_COLUMNS))]
             
-            print(f"✅ Загружено компаний: {len(companies)}")
+            if not quiet:
+                logger.info("✅ Загружено компаний: %d", len(companies))
             return companies
             
         except Exception as e:
-            print(f"❌ Ошибка при загрузке CSV: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Ошибка при загрузке CSV: %s", e)
             return []
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Кэш DNS внутри процесса: повторные запросы к одному хосту не ждут резолвера.
+"""
+import time
+import socket
+import threading
+from typing import Dict, Tuple
+
+_original_getaddrinfo = socket.getaddrinfo
+_entries: Dict[Tuple, Tuple[float, list]] = {}
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+_ttl = 0.0
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    key = (host, port, family, type, proto, flags)
+    now = time.time()
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] > now:
+            _stats['hits'] += 1
+            return list(entry[1])
+
+    # Резолвер вызывается без блокировки, чтобы медленный хост не задерживал остальные
+    try:
+        result = _original_getaddrinfo(host, port, family, type, proto, flags)
+    except OSError:
+        # Неразрешившееся имя - тоже промах, но в кэш не попадает
+        with _lock:
+            _stats['misses'] += 1
+        raise
+
+    with _lock:
+        _stats['misses'] += 1
+        _entries[key] = (now + _ttl, result)
+    return list(result)
+
+def install_dns_cache(ttl: float):
+    """Подменяет socket.getaddrinfo кэширующей версией (повторный вызов
+    только меняет ttl). Ошибки резолвера не кэшируются."""
+    global _ttl
+
+    with _lock:
+        _ttl = ttl
+        if ttl > 0:
+            socket.getaddrinfo = _cached_getaddrinfo
+        else:
+            socket.getaddrinfo = _original_getaddrinfo
+            _entries.clear()
+
+def dns_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return dict(_stats, entries=len(_entries))
@@ -0,0 +1,219 @@
+"""
+Справочник финансовых показателей по ИНН: выручка и численность для
+компаний, у которых их нет в собранных данных (--financials).
+
+Справочник строится один раз из CSV (--build-financials) в файл SQLite с
+ИНН в первичном ключе, поэтому поиск - один проход по B-дереву, даже
+если ИНН миллионы. Перед базой стоит LRU-кэш найденных и ненайденных ИНН:
+дубликаты и повторные прогоны не обращаются к диску.
+"""
+import os
+import re
+import csv
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from config.settings import CONFIG
+
+_NON_DIGITS_RE = re.compile(r'\D')
+
+# Столбцы справочника сверх FIELD_ALIASES реестра
+_YEAR_ALIASES = ('year', 'год', 'отчетный_год')
+
+_BUILD_BATCH = 50_000
+_LOOKUP_CHUNK = 500
+
+class Financials(NamedTuple):
+    revenue: Optional[float]
+    employees: Optional[int]
+    year: Optional[int]
+
+def _key(inn) -> str:
+    return _NON_DIGITS_RE.sub('', str(inn)) if inn else ''
+
+class FinancialsIndex:
+    def __init__(self, path: str, cache_size: Optional[int] = None):
+        self.path = path
+        self.cache_size = CONFIG.financials_cache_size if cache_size is None else cache_size
+        self.lookups = 0
+        self.cache_hits = 0
+        self.found = 0
+        self._cache: 'OrderedDict[str, Optional[Financials]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        index_dir = os.path.dirname(path)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS financials (
+                inn TEXT PRIMARY KEY,
+                revenue REAL,
+                employees INTEGER,
+                year INTEGER
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def build(self, source_path: str, encoding: str = 'utf-8', revenue_unit: Optional[float] = None) -> int:
+        """Загружает справочник из CSV (ИНН, выручка, численность, год - по
+        названиям столбцов, как в выгрузке реестра). Выручка умножается на
+        revenue_unit (по умолчанию CONFIG.registry_revenue_unit, как в
+        RegistryCollector). Если ИНН встречается несколько раз, остается
+        строка за самый поздний год. Возвращает число прочитанных строк."""
+        from ..data_collectors.registry_collector import FIELD_ALIASES, parse_number
+
+        revenue_unit = CONFIG.registry_revenue_unit if revenue_unit is None else revenue_unit
+
+        aliases = {alias: field for field in ('inn', 'revenue', 'employees') for alias in FIELD_ALIASES[field]}
+        aliases.update((alias, 'year') for alias in _YEAR_ALIASES)
+
+        rows_read = 0
+        with open(source_path, encoding=encoding, newline='') as f:
+            header_line = f.readline().lstrip('\ufeff')
+            delimiter = max(';,\t|', key=header_line.count)
+            header = next(csv.reader([header_line], delimiter=delimiter))
+            columns = {aliases[name.strip().lower()]: index for index, name in enumerate(header)
+                       if name.strip().lower() in aliases}
+            if 'inn' not in columns:
+                raise ValueError(f"В заголовке {source_path} нет столбца ИНН: {header_line.strip()}")
+
+            inn_at = columns['inn']
+            revenue_at = columns.get('revenue')
+            employees_at = columns.get('employees')
+            year_at = columns.get('year')
+            width = max(columns.values()) + 1
+
+            batch = []
+            for row in csv.reader(f, delimiter=delimiter):
+                rows_read += 1
+                if len(row) < width:
+                    row += [''] * (width - len(row))
+                inn = _key(row[inn_at])
+                if not inn:
+                    continue
+                revenue = parse_number(row[revenue_at]) if revenue_at is not None else None
+                employees = parse_number(row[employees_at]) if employees_at is not None else None
+                year = parse_number(row[year_at]) if year_at is not None else None
+                batch.append((inn, revenue * revenue_unit if revenue is not None else None,
+                              int(employees) if employees is not None else None,
+                              int(year) if year is not None else None))
+                if len(batch) >= _BUILD_BATCH:
+                    self._insert(batch)
+                    batch = []
+            self._insert(batch)
+
+        with self._lock:
+            self._cache.clear()
+        return rows_read
+
+    def _insert(self, batch):
+        if not batch:
+            return
+        with self._lock:
+            # Строка за более ранний год или без года не затирает строку с годом
+            self._conn.executemany("""
+                INSERT INTO financials VALUES (?, ?, ?, ?)
+                ON CONFLICT(inn) DO UPDATE SET
+                    revenue = excluded.revenue, employees = excluded.employees, year = excluded.year
+                WHERE financials.year IS NULL OR excluded.year >= financials.year
+            """, batch)
+            self._conn.commit()
+
+    def lookup(self, inn: str) -> Optional[Financials]:
+        key = _key(inn)
+        if not key:
+            return None
+
+        with self._lock:
+            self.lookups += 1
+            if key in self._cache:
+                self.cache_hits += 1
+                self._cache.move_to_end(key)
+                financials = self._cache[key]
+                if financials is not None:
+                    self.found += 1
+                return financials
+
+            row = self._conn.execute(
+                "SELECT revenue, employees, year FROM financials WHERE inn = ?", (key,)
+            ).fetchone()
+            financials = Financials(*row) if row else None
+            self._remember(key, financials)
+            if financials is not None:
+                self.found += 1
+            return financials
+
+    def lookup_many(self, inns: Iterable[str]) -> Dict[str, Financials]:
+        """Найденные показатели по ИНН из inns; ненайденных ИНН в ответе нет."""
+        found: Dict[str, Financials] = {}
+        missing = []
+        keys = []
+        with self._lock:
+            for inn in inns:
+                key = _key(inn)
+                if not key:
+                    continue
+                keys.append(key)
+                if key in self._cache:
+                    self.cache_hits += 1
+                    self._cache.move_to_end(key)
+                    if self._cache[key] is not None:
+                        found[key] = self._cache[key]
+                else:
+                    missing.append(key)
+
+            missing = list(dict.fromkeys(missing))
+            for start in range(0, len(missing), _LOOKUP_CHUNK):
+                chunk = missing[start:start + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT inn, revenue, employees, year FROM financials "
+                    f"WHERE inn IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                fetched = {inn: Financials(revenue, employees, year) for inn, revenue, employees, year in rows}
+                for key in chunk:
+                    self._remember(key, fetched.get(key))
+                found.update(fetched)
+            # Как и в lookup, обращения и находки считаются по каждому ИНН из inns, с повторами
+            self.lookups += len(keys)
+            self.found += sum(1 for key in keys if key in found)
+        return found
+
+    def _remember(self, key: str, financials: Optional[Financials]):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = financials
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM financials").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'lookups': self.lookups, 'cache_hits': self.cache_hits, 'found': self.found,
+                    'cached': len(self._cache)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_shared_indexes: Dict[str, FinancialsIndex] = {}
+_shared_indexes_lock = threading.Lock()
+
+def get_financials_index() -> Optional[FinancialsIndex]:
+    """Общий для процесса справочник, если он включен в CONFIG.financials_path."""
+    path = CONFIG.financials_path
+    if not path:
+        return None
+
+    with _shared_indexes_lock:
+        index = _shared_indexes.get(path)
+        if index is None:
+            index = _shared_indexes[path] = FinancialsIndex(path)
+        return index
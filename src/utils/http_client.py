@@ -1,19 +1,318 @@
+import os
+import re
+import json
 import time
-import random
-from typing import Optional
+import codecs
+import logging
+import sqlite3
+import threading
+from typing import Callable, Optional, Dict
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 import requests
-from fake_useragent import UserAgent
+import requests.adapters
+from requests.structures import CaseInsensitiveDict
+
+from config.settings import CONFIG
+from .dns_cache import install_dns_cache
+from .metrics import HTTP_BYTES, HTTP_RESPONSES, HTTP_SECONDS
+from .user_agents import UserAgentPool, load_user_agent_pool
+from .rate_limiter import RateLimiter, RETRY_STATUS_CODES, backoff_delay, is_name_resolution_error, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Заголовки, которые теряют смысл после того, как requests уже распаковал тело
+_HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+TEXT_CONTENT_TYPES = ('text/', 'application/xhtml+xml', 'application/xml')
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+_META_SNIFF_BYTES = 4096
+
+def charset_from_headers(headers) -> Optional[str]:
+    content_type = headers.get('Content-Type', '')
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip():
+            return _known_codec(value.strip().strip('"\''))
+    return None
+
+def charset_from_body(head: bytes) -> Optional[str]:
+    """Кодировка из BOM или <meta charset> в начале документа."""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    match = _META_CHARSET_RE.search(head[:_META_SNIFF_BYTES])
+    return _known_codec(match.group(1).decode('ascii')) if match else None
+
+def _known_codec(name: str) -> Optional[str]:
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+def is_text_content_type(headers) -> bool:
+    content_type = headers.get('Content-Type', '').split(';')[0].strip().lower()
+    return not content_type or content_type.startswith(TEXT_CONTENT_TYPES)
+
+class ResponseCache:
+    """Дисковый кэш HTTP-ответов в одном файле SQLite.
+
+    Записи живут ttl секунд, после чего перепроверяются условным запросом
+    (If-None-Match / If-Modified-Since). Суммарный размер тел ограничен
+    max_bytes, лишнее вытесняется по давности последнего обращения (LRU).
+    """
+
+    def __init__(self, path: str, ttl: float = 24 * 3600, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                encoding TEXT,
+                content BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        parts = urlparse(url.strip())
+        scheme = parts.scheme.lower() or 'https'
+        host = (parts.hostname or '').lower()
+        if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+            host = f"{host}:{parts.port}"
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunparse((scheme, host, parts.path or '/', parts.params, query, ''))
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        key = self.normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status_code, headers, encoding, content, etag, last_modified, stored_at "
+                "FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+        status_code, headers, encoding, content, etag, last_modified, stored_at = row
+        return {
+            'key': key,
+            'status_code': status_code,
+            'headers': json.loads(headers),
+            'encoding': encoding,
+            'content': content,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': stored_at,
+        }
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry['stored_at'] < self.ttl
+
+    def refresh(self, entry: Dict):
+        """Продлевает TTL записи после ответа 304 Not Modified."""
+        entry['stored_at'] = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ? WHERE key = ?", (entry['stored_at'], entry['key']))
+            self._conn.commit()
+
+    def store(self, url: str, response: requests.Response):
+        self.store_content(url, response.status_code, response.headers, response.encoding,
+                           response.content or b'', final_url=response.url)
+
+    def store_content(self, url: str, status_code: int, headers, encoding: Optional[str], content: bytes,
+                      final_url: Optional[str] = None):
+        key = self.normalize_url(url)
+        stored_headers = {k: v for k, v in headers.items() if k.lower() not in _HOP_HEADERS}
+        now = time.time()
+
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, final_url or url, status_code, json.dumps(stored_headers), encoding,
+                 content, headers.get('ETag'), headers.get('Last-Modified'),
+                 now, now, len(content))
+            )
+            self._total_bytes += len(content) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+    @staticmethod
+    def build_response(entry: Dict, url: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status_code']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry['encoding']
+        response.url = url
+        response._content = entry['content']
+        response.from_cache = True
+        return response
+
+    def count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'bytes': self._total_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_shared_caches: Dict[str, ResponseCache] = {}
+_shared_caches_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Возвращает общий для процесса кэш, если он включен в CONFIG.http_cache_path."""
+    path = CONFIG.http_cache_path
+    if not path:
+        return None
+
+    with _shared_caches_lock:
+        cache = _shared_caches.get(path)
+        if cache is None:
+            cache = ResponseCache(path, ttl=CONFIG.http_cache_ttl, max_bytes=CONFIG.http_cache_max_mb * 1024 * 1024)
+            _shared_caches[path] = cache
+        return cache
+
+_shared_session: Optional[requests.Session] = None
+_shared_pool_size = 0
+_shared_user_agent: Optional[UserAgentPool] = None
+_shared_clients: Dict[tuple, 'HttpClient'] = {}
+_shared_clients_lock = threading.RLock()
+
+def get_shared_session(pool_size: Optional[int] = None) -> requests.Session:
+    """Одна requests.Session на процесс, чтобы keep-alive соединения
+    переиспользовались всеми этапами.
+
+    Пул urllib3 на хост вмещает не меньше pool_size соединений (по
+    умолчанию больше из CONFIG.max_in_flight и CONFIG.http_workers), иначе
+    при параллельной загрузке лишние соединения закрываются сразу после
+    ответа. Число хранимых пулов хостов - CONFIG.http_pool_hosts.
+    При первом вызове включается кэш DNS (CONFIG.dns_cache_ttl).
+    """
+    global _shared_session, _shared_pool_size
+
+    pool_size = max(pool_size or 0, CONFIG.max_in_flight, CONFIG.http_workers)
+
+    with _shared_clients_lock:
+        if _shared_session is None:
+            install_dns_cache(CONFIG.dns_cache_ttl)
+            _shared_session = requests.Session()
+
+        if pool_size > _shared_pool_size:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=CONFIG.http_pool_hosts, pool_maxsize=pool_size)
+            _shared_session.mount('http://', adapter)
+            _shared_session.mount('https://', adapter)
+            _shared_pool_size = pool_size
+
+        return _shared_session
+
+def get_user_agent() -> UserAgentPool:
+    """Общий для процесса пул User-Agent из дискового кэша."""
+    global _shared_user_agent
+
+    with _shared_clients_lock:
+        if _shared_user_agent is None:
+            _shared_user_agent = load_user_agent_pool()
+        return _shared_user_agent
+
+def get_http_client(per_host_delay: Optional[float] = None, max_in_flight: Optional[int] = None) -> 'HttpClient':
+    """Реестр клиентов процесса: клиенты с одинаковыми настройками - один
+    объект с общим ограничителем частоты, а все клиенты работают через
+    общую сессию и общий пул соединений."""
+    per_host_delay = CONFIG.per_host_delay if per_host_delay is None else per_host_delay
+    max_in_flight = CONFIG.max_in_flight if max_in_flight is None else max_in_flight
+    key = (per_host_delay, max_in_flight)
+
+    session = get_shared_session(max_in_flight)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = HttpClient(per_host_delay=per_host_delay, max_in_flight=max_in_flight, session=session)
+            _shared_clients[key] = client
+        return client
+
+def shared_client_stats() -> Dict[str, Dict]:
+    """Статистика по хостам, собранная всеми клиентами реестра."""
+    with _shared_clients_lock:
+        clients = list(_shared_clients.values())
+
+    merged: Dict[str, Dict] = {}
+    for client in clients:
+        for host, stats in client.host_stats().items():
+            if host not in merged:
+                merged[host] = stats
+                continue
+            for name, value in stats.items():
+                if name not in ('error_rate', 'rate'):
+                    merged[host][name] += value
+    return merged
 
 class HttpClient:
-    def __init__(self):
-        self.ua = UserAgent()
-        self.session = requests.Session()
-        self.last_request_time = 0
-    
+    def __init__(self, per_host_delay: Optional[float] = None, max_in_flight: Optional[int] = None,
+                 cache: Optional[ResponseCache] = None, limiter: Optional[RateLimiter] = None,
+                 retries: Optional[int] = None, session: Optional[requests.Session] = None):
+        self.ua = get_user_agent()
+        self.session = session if session is not None else get_shared_session(max_in_flight)
+        self.cache = cache if cache is not None else get_response_cache()
+        self.per_host_delay = CONFIG.per_host_delay if per_host_delay is None else per_host_delay
+        self.max_in_flight = CONFIG.max_in_flight if max_in_flight is None else max_in_flight
+        self.retries = CONFIG.http_retries if retries is None else retries
+        if limiter is None:
+            limiter = RateLimiter(rate=1.0 / self.per_host_delay if self.per_host_delay > 0 else float('inf'))
+        self.limiter = limiter
+        self._in_flight = threading.BoundedSemaphore(max(1, self.max_in_flight))
+
     def get(self, url: str, timeout: int = 10) -> Optional[requests.Response]:
         try:
-            self._respectful_delay()
-            
+            cached = self.cache.lookup(url) if self.cache else None
+            if cached and self.cache.is_fresh(cached):
+                self.cache.count('hits')
+                return ResponseCache.build_response(cached, url)
+
             headers = {
                 'User-Agent': self.ua.random,
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -21,23 +320,182 @@ class HttpClient:
                 'Accept-Encoding': 'gzip, deflate',
                 'Connection': 'keep-alive',
             }
-            
-            response = self.session.get(url, headers=headers, timeout=timeout)
+            if cached:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+            response = self._send(url, headers, timeout)
+
+            if cached and response.status_code == 304:
+                self.cache.count('revalidated')
+                self.cache.refresh(cached)
+                return ResponseCache.build_response(cached, url)
+
             response.raise_for_status()
-            
+            HTTP_BYTES.inc(len(response.content or b''))
+
+            if self.cache:
+                self.cache.count('misses')
+                self.cache.store(url, response)
+
             return response
-            
+
+        except requests.RequestException as e:
+            logger.warning("Ошибка HTTP запроса к %s: %s", url, e, extra={'url': url})
+            return None
+
+    def get_text(self, url: str, timeout: int = 10, max_bytes: Optional[int] = None,
+                 stop_when: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """Потоковая загрузка текстовой страницы.
+
+        Content-Type проверяется до чтения тела: PDF, видео и прочие
+        нетекстовые ответы не скачиваются. Читается не больше max_bytes
+        байт. Кодировка берется из заголовка, BOM или <meta charset>
+        (иначе utf-8), без медленного автоопределения. stop_when получает
+        каждый новый декодированный фрагмент и может прервать чтение, если
+        вернет True. В кэш попадают только страницы, прочитанные целиком.
+        """
+        try:
+            cached = self.cache.lookup(url) if self.cache else None
+            if cached and self.cache.is_fresh(cached):
+                self.cache.count('hits')
+                return self._decode_cached(cached)
+
+            headers = {
+                'User-Agent': self.ua.random,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8',
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive',
+            }
+            if cached:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+            response = self._send(url, headers, timeout, stream=True)
+            with self._in_flight:
+                try:
+                    if cached and response.status_code == 304:
+                        self.cache.count('revalidated')
+                        self.cache.refresh(cached)
+                        return self._decode_cached(cached)
+
+                    response.raise_for_status()
+
+                    if not is_text_content_type(response.headers):
+                        logger.info("Пропуск %s: нетекстовый ответ %s", url, response.headers.get('Content-Type'),
+                                    extra={'url': url})
+                        return None
+
+                    body, text, complete = self._read_text(response, max_bytes, stop_when)
+                    HTTP_BYTES.inc(len(body))
+                finally:
+                    response.close()
+
+            if self.cache and complete:
+                self.cache.count('misses')
+                self.cache.store_content(url, response.status_code, response.headers, text[1], body,
+                                         final_url=response.url)
+
+            return text[0]
+
         except requests.RequestException as e:
-            print(f"Ошибка HTTP запроса к {url}: {e}")
+            logger.warning("Ошибка HTTP запроса к %s: %s", url, e, extra={'url': url})
             return None
-    
-    def _respectful_delay(self):
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        min_delay = 1.0
-        if time_since_last < min_delay:
-            sleep_time = min_delay - time_since_last
-            time.sleep(sleep_time + random.uniform(0, 0.5))
-        
-        self.last_request_time = time.time()
\ No newline at end of file
+
+    @staticmethod
+    def _read_text(response: requests.Response, max_bytes: Optional[int],
+                   stop_when: Optional[Callable[[str], bool]]):
+        encoding = charset_from_headers(response.headers)
+        decoder = None
+        head = b''
+        chunks = []
+        pieces = []
+        total = 0
+        complete = True
+
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            if max_bytes is not None and total + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - total]
+                complete = False
+            total += len(chunk)
+            chunks.append(chunk)
+
+            if decoder is None:
+                head += chunk
+                if len(head) < _META_SNIFF_BYTES and complete:
+                    continue
+                encoding = encoding or charset_from_body(head) or 'utf-8'
+                decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                chunk = head
+
+            piece = decoder.decode(chunk)
+            pieces.append(piece)
+
+            if not complete:
+                break
+            if stop_when and stop_when(piece):
+                complete = False
+                break
+
+        if decoder is None:
+            encoding = encoding or charset_from_body(head) or 'utf-8'
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            pieces.append(decoder.decode(head))
+        pieces.append(decoder.decode(b'', final=True))
+
+        return b''.join(chunks), ("".join(pieces), encoding), complete
+
+    @staticmethod
+    def _decode_cached(entry: Dict) -> str:
+        content = entry['content']
+        encoding = charset_from_headers(entry['headers']) or entry['encoding'] or charset_from_body(content) or 'utf-8'
+        return content.decode(encoding, errors='replace')
+
+    def _send(self, url: str, headers: Dict[str, str], timeout: int, stream: bool = False) -> requests.Response:
+        """GET с ограничением частоты по хосту и повторами.
+
+        Таймауты, ошибки соединения и ответы 429/5xx повторяются до
+        self.retries раз; неразрешившееся имя хоста не повторяется.
+        Перед повтором хост блокируется на max(Retry-After, экспоненциальная
+        пауза с джиттером); Retry-After длиннее CONFIG.http_max_retry_after не ждется, ответ возвращается
+        как есть. Пауза до очереди к хосту выдерживается без семафора,
+        поэтому ожидающие запросы не занимают места одновременных.
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire(url)
+            started = time.time()
+            try:
+                with self._in_flight:
+                    response = self.session.get(url, headers=headers, timeout=timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.limiter.record(url, None, time.time() - started)
+                HTTP_RESPONSES.inc(status='error')
+                if attempt >= self.retries or is_name_resolution_error(e):
+                    raise
+                self.limiter.block(url, backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            HTTP_RESPONSES.inc(status=response.status_code)
+            HTTP_SECONDS.observe(time.time() - started)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.limiter.record(url, response.status_code, time.time() - started,
+                                retry_after if response.status_code in RETRY_STATUS_CODES else None)
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                return response
+            if retry_after is not None and retry_after > CONFIG.http_max_retry_after:
+                return response
+
+            response.close()
+            self.limiter.block(url, max(retry_after or 0.0, backoff_delay(attempt)))
+            attempt += 1
+
+    def host_stats(self) -> Dict[str, Dict]:
+        return self.limiter.stats()
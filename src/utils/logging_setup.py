@@ -0,0 +1,45 @@
+"""
+Настройка журналирования: обычный текст или JSON-строки для разбора.
+"""
+import sys
+import json
+import logging
+from typing import Optional
+
+# Атрибуты LogRecord, которые есть у любой записи; остальное - поля из extra=
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON; поля из extra= попадают в нее как есть."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _STANDARD_ATTRS and not name.startswith('_'):
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def configure_logging(level: str = 'INFO', json_lines: bool = False, stream=None,
+                      filename: Optional[str] = None):
+    """Настраивает корневой логгер; повторный вызов заменяет обработчик."""
+    handler = logging.FileHandler(filename, encoding='utf-8') if filename else logging.StreamHandler(stream or sys.stderr)
+    if json_lines:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s %(name)s: %(message)s', '%H:%M:%S'))
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    # urllib3 пишет о каждом повторе соединения; его предупреждения дублируют наши
+    logging.getLogger('urllib3').setLevel(max(root.level, logging.ERROR))
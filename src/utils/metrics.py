@@ -0,0 +1,224 @@
+"""
+Метрики прогона: счетчики и гистограммы с метками, экспорт в JSON и
+текстовый формат Prometheus, отдача по HTTP во время прогона.
+"""
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> List[Tuple[LabelKey, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def to_prometheus(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(key)} {value:g}" for key, value in self.samples()]
+        return lines
+
+    def to_dict(self) -> Dict:
+        return {'type': 'counter', 'help': self.help,
+                'samples': [{'labels': dict(key), 'value': value} for key, value in self.samples()]}
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, как в Prometheus."""
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Счетчики по корзинам (последняя - +Inf), сумма, количество
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[Tuple[LabelKey, List[int], float, int]]:
+        with self._lock:
+            return [(key, list(series[0]), series[1], series[2]) for key, series in self._series.items()]
+
+    def to_prometheus(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts, total, count in self.samples():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def to_dict(self) -> Dict:
+        return {
+            'type': 'histogram', 'help': self.help, 'buckets': list(self.buckets),
+            'samples': [{'labels': dict(key), 'counts': counts, 'sum': total, 'count': count}
+                        for key, counts, total, count in self.samples()],
+        }
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str = '') -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str = '', buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, help_text, buckets))
+
+    def _get_or_create(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.to_prometheus()) + '\n'
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {name: metric.to_dict() for name, metric in metrics.items()}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def write(self, path: str):
+        """Сохраняет метрики: .prom/.txt - формат Prometheus, иначе JSON."""
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+METRICS = MetricsRegistry()
+
+RECORDS_IN = METRICS.counter('pipeline_records_in_total', 'Записи, поступившие на этап')
+RECORDS_OUT = METRICS.counter('pipeline_records_out_total', 'Записи, прошедшие этап')
+REJECTED = METRICS.counter('pipeline_rejected_total', 'Записи, отброшенные этапом, по причинам')
+STAGE_SECONDS = METRICS.histogram('pipeline_stage_seconds', 'Время выполнения этапа')
+HTTP_RESPONSES = METRICS.counter('http_responses_total', 'HTTP-ответы по кодам (error - сетевая ошибка)')
+HTTP_BYTES = METRICS.counter('http_response_bytes_total', 'Прочитано байт тела ответов')
+HTTP_SECONDS = METRICS.histogram('http_request_seconds', 'Время HTTP-запроса до заголовков ответа')
+
+def count_stage(stage: str, records_in: int, records_out: int):
+    RECORDS_IN.inc(records_in, stage=stage)
+    RECORDS_OUT.inc(records_out, stage=stage)
+
+def reject(stage: str, reason: str, amount: int = 1):
+    if amount:
+        REJECTED.inc(amount, stage=stage, reason=reason)
+
+class StageTally:
+    """Счетчики этапа для циклов по отдельным записям.
+
+    Считает в обычных полях и переносит в общие метрики пачками по
+    flush_every записей и при flush(), чтобы не брать блокировку на
+    каждую запись.
+    """
+
+    def __init__(self, stage: str, flush_every: int = 1000):
+        self.stage = stage
+        self.flush_every = flush_every
+        self.records_in = 0
+        self.records_out = 0
+        self.rejected: Dict[str, int] = {}
+
+    def passed(self):
+        self.records_in += 1
+        self.records_out += 1
+        if self.records_in >= self.flush_every:
+            self.flush()
+
+    def reject(self, reason: str, amount: int = 1):
+        self.records_in += amount
+        self.rejected[reason] = self.rejected.get(reason, 0) + amount
+        if self.records_in >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        count_stage(self.stage, self.records_in, self.records_out)
+        for reason, amount in self.rejected.items():
+            reject(self.stage, reason, amount)
+        self.records_in = 0
+        self.records_out = 0
+        self.rejected = {}
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/metrics':
+            body, content_type = METRICS.to_prometheus(), 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path.rstrip('/') == '/metrics.json':
+            body, content_type = METRICS.to_json(), 'application/json; charset=utf-8'
+        else:
+            self.send_error(404)
+            return
+
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def serve_metrics(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Отдает /metrics (Prometheus) и /metrics.json из фонового потока."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,122 @@
+"""
+Хранилище загруженных страниц для повторного анализа без сети (--reanalyze).
+
+Текст страницы сжимается zlib и хранится по sha256 содержимого, поэтому
+одинаковые страницы (зеркала, заглушки хостинга, «сайт в разработке»)
+занимают место один раз; отдельная таблица связывает URL с хэшем.
+"""
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from config.settings import CONFIG
+
+class PageStore:
+    def __init__(self, path: str, compression_level: int = 6):
+        self.path = path
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+
+        store_dir = os.path.dirname(path)
+        if store_dir and not os.path.exists(store_dir):
+            os.makedirs(store_dir)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_digest ON pages (digest)")
+        self._conn.commit()
+
+    @staticmethod
+    def digest(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def save(self, url: str, text: str) -> str:
+        """Сохраняет страницу url; возвращает хэш содержимого."""
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        # Сжатие - вне блокировки: потоки загрузки не ждут друг друга
+        compressed = None
+
+        with self._lock:
+            known = self._has_blob(digest)
+        if not known:
+            compressed = zlib.compress(data, self.compression_level)
+
+        with self._lock:
+            previous = self._conn.execute("SELECT digest FROM pages WHERE url = ?", (url,)).fetchone()
+            if compressed is None and not self._has_blob(digest):
+                # Между проверками другой поток удалил блоб как осиротевший
+                compressed = zlib.compress(data, self.compression_level)
+            if compressed is not None:
+                self._conn.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?)",
+                                   (digest, compressed, len(data), len(compressed)))
+            self._conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (url, digest, time.time()))
+            if previous and previous[0] != digest:
+                self._delete_orphan(previous[0])
+            self._conn.commit()
+        return digest
+
+    def _has_blob(self, digest: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def _delete_orphan(self, digest: str):
+        referenced = self._conn.execute("SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if not referenced:
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+
+    def load(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blobs.content FROM pages JOIN blobs ON blobs.digest = pages.digest WHERE pages.url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blobs, size, stored_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+            ).fetchone()
+        return {'pages': pages, 'unique_pages': blobs, 'bytes': size, 'stored_bytes': stored_size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_shared_stores: Dict[str, PageStore] = {}
+_shared_stores_lock = threading.Lock()
+
+def get_page_store() -> Optional[PageStore]:
+    """Возвращает общее для процесса хранилище, если оно включено в CONFIG.page_store_path."""
+    path = CONFIG.page_store_path
+    if not path:
+        return None
+
+    with _shared_stores_lock:
+        store = _shared_stores.get(path)
+        if store is None:
+            store = _shared_stores[path] = PageStore(path)
+        return store
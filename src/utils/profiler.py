@@ -0,0 +1,235 @@
+"""
+Профилирование этапов конвейера (--profile).
+
+Для каждого этапа сохраняются:
+- <NN>_<этап>.pstats - cProfile основного потока (python -m pstats, snakeviz);
+- время wall и CPU процесса, пик памяти Python по tracemalloc - summary.json;
+- стеки всех потоков, снятые сэмплером, - stacks.collapsed в формате
+  flamegraph.pl / speedscope; корень стека - имя этапа и потока.
+
+cProfile видит только основной поток, поэтому ожидание сети в пуле
+WebsiteParser видно в stacks.collapsed, а не в pstats.
+
+В потоковом режиме этапы - генераторы, вложенные друг в друга, и работают
+внутри одного этапа stream. Каждый из них оборачивается profile_iter: время
+внутри next() за вычетом времени предыдущего этапа попадает в summary.json
+строкой под stream, а стеки - под именем этого этапа. Отдельного pstats и
+пика памяти у таких этапов нет.
+"""
+import os
+import re
+import sys
+import json
+import time
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .metrics import STAGE_SECONDS
+
+_THREAD_SUFFIX_RE = re.compile(r'[-_]\d+')
+
+class StackSampler(threading.Thread):
+    """Раз в interval секунд снимает стеки всех потоков и считает
+    одинаковые в формате collapsed stacks."""
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.interval = interval
+        self.stage: Optional[str] = None
+        self.counts: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_ident = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            stage = self.stage
+            if stage is None:
+                continue
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                # Потоки пула различаются только номером - сводим их в один корень
+                thread_name = _THREAD_SUFFIX_RE.sub('', names.get(ident, 'thread'))
+                self.counts[';'.join([stage, thread_name] + _frame_labels(frame))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def _frame_labels(frame) -> List[str]:
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+class StageProfiler:
+    def __init__(self, output_dir: str, sample_interval: float = 0.005, trace_memory: bool = True):
+        self.output_dir = output_dir
+        self.trace_memory = trace_memory
+        self.stages: List[Dict] = []
+        self._active: List[str] = []
+        self._sampler = StackSampler(sample_interval)
+        # Этапы-генераторы внутри текущего этапа: имя -> [wall, CPU] с учетом предыдущих
+        self._iter_stages: Dict[str, List[float]] = {}
+
+    def start(self):
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._sampler.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        # Вложенный этап считается частью внешнего: второй cProfile включить нельзя
+        if self._active:
+            yield
+            return
+
+        self._active.append(name)
+        self._sampler.stage = name
+        if tracemalloc.is_tracing():
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            else:
+                # В Python 3.8 reset_peak нет: пик сбрасывается перезапуском трассировки
+                tracemalloc.stop()
+                tracemalloc.start()
+        profile = cProfile.Profile()
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - wall_started
+            cpu = time.process_time() - cpu_started
+            peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+            self._sampler.stage = None
+            self._active.pop()
+
+            pstats_path = os.path.join(self.output_dir, f"{len(self.stages) + 1:02d}_{name}.pstats")
+            profile.dump_stats(pstats_path)
+            self.stages.append({
+                'stage': name,
+                'wall_seconds': round(wall, 6),
+                'cpu_seconds': round(cpu, 6),
+                # Меньше 1 - этап в основном ждет (сеть, диск, другие потоки)
+                'cpu_ratio': round(cpu / wall, 3) if wall > 0 else None,
+                'peak_memory_bytes': peak,
+                'pstats': os.path.basename(pstats_path),
+            })
+            self._add_iter_stages(name)
+
+    def _add_iter_stages(self, parent: str):
+        previous_wall = previous_cpu = 0.0
+        for name, (wall, cpu) in self._iter_stages.items():
+            # Время next() этапа включает время предыдущих, у которых он берет данные
+            own_wall, own_cpu = max(wall - previous_wall, 0.0), max(cpu - previous_cpu, 0.0)
+            previous_wall, previous_cpu = wall, cpu
+            self.stages.append({
+                'stage': name,
+                'parent': parent,
+                'wall_seconds': round(own_wall, 6),
+                'cpu_seconds': round(own_cpu, 6),
+                'cpu_ratio': round(own_cpu / own_wall, 3) if own_wall > 0 else None,
+                'peak_memory_bytes': None,
+                'pstats': None,
+            })
+        self._iter_stages = {}
+
+    def iter_stage(self, name: str, iterable: Iterable) -> Iterator:
+        # Этап регистрируется при сборке конвейера, то есть от источника к выходу
+        totals = self._iter_stages.setdefault(name, [0.0, 0.0])
+        return self._timed_iter(name, iter(iterable), totals)
+
+    def _timed_iter(self, name: str, iterator: Iterator, totals: List[float]) -> Iterator:
+        while True:
+            outer_stage = self._sampler.stage
+            self._sampler.stage = name
+            wall_started = time.perf_counter()
+            cpu_started = time.process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                totals[0] += time.perf_counter() - wall_started
+                totals[1] += time.process_time() - cpu_started
+                self._sampler.stage = outer_stage
+            yield item
+
+    def finish(self) -> str:
+        """Останавливает сэмплер, пишет stacks.collapsed и summary.json;
+        возвращает путь к summary.json."""
+        self._sampler.stop()
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        stacks_path = os.path.join(self.output_dir, 'stacks.collapsed')
+        with open(stacks_path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self._sampler.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+        summary_path = os.path.join(self.output_dir, 'summary.json')
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump({'sample_interval': self._sampler.interval, 'stages': self.stages,
+                       'stacks': os.path.basename(stacks_path)}, f, ensure_ascii=False, indent=2)
+        return summary_path
+
+    def print_summary(self):
+        print("\nПрофиль этапов:")
+        print(f"   {'этап':20} {'wall, с':>9} {'CPU, с':>9} {'CPU/wall':>9} {'пик памяти':>12}")
+        for entry in self.stages:
+            peak = entry['peak_memory_bytes']
+            peak_text = f"{peak / 1024 / 1024:.1f} МБ" if peak is not None else '-'
+            ratio_text = f"{entry['cpu_ratio']:.2f}" if entry['cpu_ratio'] is not None else '-'
+            stage = f"  {entry['stage']}" if entry.get('parent') else entry['stage']
+            print(f"   {stage:20} {entry['wall_seconds']:9.3f} {entry['cpu_seconds']:9.3f} "
+                  f"{ratio_text:>9} {peak_text:>12}")
+
+_profiler: Optional[StageProfiler] = None
+
+def start_profiling(output_dir: str, sample_interval: float = 0.005, trace_memory: bool = True) -> StageProfiler:
+    global _profiler
+    _profiler = StageProfiler(output_dir, sample_interval, trace_memory)
+    _profiler.start()
+    return _profiler
+
+def stop_profiling() -> Optional[str]:
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    summary_path = profiler.finish()
+    profiler.print_summary()
+    return summary_path
+
+@contextmanager
+def profile_stage(name: str):
+    """Время этапа в метриках; при включенном --profile - еще и профиль."""
+    with STAGE_SECONDS.time(stage=name):
+        profiler = _profiler
+        if profiler is None:
+            yield
+        else:
+            with profiler.stage(name):
+                yield
+
+def profile_iter(name: str, iterable: Iterable) -> Iterable:
+    """Этап потокового конвейера: при включенном --profile его время
+    отдельной строкой входит в профиль внешнего этапа, иначе iterable
+    возвращается как есть."""
+    profiler = _profiler
+    if profiler is None:
+        return iterable
+    return profiler.iter_stage(name, iterable)
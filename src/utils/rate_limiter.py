@@ -0,0 +1,183 @@
+"""
+Ограничение частоты запросов по хостам: token bucket, Retry-After,
+экспоненциальная пауза между повторами и адаптивное замедление.
+"""
+import time
+import random
+import socket
+import threading
+from dataclasses import dataclass, asdict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from config.settings import CONFIG
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+THROTTLE_STATUS_CODES = (429, 503)
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах: число секунд или HTTP-дата."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """Пауза перед повтором номер attempt (с нуля): base * 2**attempt
+    с полным джиттером, не больше cap."""
+    base = CONFIG.http_backoff_base if base is None else base
+    cap = CONFIG.http_backoff_max if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def is_name_resolution_error(error: BaseException) -> bool:
+    """Ошибка соединения вызвана тем, что имя хоста не разрешилось (в цепочке
+    исключений requests/urllib3 есть socket.gaierror). Такой хост не
+    появится за время пауз между повторами, поэтому повторять запрос незачем."""
+    pending = [error]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, socket.gaierror):
+            return True
+        # requests кладет MaxRetryError в args, а urllib3 - причину в reason
+        pending += [current.__cause__, current.__context__, getattr(current, 'reason', None)]
+        pending += [arg for arg in current.args if isinstance(arg, BaseException)]
+    return False
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    retries: int = 0
+    wait_seconds: float = 0.0
+    latency_seconds: float = 0.0
+    error_rate: float = 0.0
+    rate: float = 0.0
+
+class _HostBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self.blocked_until = 0.0
+        self.stats = HostStats(rate=rate)
+
+class RateLimiter:
+    """Token bucket на каждый хост.
+
+    Ведро пополняется со скоростью rate запросов в секунду и вмещает burst
+    запросов; при burst=1 это прежняя минимальная пауза 1 / rate между
+    запросами к хосту. Токен резервируется под блокировкой, а ожидание идет
+    без нее, поэтому разные хосты не ждут друг друга.
+
+    Скорость подстраивается по ответам: 429/503 и рост доли ошибок выше
+    error_threshold уменьшают ее вдвое (не ниже min_rate), успешные ответы
+    понемногу возвращают ее вверх до max_rate. Retry-After и пауза перед
+    повтором блокируют хост целиком.
+    """
+
+    # Вес последнего ответа в скользящей доле ошибок
+    ERROR_RATE_WEIGHT = 0.2
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None,
+                 max_rate: Optional[float] = None, min_rate: Optional[float] = None,
+                 error_threshold: Optional[float] = None, jitter: float = 0.5):
+        if rate is None:
+            rate = 1.0 / CONFIG.per_host_delay if CONFIG.per_host_delay > 0 else float('inf')
+        self.rate = rate
+        self.burst = max(1, CONFIG.host_burst if burst is None else burst)
+        max_rate = CONFIG.host_max_rate if max_rate is None else max_rate
+        self.max_rate = max(rate, max_rate or rate)
+        self.min_rate = min(rate, CONFIG.host_min_rate if min_rate is None else min_rate)
+        self.error_threshold = CONFIG.host_error_threshold if error_threshold is None else error_threshold
+        self.jitter = jitter if rate != float('inf') else 0.0
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _HostBucket(self.rate, self.burst)
+        return bucket
+
+    def acquire(self, url: str) -> float:
+        """Ждет своей очереди к хосту и возвращает время ожидания."""
+        host = host_of(url)
+
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.time()
+            if bucket.rate != float('inf'):
+                bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+
+            start = max(now, bucket.blocked_until)
+            if bucket.rate == float('inf'):
+                wait = start - now
+            else:
+                # Токен берется в долг: отрицательный остаток означает очередь к хосту
+                bucket.tokens -= 1
+                deficit = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+                wait = max(start - now, deficit)
+                if self.jitter and bucket.tokens < 0:
+                    wait += random.uniform(0, self.jitter)
+            bucket.stats.requests += 1
+            bucket.stats.wait_seconds += wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record(self, url: str, status_code: Optional[int] = None, latency: float = 0.0,
+               retry_after: Optional[float] = None):
+        """Учитывает ответ (status_code) или сетевую ошибку (status_code=None).
+
+        Retry-After блокирует хост, но не дольше CONFIG.http_max_retry_after.
+        """
+        host = host_of(url)
+        failed = status_code is None or status_code in RETRY_STATUS_CODES
+        throttled = status_code in THROTTLE_STATUS_CODES
+
+        with self._lock:
+            bucket = self._bucket(host)
+            stats = bucket.stats
+            stats.latency_seconds += latency
+            stats.errors += failed
+            stats.throttled += throttled
+            stats.error_rate += self.ERROR_RATE_WEIGHT * (failed - stats.error_rate)
+
+            if bucket.rate != float('inf'):
+                if throttled or (failed and stats.error_rate > self.error_threshold):
+                    bucket.rate = max(self.min_rate, bucket.rate / 2)
+                elif not failed and stats.error_rate < self.error_threshold / 2:
+                    bucket.rate = min(self.max_rate, bucket.rate + self.rate * 0.1)
+            stats.rate = bucket.rate
+
+            if retry_after is not None:
+                retry_after = min(retry_after, CONFIG.http_max_retry_after)
+                bucket.blocked_until = max(bucket.blocked_until, time.time() + retry_after)
+
+    def block(self, url: str, seconds: float):
+        """Не пускать запросы к хосту seconds секунд (пауза перед повтором)."""
+        with self._lock:
+            bucket = self._bucket(host_of(url))
+            bucket.stats.retries += 1
+            bucket.blocked_until = max(bucket.blocked_until, time.time() + seconds)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {host: asdict(bucket.stats) for host, bucket in self._buckets.items()}
@@ -0,0 +1,62 @@
+"""
+Выбор формата файла результатов по расширению: .csv, .parquet/.pq, .arrow/.feather/.ipc.
+"""
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+from ..data_collectors.base import CompanyData
+from .csv_handler import CsvHandler, CompanyCsvWriter
+from .columnar_handler import ColumnarHandler, ColumnarCompanyWriter
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+def is_columnar(filepath: str) -> bool:
+    return ColumnarHandler.format_for_path(filepath) is not None
+
+def save_companies(companies: List[CompanyData], filepath: str, quiet: bool = False):
+    if is_columnar(filepath):
+        ColumnarHandler.save_companies(companies, filepath, quiet=quiet)
+    else:
+        CsvHandler.save_companies_to_csv(companies, filepath, quiet=quiet)
+
+def save_dataframe(df: 'pd.DataFrame', filepath: str, quiet: bool = False):
+    if is_columnar(filepath):
+        ColumnarHandler.save_dataframe(df, filepath, quiet=quiet)
+    else:
+        CsvHandler.save_dataframe_to_csv(df, filepath, quiet=quiet)
+
+def load_companies(filepath: str, quiet: bool = False) -> List[CompanyData]:
+    if is_columnar(filepath):
+        return ColumnarHandler.load_companies(filepath, quiet=quiet)
+    return CsvHandler.load_companies_from_csv(filepath, quiet=quiet)
+
+def iter_companies(filepath: str, chunksize: int = 100_000) -> Iterator[CompanyData]:
+    if is_columnar(filepath):
+        for chunk in ColumnarHandler.iter_dataframes(filepath, batch_size=chunksize):
+            yield from CsvHandler.dataframe_to_companies(chunk)
+    else:
+        yield from CsvHandler.iter_companies_from_csv(filepath, chunksize=chunksize)
+
+def read_columns(filepath: str, columns: Optional[List[str]] = None) -> 'pd.DataFrame':
+    if is_columnar(filepath):
+        return ColumnarHandler.read_dataframe(filepath, columns)
+    return CsvHandler.read_csv(filepath, columns=columns)
+
+def iter_dataframes(filepath: str, columns: Optional[List[str]] = None,
+                    chunksize: int = 100_000) -> Iterator['pd.DataFrame']:
+    if is_columnar(filepath):
+        return ColumnarHandler.iter_dataframes(filepath, columns, batch_size=chunksize)
+    return iter(CsvHandler.read_csv(filepath, columns=columns, chunksize=chunksize))
+
+def iter_rows(filepath: str, columns: List[str]) -> Iterator[Tuple]:
+    """Построчные значения столбцов; CSV читается без pandas."""
+    if is_columnar(filepath):
+        for chunk in ColumnarHandler.iter_dataframes(filepath, columns):
+            yield from chunk.itertuples(index=False, name=None)
+    else:
+        yield from CsvHandler.iter_rows(filepath, columns)
+
+def open_writer(filepath: str):
+    if is_columnar(filepath):
+        return ColumnarCompanyWriter(filepath)
+    return CompanyCsvWriter(filepath)
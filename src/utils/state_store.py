@@ -0,0 +1,97 @@
+"""
+Хранилище состояния прогона для продолжения после сбоя (--resume).
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from dataclasses import asdict
+from typing import Optional
+
+from ..data_collectors.base import CompanyData
+
+class StateStore:
+    """Один файл SQLite с результатами этапов по каждой компании и журналом загрузок.
+
+    Каждая запись фиксируется сразу, поэтому после прерывания прогона
+    все уже обработанные компании остаются в файле.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        state_dir = os.path.dirname(path)
+        if state_dir and not os.path.exists(state_dir):
+            os.makedirs(state_dir)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS company_stages (
+                company_key TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (company_key, stage)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fetches (
+                url TEXT PRIMARY KEY,
+                company_key TEXT,
+                ok INTEGER NOT NULL,
+                error TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def company_key(company: CompanyData) -> str:
+        return str(company.inn or company.site or company.name)
+
+    def save_stage(self, stage: str, company: CompanyData):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO company_stages VALUES (?, ?, ?, ?)",
+                (self.company_key(company), stage, json.dumps(asdict(company), ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+
+    def load_stage(self, stage: str, company: CompanyData) -> Optional[CompanyData]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM company_stages WHERE company_key = ? AND stage = ?",
+                (self.company_key(company), stage)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return CompanyData(**json.loads(row[0]))
+
+    def record_fetch(self, url: str, company: CompanyData, ok: bool, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fetches VALUES (?, ?, ?, ?, ?)",
+                (url, self.company_key(company), int(ok), error, time.time())
+            )
+            self._conn.commit()
+
+    def completed_count(self, stage: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM company_stages WHERE stage = ?", (stage,)
+            ).fetchone()[0]
+
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM company_stages")
+            self._conn.execute("DELETE FROM fetches")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
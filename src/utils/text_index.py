@@ -0,0 +1,309 @@
+"""
+Инвертированный индекс по тексту сайтов компаний для произвольных запросов
+(--query): какие компании упоминают термин, фразу или их сочетание.
+
+Индекс - файл SQLite: словарь терминов, документы (сайт, ИНН, название)
+и списки вхождений термина с позициями слов. Документ переиндексируется,
+только если его текст изменился, поэтому индекс можно пополнять по мере
+загрузки новых страниц.
+
+Запросы:
+    smartcat                       термин
+    smart*                         термины с префиксом
+    "translation memory"           фраза (слова подряд)
+    smartcat OR xtm                любой из
+    trados AND NOT memoq           оба / исключение (AND можно не писать)
+    (smartcat OR xtm) "локализация программ"
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from config.settings import CONFIG
+
+_WORD_RE = re.compile(r'\w+')
+
+_QUERY_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+
+# Сколько идентификаторов терминов держать в памяти при индексации
+_TERM_CACHE_SIZE = 200_000
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+class QueryMatch(NamedTuple):
+    inn: str
+    name: str
+    url: str
+
+class TextIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._term_ids: Dict[str, int] = {}
+
+        index_dir = os.path.dirname(path)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                inn TEXT,
+                name TEXT,
+                digest TEXT NOT NULL,
+                words INTEGER NOT NULL,
+                indexed_at REAL NOT NULL
+            )
+        """)
+        # Позиции - массив uint32 номеров слов в документе
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL,
+                doc_id INTEGER NOT NULL,
+                positions BLOB NOT NULL,
+                PRIMARY KEY (term_id, doc_id)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id)")
+        self._conn.commit()
+
+    def add(self, url: str, text: str, inn: Optional[str] = None, name: Optional[str] = None) -> bool:
+        """Индексирует текст страницы url; False, если он не изменился."""
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            row = self._conn.execute("SELECT id, digest FROM docs WHERE url = ?", (url,)).fetchone()
+        if row and row[1] == digest:
+            return False
+
+        positions: Dict[str, array] = {}
+        words = tokenize(text)
+        for position, word in enumerate(words):
+            entry = positions.get(word)
+            if entry is None:
+                entry = positions[word] = array('I')
+            entry.append(position)
+
+        with self._lock:
+            if row:
+                doc_id = row[0]
+                self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                self._conn.execute("UPDATE docs SET inn = ?, name = ?, digest = ?, words = ?, indexed_at = ? "
+                                   "WHERE id = ?", (inn, name, digest, len(words), time.time(), doc_id))
+            else:
+                doc_id = self._conn.execute(
+                    "INSERT INTO docs (url, inn, name, digest, words, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, inn, name, digest, len(words), time.time())
+                ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?)",
+                ((self._term_id(term), doc_id, entry.tobytes()) for term, entry in positions.items())
+            )
+            self._conn.commit()
+        return True
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            # Индекс может пополняться несколькими процессами: термин мог появиться у соседа
+            self._conn.execute("INSERT OR IGNORE INTO terms (term) VALUES (?)", (term,))
+            term_id = self._conn.execute("SELECT id FROM terms WHERE term = ?", (term,)).fetchone()[0]
+            if len(self._term_ids) >= _TERM_CACHE_SIZE:
+                self._term_ids.clear()
+            self._term_ids[term] = term_id
+        return term_id
+
+    def _docs_for_terms(self, terms: Iterable[str]) -> Set[int]:
+        docs: Set[int] = set()
+        for term in terms:
+            docs.update(row[0] for row in self._conn.execute(
+                "SELECT p.doc_id FROM terms t JOIN postings p ON p.term_id = t.id WHERE t.term = ?", (term,)))
+        return docs
+
+    def _docs_for_prefix(self, prefix: str) -> Set[int]:
+        # Диапазон по уникальному индексу terms.term вместо LIKE, который индекс не использует
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return {row[0] for row in self._conn.execute(
+            "SELECT DISTINCT p.doc_id FROM terms t JOIN postings p ON p.term_id = t.id "
+            "WHERE t.term >= ? AND t.term < ?", (prefix, upper))}
+
+    def _positions(self, term: str, doc_ids: Set[int]) -> Dict[int, array]:
+        row = self._conn.execute("SELECT id FROM terms WHERE term = ?", (term,)).fetchone()
+        if row is None:
+            return {}
+        if len(doc_ids) > 256:
+            # Много кандидатов - дешевле пройти весь список вхождений термина подряд
+            postings = ((doc_id, blob) for doc_id, blob in self._conn.execute(
+                "SELECT doc_id, positions FROM postings WHERE term_id = ?", (row[0],)) if doc_id in doc_ids)
+        else:
+            postings = ((doc_id, posting[0]) for doc_id in doc_ids for posting in self._conn.execute(
+                "SELECT positions FROM postings WHERE term_id = ? AND doc_id = ?", (row[0], doc_id)))
+        result = {}
+        for doc_id, blob in postings:
+            positions = array('I')
+            positions.frombytes(blob)
+            result[doc_id] = positions
+        return result
+
+    def _docs_for_phrase(self, words: List[str]) -> Set[int]:
+        if len(words) == 1:
+            return self._docs_for_terms(words)
+
+        candidates = None
+        for word in sorted(set(words), key=self._document_frequency):
+            docs = self._docs_for_terms([word])
+            candidates = docs if candidates is None else candidates & docs
+            if not candidates:
+                return set()
+
+        # Слово i фразы должно стоять на позиции начала + i
+        starts = {doc_id: None for doc_id in candidates}
+        for offset, word in enumerate(words):
+            for doc_id, positions in self._positions(word, set(starts)).items():
+                found = starts[doc_id]
+                if found is None:
+                    starts[doc_id] = {position - offset for position in positions}
+                else:
+                    starts[doc_id] = found.intersection([position - offset for position in positions])
+            starts = {doc_id: found for doc_id, found in starts.items() if found}
+        return set(starts)
+
+    def _document_frequency(self, term: str) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM terms t JOIN postings p ON p.term_id = t.id WHERE t.term = ?", (term,)
+        ).fetchone()[0]
+
+    def _all_docs(self) -> Set[int]:
+        return {row[0] for row in self._conn.execute("SELECT id FROM docs")}
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[QueryMatch]:
+        """Документы, подходящие под запрос, в порядке добавления в индекс."""
+        with self._lock:
+            doc_ids = _QueryParser(query, self).parse()
+            rows = []
+            ordered = sorted(doc_ids)[:limit] if limit else sorted(doc_ids)
+            for start in range(0, len(ordered), 500):
+                chunk = ordered[start:start + 500]
+                rows += self._conn.execute(
+                    f"SELECT inn, name, url FROM docs WHERE id IN ({','.join('?' * len(chunk))}) ORDER BY id",
+                    chunk).fetchall()
+        return [QueryMatch(inn or '', name or '', url) for inn, name, url in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            docs = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            terms = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+            postings = self._conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+        return {'docs': docs, 'terms': terms, 'postings': postings}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class _QueryParser:
+    """Разбор запроса рекурсивным спуском; результат - множество doc_id.
+
+    or_expr  := and_expr ('OR' and_expr)*
+    and_expr := unary (['AND'] unary)*
+    unary    := 'NOT' unary | '(' or_expr ')' | "фраза" | слово | префикс*
+    """
+
+    def __init__(self, query: str, index: TextIndex):
+        self.index = index
+        self.tokens: List[Tuple[str, str]] = []
+        position = 0
+        query = query.strip()
+        while position < len(query):
+            match = _QUERY_TOKEN_RE.match(query, position)
+            if not match or match.end() == position:
+                raise ValueError(f"Не удалось разобрать запрос с позиции {position}: {query}")
+            position = match.end()
+            if match.group(1):
+                self.tokens.append(('(', '('))
+            elif match.group(2):
+                self.tokens.append((')', ')'))
+            elif match.group(3) is not None:
+                self.tokens.append(('phrase', match.group(3)))
+            elif match.group(4) in ('AND', 'OR', 'NOT'):
+                self.tokens.append((match.group(4), match.group(4)))
+            else:
+                self.tokens.append(('word', match.group(4)))
+        self.position = 0
+
+    def parse(self) -> Set[int]:
+        if not self.tokens:
+            raise ValueError("Пустой запрос")
+        result = self._or_expr()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Лишний элемент запроса: {self.tokens[self.position][1]}")
+        return result
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _or_expr(self) -> Set[int]:
+        result = self._and_expr()
+        while self._peek() == 'OR':
+            self.position += 1
+            result = result | self._and_expr()
+        return result
+
+    def _and_expr(self) -> Set[int]:
+        result = self._unary()
+        while self._peek() in ('AND', 'NOT', '(', 'phrase', 'word'):
+            if self._peek() == 'AND':
+                self.position += 1
+            result = result & self._unary()
+        return result
+
+    def _unary(self) -> Set[int]:
+        kind = self._peek()
+        if kind is None:
+            raise ValueError("Запрос обрывается")
+        kind, value = self.tokens[self.position]
+        self.position += 1
+
+        if kind == 'NOT':
+            return self.index._all_docs() - self._unary()
+        if kind == '(':
+            result = self._or_expr()
+            if self._peek() != ')':
+                raise ValueError("Нет закрывающей скобки")
+            self.position += 1
+            return result
+        if kind == 'word' and value.endswith('*') and len(value) > 1:
+            prefix = tokenize(value[:-1])
+            if len(prefix) == 1:
+                return self.index._docs_for_prefix(prefix[0])
+        if kind in ('word', 'phrase'):
+            words = tokenize(value)
+            if not words:
+                raise ValueError(f"В элементе запроса нет слов: {value}")
+            # Слово с дефисом или точкой ("cat-система") ищется как фраза из своих частей
+            return self.index._docs_for_phrase(words)
+        raise ValueError(f"Неожиданный элемент запроса: {value}")
+
+_shared_indexes: Dict[str, TextIndex] = {}
+_shared_indexes_lock = threading.Lock()
+
+def get_text_index() -> Optional[TextIndex]:
+    """Возвращает общий для процесса индекс, если он включен в CONFIG.text_index_path."""
+    path = CONFIG.text_index_path
+    if not path:
+        return None
+
+    with _shared_indexes_lock:
+        index = _shared_indexes.get(path)
+        if index is None:
+            index = _shared_indexes[path] = TextIndex(path)
+        return index
@@ -0,0 +1,87 @@
+"""
+Небольшой пул User-Agent, сохраненный на диске.
+
+fake_useragent при каждом создании UserAgent() загружает базу из
+нескольких тысяч браузеров; здесь из нее один раз отбираются самые
+распространенные строки, и следующие запуски читают только их.
+"""
+import os
+import json
+import time
+import random
+import logging
+from typing import List, Optional
+
+from config.settings import CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Используются, если fake_useragent недоступен и кэша еще нет
+FALLBACK_USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 Safari/537.36',
+]
+
+class UserAgentPool:
+    """Замена fake_useragent.UserAgent для заголовков: random выбирает
+    строку с учетом доли браузера."""
+
+    def __init__(self, agents: List[str], weights: Optional[List[float]] = None):
+        self.agents = agents
+        self.weights = weights
+
+    @property
+    def random(self) -> str:
+        return random.choices(self.agents, weights=self.weights)[0]
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
+def _build_pool(size: int) -> List[dict]:
+    try:
+        from fake_useragent import UserAgent
+        browsers = UserAgent().data_browsers
+    except Exception as e:
+        logger.warning("Не удалось загрузить базу User-Agent: %s", e)
+        return [{'useragent': agent, 'percent': 1.0} for agent in FALLBACK_USER_AGENTS]
+
+    desktop = [browser for browser in browsers if browser.get('type') == 'desktop'] or browsers
+    desktop.sort(key=lambda browser: browser.get('percent', 0), reverse=True)
+    return [{'useragent': browser['useragent'], 'percent': browser.get('percent', 0) or 0.01}
+            for browser in desktop[:size]]
+
+def load_user_agent_pool(path: Optional[str] = None, max_age: Optional[float] = None,
+                         size: Optional[int] = None) -> UserAgentPool:
+    """Читает пул из path; если файла нет или он старше max_age секунд,
+    строит пул заново и сохраняет его."""
+    path = CONFIG.user_agent_cache_path if path is None else path
+    max_age = CONFIG.user_agent_cache_max_age if max_age is None else max_age
+    size = CONFIG.user_agent_pool_size if size is None else size
+
+    entries = None
+    try:
+        if time.time() - os.path.getmtime(path) < max_age:
+            with open(path, encoding='utf-8') as f:
+                entries = json.load(f)
+    except (OSError, ValueError):
+        entries = None
+
+    if not entries:
+        entries = _build_pool(size)
+        try:
+            cache_dir = os.path.dirname(path)
+            if cache_dir and not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Не удалось сохранить пул User-Agent в %s: %s", path, e)
+
+    return UserAgentPool([entry['useragent'] for entry in entries], [entry['percent'] for entry in entries])
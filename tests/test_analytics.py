@@ -0,0 +1,76 @@
+import pytest
+
+from src.utils.analytics import ResultsAggregator, RevenueStats, RowFilter
+
+def _aggregate(rows, **kwargs):
+    """Строки - словари; в агрегатор они идут кортежами в порядке columns()."""
+    aggregator = ResultsAggregator(**kwargs)
+    columns = aggregator.columns()
+    aggregator.consume(tuple(row.get(column) for column in columns) for row in rows)
+    return aggregator
+
+ROWS = [
+    dict(revenue='100', source='rusprofile', cat_product='Trados', okved_main='74.30'),
+    dict(revenue='300', source='rusprofile', cat_product='memoQ', okved_main='74.30.1'),
+    dict(revenue='0', source='rusprofile', cat_product='Trados', okved_main='62.01'),
+    dict(revenue='', source='website', cat_product='', okved_main=''),
+    dict(revenue='мусор', source='website', cat_product='Trados', okved_main='74.3'),
+]
+
+def test_zero_revenue_is_counted():
+    stats = RevenueStats()
+    for revenue in (0.0, None, 10.0):
+        stats.add(revenue)
+
+    assert stats.count == 3
+    assert stats.revenue_count == 2
+    assert stats.revenue_min == 0.0
+    assert stats.revenue_mean == 5.0
+    assert stats.quantile(0.0) == 0.0
+
+def test_breakdowns_and_total():
+    aggregator = _aggregate(ROWS)
+
+    assert aggregator.rows_read == 5
+    assert aggregator.total.count == 5
+    assert aggregator.total.revenue_count == 3
+    assert aggregator.total.revenue_sum == 400.0
+    assert {key: stats.count for key, stats in aggregator.by_dimension['okved'].items()} == {
+        '74': 3, '62': 1, '': 1}
+    assert aggregator.by_dimension['cat_product']['Trados'].revenue_count == 2
+
+def test_group_by_combines_dimensions():
+    aggregator = _aggregate(ROWS, breakdowns=['source'], group_by=['source', 'cat_product'])
+
+    groups = {key: (stats.count, stats.revenue_sum) for key, stats in aggregator.groups.items()}
+    assert groups == {
+        ('rusprofile', 'Trados'): (2, 100.0),
+        ('rusprofile', 'memoQ'): (1, 300.0),
+        ('website', ''): (1, 0.0),
+        ('website', 'Trados'): (1, 0.0),
+    }
+
+def test_where_filters_and_revenue_range():
+    aggregator = _aggregate(ROWS, breakdowns=['source'],
+                            filters=[RowFilter('cat_product=Trados,memoQ'), RowFilter('okved!=62')])
+    assert aggregator.rows_read == 5
+    assert aggregator.total.count == 3
+    assert aggregator.total.revenue_sum == 400.0
+
+    ranged = _aggregate(ROWS, breakdowns=['source'], revenue_min=0, revenue_max=200)
+    assert ranged.total.count == 2
+    assert ranged.total.revenue_max == 100.0
+
+def test_row_filter_rejects_expression_without_value():
+    with pytest.raises(ValueError):
+        RowFilter('cat_product')
+
+def test_merge_equals_single_pass():
+    whole = _aggregate(ROWS, group_by=['source'])
+    left = _aggregate(ROWS[:2], group_by=['source'])
+    left.merge(_aggregate(ROWS[2:], group_by=['source']))
+
+    assert left.to_dict() == whole.to_dict()
+
+    with pytest.raises(ValueError):
+        left.merge(_aggregate(ROWS, breakdowns=['source']))
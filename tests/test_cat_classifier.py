@@ -0,0 +1,40 @@
+from src.data_collectors.base import CompanyData
+from src.processors.cat_classifier import CatClassifier
+
+def _company(evidence, product=None):
+    return CompanyData(inn='7707083893', name='ООО Ромашка', revenue=2e8, site='romashka.ru',
+                       cat_evidence=evidence, source='rusprofile', cat_product=product)
+
+def test_enhance_wraps_trados_evidence_once():
+    company = _company('использование продукта trados', 'trados')
+
+    once = CatClassifier._enhance_single_company(company).cat_evidence
+    twice = CatClassifier._enhance_single_company(company).cat_evidence
+
+    assert once == 'использование trados (использование продукта trados)'
+    assert twice == once
+
+def test_enhance_sets_product_from_text():
+    assert CatClassifier._enhance_single_company(_company('Работаем в MemoQ')).cat_product == 'MemoQ'
+    assert CatClassifier._enhance_single_company(_company("упоминание 'trados'")).cat_evidence == "упоминание 'trados'"
+
+def test_cat_mask_matches_list_classification(monkeypatch):
+    from src.data_collectors.company_table import CompanyTable
+
+    monkeypatch.setattr('src.processors.cat_classifier.CONFIG.website_classified_sources', ['registry'])
+    companies = [
+        _company('использование Trados Studio и memoQ'),
+        _company('', 'Smartcat'),
+        _company('translation memory и терминологическая база'),
+        _company('без признаков'),
+        _company('без признаков'),
+        _company(None),
+        CompanyData(inn='', name='Бюро Trados memoQ', revenue=None, site='', cat_evidence='', source='catalog'),
+        CompanyData(inn='', name='ООО Реестр', revenue=None, site='', cat_evidence='', source='registry'),
+    ]
+
+    mask = CatClassifier.cat_mask(CompanyTable.from_companies(companies))
+    kept = CatClassifier.classify_companies(companies)
+
+    assert [company for company, keep in zip(companies, mask) if keep] == kept
+    assert mask.tolist() == [True, True, True, False, False, False, True, True]
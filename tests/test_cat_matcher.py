@@ -0,0 +1,44 @@
+import pytest
+
+from src.processors.cat_matcher import CatMatcher
+
+@pytest.fixture
+def matcher():
+    return CatMatcher.from_config(word_boundaries=True)
+
+@pytest.mark.parametrize('text, term', [
+    ('Оказываем услуги локализации игр', 'локализация'),
+    ('Система управления терминологией', 'терминология'),
+    ('Software localizations for EMEA', 'localization'),
+    ('We keep translation memories per client', 'translation memory'),
+    ('Работаем в Trados Studio', 'trados'),
+    ('Внедрение cat-системы', 'cat-система'),
+])
+def test_long_terms_match_word_forms(matcher, text, term):
+    assert term in matcher.found_terms(text)
+
+@pytest.mark.parametrize('text', [
+    'Верстка на HTML5 и XHTML',
+    'Стандарт ATMS и atm',
+    'Пишем paraphrase-тексты',
+    'Нелокализация',
+])
+def test_short_and_mid_word_terms_do_not_match(matcher, text):
+    assert matcher.found_terms(text) == set()
+
+def test_short_terms_match_as_whole_words(matcher):
+    assert matcher.found_terms('TM, TMS-платформа и tms') == {'tm', 'tms'}
+
+def test_without_word_boundaries_terms_are_substrings():
+    matcher = CatMatcher.from_config(word_boundaries=False)
+
+    assert {'tm', 'tms'} <= matcher.found_terms('xhtml atms')
+    assert 'localization' in matcher.found_terms('localizations')
+    assert 'локализация' not in matcher.found_terms('услуги локализации')
+
+def test_matches_report_configured_term_and_position(matcher):
+    (match,) = matcher.find_all('Про translation memories')
+
+    assert match.term == 'translation memory'
+    assert match.category == 'keyword'
+    assert 'про translation memories'[match.start:match.end] == 'translation memor'
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from src.data_collectors.base import CompanyData
+from src.utils.columnar_handler import ColumnarCompanyWriter, ColumnarHandler
+
+SOURCES = ['rusprofile', 'registry', 'translation_directory']
+PRODUCTS = [None, 'trados', 'memoq', 'smartcat', None]
+COUNTRIES = ['Россия', None, 'Беларусь']
+
+def _companies(count):
+    return [CompanyData(inn=f'77{i:08d}', name=f'ООО Компания {i}', revenue=1e8 + i, site=f'c{i}.ru',
+                        cat_evidence=f'упоминание {i}', source=SOURCES[i % 3], cat_product=PRODUCTS[i % 5],
+                        employees=i if i % 4 else None, okved_main='74.30', country=COUNTRIES[i % 3])
+                for i in range(count)]
+
+@pytest.mark.parametrize('extension', ['.parquet', '.arrow', '.feather'])
+def test_writer_round_trips_batches_with_new_category_values(tmp_path, extension):
+    # Каждый следующий пакет приносит новые значения source/cat_product/country
+    path = str(tmp_path / f'companies{extension}')
+    companies = _companies(11)
+
+    with ColumnarCompanyWriter(path, batch_size=2) as writer:
+        for company in companies:
+            writer.write(company)
+
+    loaded = ColumnarHandler.load_companies(path, quiet=True)
+
+    assert writer.count == len(companies)
+    assert [(c.inn, c.source, c.cat_product, c.country, c.employees) for c in loaded] == \
+           [(c.inn, c.source, c.cat_product, c.country, c.employees) for c in companies]
+
+@pytest.mark.parametrize('extension', ['.parquet', '.arrow'])
+def test_iter_dataframes_reads_every_batch(tmp_path, extension):
+    path = str(tmp_path / f'companies{extension}')
+    with ColumnarCompanyWriter(path, batch_size=3) as writer:
+        for company in _companies(10):
+            writer.write(company)
+
+    frames = list(ColumnarHandler.iter_dataframes(path, columns=['inn', 'source'], batch_size=3))
+
+    assert sum(len(frame) for frame in frames) == 10
+    assert [value for frame in frames for value in frame['source']] == [SOURCES[i % 3] for i in range(10)]
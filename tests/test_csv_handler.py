@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip('pandas')
+
+from src.data_collectors.base import CompanyData
+from src.utils.csv_handler import CompanyCsvWriter, CsvHandler
+
+COMPANIES = [
+    CompanyData(inn='0012345678', name='ООО "Ромашка"', revenue=150000000.5, site='romashka.ru',
+                cat_evidence='Trados; memoQ', source='rusprofile', cat_product='Trados', employees=120,
+                okved_main='74.30', country='Россия'),
+    CompanyData(inn='', name='Бюро, переводы\nи локализация', revenue=None, site='', cat_evidence='',
+                source='catalog'),
+    CompanyData(inn='500100732259', name='АО Лингва', revenue=0.0, site='lingva.ru', cat_evidence='"TM"',
+                source='registry', employees=0, okved_main='74.30.1'),
+]
+
+@pytest.fixture(params=['arrow', 'pandas'])
+def reader(request, monkeypatch):
+    if request.param == 'arrow':
+        pytest.importorskip('pyarrow')
+    else:
+        monkeypatch.setattr(CsvHandler, '_read_arrow_columns', staticmethod(lambda filepath: None))
+    return request.param
+
+def test_round_trip(tmp_path, reader):
+    path = str(tmp_path / 'companies.csv')
+    with CompanyCsvWriter(path, flush_every=2) as writer:
+        for company in COMPANIES:
+            writer.write(company)
+
+    loaded = CsvHandler.load_companies_from_csv(path, quiet=True)
+
+    assert loaded[:2] == COMPANIES[:2]
+    # Нулевая численность пишется как пустое значение (employees or '')
+    assert loaded[2] == CompanyData(inn='500100732259', name='АО Лингва', revenue=0.0, site='lingva.ru',
+                                    cat_evidence='"TM"', source='registry', okved_main='74.30.1')
+    assert list(CsvHandler.iter_companies_from_csv(path)) == loaded
+
+def test_readers_agree_on_loose_values(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'companies.csv'
+    path.write_text('﻿inn,name,revenue,site,cat_evidence,source,employees\n'
+                    '0077,ООО,1e8,,,rusprofile,12.0\n'
+                    ',,,,,,4.6\n'
+                    '123,"АО ""Кавычки""",,a.ru,x,catalog,нет\n', encoding='utf-8')
+
+    arrow = CsvHandler.load_companies_from_csv(str(path), quiet=True)
+    monkeypatch.setattr(CsvHandler, '_read_arrow_columns', staticmethod(lambda filepath: None))
+    pandas = CsvHandler.load_companies_from_csv(str(path), quiet=True)
+
+    assert arrow == pandas
+    assert [(c.inn, c.revenue, c.employees, c.cat_product) for c in arrow] == [
+        ('0077', 1e8, 12, None), ('', None, 5, None), ('123', None, None, None)]
+    assert arrow[2].name == 'АО "Кавычки"'
+
+def test_save_writes_same_bytes_as_stream_writer(tmp_path):
+    saved, streamed = str(tmp_path / 'saved.csv'), str(tmp_path / 'streamed.csv')
+    companies = COMPANIES + [CompanyData(inn='1', name='NaN', revenue=float('nan'), site='', cat_evidence='',
+                                         source='catalog')]
+    CsvHandler.save_companies_to_csv(companies, saved, quiet=True)
+    with CompanyCsvWriter(streamed) as writer:
+        for company in companies:
+            writer.write(company)
+
+    with open(saved, 'rb') as a, open(streamed, 'rb') as b:
+        content = a.read()
+        assert content == b.read()
+    assert content.endswith(b'1,NaN,,,,catalog,,,,\n')
@@ -0,0 +1,91 @@
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+pd = pytest.importorskip('pandas')
+
+from src.data_collectors.base import CompanyData
+from src.processors import data_cleaner
+from src.processors.data_cleaner import DataCleaner
+
+COLUMNS = ['inn', 'name', 'site', 'revenue', 'employees', 'cat_evidence']
+
+ROWS = [
+    # ИНН: с пробелами, с подписью, короткий, телефон вместо ИНН, число, не-ASCII цифры
+    dict(inn='77 0708 3893', name='ООО  "Ромашка"', site='HTTPS://WWW.Romashka.RU ', revenue='150 000 000 руб.',
+         employees='120 человек', cat_evidence='  Trados\tStudio  и memoQ  '),
+    dict(inn='ИНН 7707083893', name='  АО   Лингва Про  ', site='http://lingva.ru', revenue=2.5e8,
+         employees=45, cat_evidence='translation memory'),
+    dict(inn='12345', name='ИП Иванов (перевод)!!!', site='www.ivanov.рф', revenue=float('nan'),
+         employees='от 10 до 20', cat_evidence=None),
+    dict(inn='+7 (495) 123-45-67', name='Бюро № 1 — переводы', site='  +7 495 123 45 67  ', revenue=None,
+         employees=None, cat_evidence=''),
+    dict(inn=7707083893, name='Lingua_Tech.  Ltd', site='https://İSTANBUL-translate.com', revenue='1.2.3',
+         employees='нет данных', cat_evidence='x' * 250),
+    dict(inn='٧٧٠٧٠٨٣٨٩٣', name='ΟΔΟΣ Μετάφραση', site='ΟΔΟΣ.gr', revenue='12,5 млн', employees='0',
+         cat_evidence='Smartcat\n\n\nCrowdin'),
+    dict(inn=None, name=None, site=None, revenue=0, employees=True, cat_evidence=0),
+    dict(inn=float('nan'), name='', site='', revenue='', employees=float('nan'), cat_evidence='  　'),
+]
+
+def _normalize(value):
+    if value is None or value is pd.NA:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    return value
+
+def _per_object():
+    companies = [CompanyData(source='test', **{key: row[key] for key in COLUMNS}) for row in ROWS]
+    return DataCleaner.clean_company_data(companies)
+
+def _frame():
+    return pd.DataFrame({key: pd.Series([row[key] for row in ROWS], dtype=object) for key in COLUMNS})
+
+@pytest.fixture(params=['rows', 'arrow', 'object'])
+def backend(request, monkeypatch):
+    if request.param != 'rows':
+        # Путь по столбцам и на маленькой таблице
+        monkeypatch.setattr(data_cleaner, 'DATAFRAME_MIN_ROWS', 0)
+    if request.param == 'arrow':
+        pytest.importorskip('pyarrow')
+    elif request.param == 'object':
+        monkeypatch.setattr(DataCleaner, '_text_column', staticmethod(
+            lambda column: (DataCleaner._as_text(column), data_cleaner.PYTHON_PATTERNS)))
+    return request.param
+
+def test_clean_dataframe_matches_clean_company_data(backend):
+    expected = _per_object()
+    cleaned = _frame().pipe(DataCleaner.clean_dataframe)
+
+    for row, company in enumerate(expected):
+        for column in COLUMNS:
+            assert _normalize(cleaned[column].iloc[row]) == _normalize(getattr(company, column)), (row, column)
+
+def test_clean_dataframe_keeps_index_and_source_frame():
+    df = _frame()
+    df.index = [5, 5] + list(range(1, len(df) - 1))
+    original = df.copy()
+
+    cleaned = DataCleaner.clean_dataframe(df)
+
+    assert list(cleaned.index) == list(df.index)
+    pd.testing.assert_frame_equal(df, original)
+    assert cleaned['revenue'].dtype == 'float64'
+    assert cleaned['employees'].dtype == 'Int64'
+
+@pytest.mark.parametrize('min_rows', [0, 10])
+def test_clean_dataframe_numeric_columns(monkeypatch, min_rows):
+    monkeypatch.setattr(data_cleaner, 'DATAFRAME_MIN_ROWS', min_rows)
+    df = pd.DataFrame({'revenue': [1, 2, None], 'employees': [3.0, float('nan'), 4.5]})
+
+    cleaned = DataCleaner.clean_dataframe(df)
+
+    assert cleaned['revenue'].tolist()[:2] == [1.0, 2.0]
+    assert math.isnan(cleaned['revenue'].iloc[2])
+    assert cleaned['employees'].tolist() == [3, pd.NA, pd.NA]
+    assert [DataCleaner._clean_employees(value) for value in (3.0, float('nan'), 4.5)] == [3, None, None]
@@ -0,0 +1,63 @@
+from src.data_collectors.base import CompanyData
+from src.processors.deduplicator import Deduplicator, MergePolicy
+
+def _company(inn, source, revenue=None, cat_evidence='', **kwargs):
+    return CompanyData(inn=inn, name=kwargs.pop('name', f'ООО {source}'), revenue=revenue, site=kwargs.pop('site', ''),
+                       cat_evidence=cat_evidence, source=source, **kwargs)
+
+def test_same_inn_in_different_formats_is_one_company():
+    deduplicator = Deduplicator(MergePolicy())
+    companies = deduplicator.deduplicate([
+        _company('7707083893', 'a'),
+        _company('ИНН 77 0708 3893', 'b'),
+        _company(7707083893, 'c'),
+        _company('500100732259', 'a'),
+    ])
+
+    assert [c.inn for c in companies] == ['7707083893', '500100732259']
+    assert deduplicator.duplicates == 2
+
+def test_records_without_valid_inn_pass_through():
+    deduplicator = Deduplicator(MergePolicy())
+    companies = deduplicator.deduplicate([_company(None, 'a'), _company('12345', 'a'), _company('', 'a')])
+
+    assert len(companies) == 3
+    assert deduplicator.duplicates == 0
+
+def test_priority_source_wins_and_gaps_are_filled():
+    policy = MergePolicy(source_priority=['registry', 'website'], concat_evidence=True)
+    deduplicator = Deduplicator(policy)
+    [company] = deduplicator.deduplicate([
+        _company('7707083893', 'website', cat_evidence='Trados; memoQ', site='a.ru', employees=10),
+        _company('7707083893', 'registry', revenue=5e8, cat_evidence='memoQ; Smartcat', name='АО Реестр'),
+    ])
+
+    assert company.source == 'registry'
+    assert company.name == 'АО Реестр'
+    assert company.revenue == 5e8
+    assert company.site == 'a.ru'
+    assert company.employees == 10
+    assert company.cat_evidence == 'memoQ; Smartcat; Trados'
+
+def test_revenue_is_not_borrowed_without_prefer_revenue():
+    deduplicator = Deduplicator(MergePolicy(prefer_revenue=False))
+    [company] = deduplicator.deduplicate([
+        _company('7707083893', 'a', cat_evidence='Trados'),
+        _company('7707083893', 'b', revenue=1e8, cat_evidence='memoQ'),
+    ])
+
+    assert company.revenue is None
+    assert company.cat_evidence == 'Trados'
+
+def test_stream_yields_first_record_immediately():
+    deduplicator = Deduplicator(MergePolicy())
+    stream = deduplicator.iter_deduplicate(iter([
+        _company('7707083893', 'a'),
+        _company('7707083893', 'b', revenue=1e8),
+    ]))
+
+    first = next(stream)
+    assert first.revenue is None
+    assert list(stream) == []
+    # Дубликат вливается в уже отданный объект
+    assert first.revenue == 1e8
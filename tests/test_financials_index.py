@@ -0,0 +1,38 @@
+from src.utils.financials_index import Financials, FinancialsIndex
+
+def _build(tmp_path, lines, **kwargs):
+    source = tmp_path / 'financials.csv'
+    source.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    index = FinancialsIndex(str(tmp_path / 'financials.sqlite'))
+    index.build(str(source), **kwargs)
+    return index
+
+def test_latest_year_wins_and_rows_without_year_do_not_overwrite(tmp_path):
+    index = _build(tmp_path, [
+        'ИНН;Выручка;Численность;Год',
+        '7707083893;100;10;2022',
+        '7707083893;300;30;2023',
+        '7707083893;200;20;2021',
+        '7707083893;999;99;',
+        '500100732259;50;5;',
+        '500100732259;60;6;2020',
+    ])
+
+    assert index.lookup('7707083893') == Financials(300.0, 30, 2023)
+    # Строка с годом заменяет строку без года
+    assert index.lookup('5001 0073 2259') == Financials(60.0, 6, 2020)
+
+def test_revenue_unit(tmp_path):
+    index = _build(tmp_path, ['inn,revenue', '7707083893,"150 000,5"'], revenue_unit=1000)
+
+    assert index.lookup('7707083893').revenue == 150_000_500.0
+
+def test_lookup_many_counts_every_occurrence(tmp_path):
+    index = _build(tmp_path, ['inn;revenue', '7707083893;100'])
+
+    found = index.lookup_many(['7707083893', '7707083893', '500100732259', '', '7707083893'])
+
+    assert set(found) == {'7707083893'}
+    stats = index.stats()
+    assert stats['lookups'] == 4
+    assert stats['found'] == 3
@@ -0,0 +1,41 @@
+from src.utils.page_store import PageStore
+
+def test_identical_pages_share_one_blob(tmp_path):
+    store = PageStore(str(tmp_path / 'pages.sqlite'))
+
+    store.save('https://a.ru', '<html>заглушка</html>')
+    store.save('https://b.ru', '<html>заглушка</html>')
+
+    assert store.stats()['pages'] == 2
+    assert store.stats()['unique_pages'] == 1
+    assert store.load('https://b.ru') == '<html>заглушка</html>'
+
+def test_replaced_page_drops_orphan_blob(tmp_path):
+    store = PageStore(str(tmp_path / 'pages.sqlite'))
+
+    store.save('https://a.ru', 'старая')
+    store.save('https://a.ru', 'новая')
+
+    assert store.load('https://a.ru') == 'новая'
+    assert store.stats()['unique_pages'] == 1
+
+def test_blob_deleted_between_checks_is_stored_again(tmp_path, monkeypatch):
+    store = PageStore(str(tmp_path / 'pages.sqlite'))
+    store.save('https://a.ru', 'страница')
+    has_blob = store._has_blob
+    checks = []
+
+    def racing_has_blob(digest):
+        # Первая проверка видит блоб, а до записи его удаляет другой поток
+        checks.append(digest)
+        if len(checks) == 1:
+            known = has_blob(digest)
+            store._conn.execute("DELETE FROM pages WHERE url = 'https://a.ru'")
+            store._delete_orphan(digest)
+            return known
+        return has_blob(digest)
+
+    monkeypatch.setattr(store, '_has_blob', racing_has_blob)
+    store.save('https://b.ru', 'страница')
+
+    assert store.load('https://b.ru') == 'страница'
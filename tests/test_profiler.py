@@ -0,0 +1,53 @@
+import json
+import time
+
+from src.utils import profiler
+from src.utils.profiler import profile_iter, profile_stage, start_profiling, stop_profiling
+
+def _slow(items, delay):
+    for item in items:
+        time.sleep(delay)
+        yield item
+
+def test_profile_iter_is_passthrough_without_profiler():
+    items = [1, 2, 3]
+
+    assert profile_iter('stage', items) is items
+
+def test_stream_stages_get_their_own_time(tmp_path, capsys):
+    start_profiling(str(tmp_path), trace_memory=True)
+    try:
+        pipeline = profile_iter('source', _slow(range(5), 0.01))
+        pipeline = profile_iter('double', _slow(pipeline, 0.03))
+        with profile_stage('stream'):
+            assert list(pipeline) == [0, 1, 2, 3, 4]
+    finally:
+        summary_path = stop_profiling()
+
+    stages = {entry['stage']: entry for entry in json.load(open(summary_path, encoding='utf-8'))['stages']}
+
+    assert stages['stream']['peak_memory_bytes'] is not None
+    assert stages['source']['parent'] == 'stream'
+    assert 0.04 <= stages['source']['wall_seconds'] < 0.15
+    # Время предыдущего этапа не входит в собственное
+    assert 0.14 <= stages['double']['wall_seconds'] < 0.3
+    assert profiler._profiler is None
+    assert '  double' in capsys.readouterr().out
+
+def test_stage_without_reset_peak(tmp_path, monkeypatch, capsys):
+    # Python 3.8: в tracemalloc нет reset_peak
+    import tracemalloc
+    monkeypatch.delattr(tracemalloc, 'reset_peak', raising=False)
+    start_profiling(str(tmp_path), trace_memory=True)
+    try:
+        with profile_stage('first'):
+            data = [bytearray(1024) for _ in range(100)]
+        del data
+        with profile_stage('second'):
+            pass
+    finally:
+        summary_path = stop_profiling()
+
+    stages = json.load(open(summary_path, encoding='utf-8'))['stages']
+    assert [entry['stage'] for entry in stages] == ['first', 'second']
+    assert stages[1]['peak_memory_bytes'] < stages[0]['peak_memory_bytes']
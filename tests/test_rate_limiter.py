@@ -0,0 +1,80 @@
+import socket
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from src.utils import dns_cache
+from src.utils.http_client import HttpClient
+from src.utils.rate_limiter import RateLimiter, backoff_delay, host_of, is_name_resolution_error, parse_retry_after
+
+def _resolution_error():
+    # Цепочка, как у requests поверх urllib3: ConnectionError(MaxRetryError(reason=...)) <- gaierror
+    try:
+        try:
+            raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        except socket.gaierror as e:
+            raise NewConnectionError(None, 'Failed to resolve') from e
+    except NewConnectionError as e:
+        return requests.ConnectionError(MaxRetryError(None, 'https://dead.example/', reason=e))
+
+def test_name_resolution_error_is_detected_through_the_chain():
+    assert is_name_resolution_error(_resolution_error())
+    assert not is_name_resolution_error(requests.ConnectionError('Connection refused'))
+    assert not is_name_resolution_error(requests.Timeout())
+
+class _FailingSession:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        raise self.error
+
+@pytest.mark.parametrize('error, calls', [
+    (_resolution_error(), 1),
+    (requests.ConnectionError('Connection refused'), 3),
+])
+def test_send_does_not_retry_unresolvable_hosts(monkeypatch, error, calls):
+    monkeypatch.setattr('src.utils.http_client.backoff_delay', lambda attempt: 0.0)
+    session = _FailingSession(error)
+    client = HttpClient(per_host_delay=0, retries=2, session=session, limiter=RateLimiter(rate=float('inf')))
+    client.cache = None
+
+    with pytest.raises(requests.ConnectionError):
+        client._send('https://dead.example/', {}, timeout=1)
+
+    assert session.calls == calls
+
+def test_dns_cache_counts_failed_resolution_as_miss(monkeypatch):
+    def failing_getaddrinfo(*args):
+        raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+
+    monkeypatch.setattr(dns_cache, '_original_getaddrinfo', failing_getaddrinfo)
+    monkeypatch.setattr(dns_cache, '_ttl', 60.0)
+    before = dns_cache.dns_cache_stats()
+
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            dns_cache._cached_getaddrinfo('dead.example', 443)
+
+    after = dns_cache.dns_cache_stats()
+    assert after['misses'] - before['misses'] == 2
+    assert after['entries'] == before['entries']
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = RateLimiter(rate=20.0, burst=1)
+
+    waits = [limiter.acquire('https://a.ru/page') for _ in range(3)]
+    other = limiter.acquire('https://b.ru/')
+
+    assert waits[0] == pytest.approx(0.0, abs=0.01)
+    assert sum(waits[1:]) >= 0.08
+    assert other == pytest.approx(0.0, abs=0.01)
+
+def test_retry_helpers():
+    assert host_of('https://Example.RU/path') == 'example.ru'
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after('garbage') is None
+    assert 0 <= backoff_delay(3, base=1.0, cap=2.0) <= 2.0
@@ -0,0 +1,103 @@
+import pytest
+
+from src.data_collectors import registry_collector
+from src.data_collectors.registry_collector import RegistryCollector, parse_number
+
+CSV_TEXT = (
+    '﻿ИНН;Наименование;ОКВЭД;Выручка;Численность;Страна;Сайт\r\n'
+    '7707083893;ООО "Ромашка" переводы;74.30;150 000;12;;romashka.ru\r\n'
+    '500100732259;"АО ""Лингва""\r\nбюро; переводов";74.30.1;200000,5;;Россия;\r\n'
+    '7701234567;ООО Стройка;41.20;900000;;;\r\n'
+    '7702345678;ООО Мало;74.30;10;;;\r\n'
+    '7703456789;ООО Без выручки;74.30;;;;\r\n'
+    '7704567890;ООО Зарубеж;74.30;500000;;Казахстан;\r\n'
+    ';Без ИНН;74.30;500000;;;\r\n'
+    '7705678901;ООО "Длинное название' + ' очень' * 40 + '";74.30;300000;7;;\r\n'
+)
+
+def _collect(tmp_path, name, text, **kwargs):
+    path = tmp_path / name
+    path.write_bytes(text.encode('utf-8'))
+    options = dict(okved_prefixes=['74.30'], min_revenue=100_000_000, revenue_unit=1000, countries=['Россия'])
+    options.update(kwargs)
+    collector = RegistryCollector(str(path), **options)
+    return collector, collector.collect_companies()
+
+@pytest.fixture(params=[4 * 1024 * 1024, 7, 64], ids=['whole', 'tiny_chunks', 'small_chunks'])
+def chunk_bytes(request, monkeypatch):
+    monkeypatch.setattr(registry_collector, 'CHUNK_BYTES', request.param)
+    return request.param
+
+def test_parse_number():
+    assert parse_number('150 000 000,50') == 150000000.5
+    assert parse_number('1\xa0000') == 1000.0
+    assert parse_number('') is None
+    assert parse_number('нет') is None
+
+def test_csv_filters_and_chunk_boundaries(tmp_path, chunk_bytes):
+    collector, companies = _collect(tmp_path, 'registry.csv', CSV_TEXT)
+
+    assert [c.inn for c in companies] == ['7707083893', '500100732259', '7705678901']
+    first, quoted, long_line = companies
+    assert first.name == 'ООО "Ромашка" переводы'
+    assert first.revenue == 150_000_000
+    assert first.employees == 12
+    assert first.site == 'romashka.ru'
+    assert first.country == 'Россия'
+    # Поле в кавычках с переводом строки и разделителем внутри
+    assert quoted.name == 'АО "Лингва"\r\nбюро; переводов'
+    assert quoted.okved_main == '74.30.1'
+    assert quoted.revenue == 200_000_500
+    assert long_line.name.endswith(' очень"')
+    assert long_line.employees == 7
+
+    assert collector.rows_read == 8
+    assert collector.rejected == {'okved': 1, 'revenue': 1, 'no_revenue': 1, 'country': 1, 'no_inn_or_name': 1}
+    assert collector.bytes_read == len(CSV_TEXT.encode('utf-8')) - 3
+
+def test_multibyte_text_is_not_split_between_chunks(tmp_path, chunk_bytes):
+    lines = ''.join(f'77000000{i:02d},Общество «Перевод» №{i},74.30,500000\n' for i in range(20))
+    _, companies = _collect(tmp_path, 'registry.csv', 'inn,name,okved,revenue\n' + lines)
+
+    assert [c.name for c in companies] == [f'Общество «Перевод» №{i}' for i in range(20)]
+
+def test_unclosed_quote_at_end_of_file(tmp_path, chunk_bytes):
+    text = 'inn,name,okved,revenue\n7707083893,"Бюро\nпереводов,74.30,500000\n'
+    _, companies = _collect(tmp_path, 'registry.csv', text, okved_prefixes=[], keep_missing_revenue=True)
+
+    assert len(companies) == 1
+    assert companies[0].name == 'Бюро\nпереводов,74.30,500000'
+
+def test_csv_without_inn_column(tmp_path):
+    with pytest.raises(ValueError):
+        _collect(tmp_path, 'registry.csv', 'name,okved\nООО,74.30\n')
+
+def test_xml_attributes_children_and_namespaces(tmp_path):
+    text = (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<Файл xmlns:r="urn:registry">'
+        '<Документ ИНН="7707083893" НаимСокр="ООО Ромашка" ОКВЭД="74.30">'
+        '<r:Выручка>150000</r:Выручка><Численность value="12"/></Документ>'
+        '<Документ ИНН="7701234567" НаимСокр="ООО Стройка" ОКВЭД="41.20" Выручка="900000"/>'
+        '<Документ><ИНН>500100732259</ИНН><Наименование>АО Лингва</Наименование>'
+        '<ОКВЭД>74.30.1</ОКВЭД><Выручка>200000</Выручка><Страна>Казахстан</Страна></Документ>'
+        '</Файл>'
+    )
+    collector, companies = _collect(tmp_path, 'registry.xml', text)
+
+    assert [(c.inn, c.name, c.revenue, c.employees) for c in companies] == [
+        ('7707083893', 'ООО Ромашка', 150_000_000, 12)]
+    assert collector.rows_read == 3
+    assert collector.rejected == {'okved': 1, 'country': 1}
+
+def test_xml_record_tag(tmp_path):
+    text = ('<root><meta><Документ ИНН="1"/></meta><items>'
+            '<Документ ИНН="7707083893" Наименование="ООО Ромашка" ОКВЭД="74.30" Выручка="150000"/>'
+            '</items></root>')
+    _, companies = _collect(tmp_path, 'registry.xml', text, record_tag='Документ', keep_missing_revenue=True)
+
+    assert [c.inn for c in companies] == ['7707083893']
+
+def test_empty_file(tmp_path):
+    _, companies = _collect(tmp_path, 'registry.csv', '')
+    assert companies == []
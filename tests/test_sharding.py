@@ -0,0 +1,64 @@
+import pytest
+
+from src.data_collectors.base import CompanyData
+from src.main import merge_result_files
+from src.processors.sharding import ShardSpec, missing_shards
+from src.utils import results_io
+
+def _company(inn, name='ООО Тест', site='', source='registry', revenue=None):
+    return CompanyData(inn=inn, name=name, revenue=revenue, site=site, cat_evidence='', source=source)
+
+COMPANIES = [_company(str(7700000000 + i * 7919)) for i in range(200)] + [
+    _company(None, name='Без ИНН', site='a.ru'),
+    _company('', name='  без инн ', site='A.RU '),
+]
+
+def test_parse_and_validate():
+    assert str(ShardSpec.parse('1/4')) == '1/4'
+    for text in ('4/4', '-1/4', '0/0', 'a/b', '1'):
+        with pytest.raises(ValueError):
+            ShardSpec.parse(text)
+
+def test_shards_partition_companies():
+    shards = [ShardSpec(i, 4).filter(COMPANIES) for i in range(4)]
+
+    assert sum(len(shard) for shard in shards) == len(COMPANIES)
+    assert {id(c) for shard in shards for c in shard} == {id(c) for c in COMPANIES}
+    assert all(shards)
+
+def test_assignment_ignores_inn_formatting_and_order():
+    spec = ShardSpec(0, 8)
+    key = ShardSpec.shard_key(_company('7707083893'))
+
+    assert ShardSpec.shard_key(_company('ИНН 77 0708 3893')) == key
+    assert ShardSpec.shard_of(key, 8) == ShardSpec.shard_of(key, 8)
+    assert spec.filter(COMPANIES) == [c for c in reversed(spec.filter(list(reversed(COMPANIES))))]
+    # Записи без ИНН с одинаковыми названием и сайтом попадают в один шард
+    assert ShardSpec.shard_key(COMPANIES[-1]) == ShardSpec.shard_key(COMPANIES[-2])
+
+def test_paths_round_trip():
+    spec = ShardSpec(2, 4)
+    path = spec.path_for('data/companies.csv')
+
+    assert path == 'data/companies.shard-2-of-4.csv'
+    assert str(ShardSpec.from_path(path)) == '2/4'
+    assert ShardSpec.from_path('data/companies.csv') is None
+    assert missing_shards([ShardSpec(i, 4).path_for('x.csv') for i in (0, 2)]) == ['1/4', '3/4']
+
+def test_merge_joins_shards_and_duplicates(tmp_path):
+    output = str(tmp_path / 'companies.csv')
+    # Одна и та же компания из двух прогонов: выручка берется из второго файла
+    extra = [_company('7707083893', source='website'), _company('7707083893', revenue=1e8)]
+    for i in range(2):
+        spec = ShardSpec(i, 2)
+        with results_io.open_writer(spec.path_for(output)) as writer:
+            for company in spec.filter(COMPANIES[:50]) + [extra[i]]:
+                writer.write(company)
+
+    merge_result_files([str(tmp_path / 'companies.shard-*-of-2.csv')], output)
+
+    merged = list(results_io.iter_companies(output))
+    assert len(merged) == 51
+    assert {c.inn for c in merged} == {c.inn for c in COMPANIES[:50]} | {'7707083893'}
+    [duplicate] = [c for c in merged if c.inn == '7707083893']
+    assert duplicate.revenue == 1e8
@@ -0,0 +1,72 @@
+import pytest
+
+from src.utils import text_index
+from src.utils.text_index import TextIndex
+
+PAGES = {
+    'https://a.ru': 'Бюро переводов: Trados Studio и memoQ, translation memory',
+    'https://b.ru': 'Smartcat для локализации программ. Memory translation наоборот',
+    'https://c.ru': 'XTM Cloud, cat-система и Trados',
+    'https://d.ru': 'Переводы без CAT',
+}
+
+@pytest.fixture
+def index(tmp_path):
+    index = TextIndex(str(tmp_path / 'index.sqlite'))
+    for i, (url, text) in enumerate(PAGES.items()):
+        index.add(url, text, inn=f'77000000{i}', name=url[8:])
+    yield index
+    index.close()
+
+def _urls(index, query):
+    return [match.url for match in index.search(query)]
+
+@pytest.mark.parametrize('query, urls', [
+    ('trados', ['https://a.ru', 'https://c.ru']),
+    ('TRADOS', ['https://a.ru', 'https://c.ru']),
+    ('перевод*', ['https://a.ru', 'https://d.ru']),
+    ('"translation memory"', ['https://a.ru']),
+    ('"локализации программ"', ['https://b.ru']),
+    ('cat-система', ['https://c.ru']),
+    ('smartcat OR xtm', ['https://b.ru', 'https://c.ru']),
+    ('trados AND NOT memoq', ['https://c.ru']),
+    ('trados NOT memoq', ['https://c.ru']),
+    ('(smartcat OR xtm) trados', ['https://c.ru']),
+    ('NOT cat', ['https://a.ru', 'https://b.ru']),
+    ('отсутствует', []),
+])
+def test_search(index, query, urls):
+    assert _urls(index, query) == urls
+
+@pytest.mark.parametrize('query', ['', '(trados', 'trados)', 'NOT', '"..."'])
+def test_invalid_queries(index, query):
+    with pytest.raises(ValueError):
+        index.search(query)
+
+def test_reindex_only_changed_text(index):
+    assert not index.add('https://a.ru', PAGES['https://a.ru'])
+    assert index.add('https://a.ru', 'Теперь только Wordfast', inn='770000000', name='a.ru')
+
+    assert _urls(index, 'trados') == ['https://c.ru']
+    assert _urls(index, 'wordfast') == ['https://a.ru']
+    assert index.stats()['docs'] == len(PAGES)
+
+def test_phrase_over_many_candidates(tmp_path):
+    index = TextIndex(str(tmp_path / 'index.sqlite'))
+    for i in range(300):
+        # Во всех документах оба слова, подряд - только в четных
+        text = 'translation memory' if i % 2 == 0 else 'memory of translation'
+        index.add(f'https://{i}.ru', text)
+
+    assert len(index.search('"translation memory"')) == 150
+    assert len(index.search('"translation memory"', limit=10)) == 10
+    index.close()
+
+def test_shared_index_follows_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_index.CONFIG, 'text_index_path', '')
+    assert text_index.get_text_index() is None
+
+    monkeypatch.setattr(text_index.CONFIG, 'text_index_path', str(tmp_path / 'shared.sqlite'))
+    monkeypatch.setattr(text_index, '_shared_indexes', {})
+    assert text_index.get_text_index() is text_index.get_text_index()
+    text_index.get_text_index().close()
@@ -0,0 +1,62 @@
+import pytest
+
+from src.data_collectors.website_parser import _EvidenceTracker
+
+VISIBLE_PAGE = ('<html><head><title>Бюро</title></head><body><ul><li>Trados</li><li>memoQ</li></ul>'
+                '<p>translation&nbsp;memory &amp; AT&T</p></body></html>')
+
+MARKUP_ONLY_PAGE = ('<html><head><script>var terms = "trados memoq smartcat crowdin";</script>'
+                    '<style>.trados{} .memoq{}</style><!-- smartcat xtm --></head>'
+                    '<body><a href="/trados-memoq-smartcat">Услуги</a></body></html>')
+
+def _feed(page, size, needed=3):
+    tracker = _EvidenceTracker(needed)
+    stopped = False
+    for start in range(0, len(page), size):
+        stopped = tracker(page[start:start + size]) or stopped
+    return tracker.found, stopped
+
+@pytest.mark.parametrize('size', [1, 3, 7, 64, 10_000])
+def test_tracker_finds_visible_terms_across_chunk_boundaries(size):
+    found, stopped = _feed(VISIBLE_PAGE, size)
+
+    assert found == {'trados', 'memoq', 'translation memory'}
+    assert stopped
+
+@pytest.mark.parametrize('size', [1, 5, 10_000])
+def test_tracker_ignores_scripts_styles_comments_and_attributes(size):
+    found, stopped = _feed(MARKUP_ONLY_PAGE, size)
+
+    assert found == set()
+    assert not stopped
+
+from src.data_collectors.base import CompanyData
+from src.data_collectors.website_parser import WebsiteParser
+from src.processors.text_extractor import EXTRACT_PAGES
+from src.utils.page_store import PageStore
+from src.utils.text_index import TextIndex
+
+def _extracted_pages():
+    return sum(value for _, value in EXTRACT_PAGES.samples())
+
+@pytest.mark.parametrize('parse_workers', [0, 1])
+def test_indexed_text_comes_from_the_analysis_stage(tmp_path, parse_workers):
+    pytest.importorskip('bs4')
+    store = PageStore(str(tmp_path / 'pages.sqlite'))
+    index = TextIndex(str(tmp_path / 'index.sqlite'))
+    companies = []
+    for i, body in enumerate(['Работаем в Trados и memoQ', 'Переводы без CAT']):
+        store.save(f'https://site{i}.ru', f'<html><body><script>smartcat</script><p>{body}</p></body></html>')
+        companies.append(CompanyData(inn=f'770708389{i}', name=f'ООО {i}', revenue=2e8, site=f'site{i}.ru',
+                                     cat_evidence='', source='registry'))
+    parser = WebsiteParser(max_workers=1, parse_workers=parse_workers, page_store=store, offline=True,
+                           text_index=index)
+    before = _extracted_pages()
+
+    analyzed = parser.analyze_multiple_companies(companies)
+
+    assert analyzed[0].cat_product == 'trados'
+    assert [match.url for match in index.search('trados')] == ['https://site0.ru']
+    assert index.search('smartcat') == []
+    # Каждая страница разобрана один раз - и для анализа, и для индекса
+    assert _extracted_pages() - before == 2